@@ -1,8 +1,12 @@
 import logging
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from subprocess import run
 
-from pyBioinfo_modules.wrappers._environment_settings import withActivateEnvCmd
+from pyBioinfo_modules.basic.basic import timeDiffStr
+from pyBioinfo_modules.basic.result_cache import ResultCache
+from pyBioinfo_modules.wrappers._environment_settings import runInEnv
 
 SCRIPT_ROOT = Path(__file__).parent.resolve()
 ANNOTATION_ROOT = SCRIPT_ROOT.parent.resolve() / "Annotation" / "20250727_bakta"
@@ -11,7 +15,13 @@ ANNOTATION_ROOT.mkdir(parents=True, exist_ok=True)
 SOURCE_FASTA_DIR = SCRIPT_ROOT.parent.resolve() / "Genome_fastas"
 SOURCE_FASTA_EXT = ".fa.gz"
 BAKTA_DB = "/vol/local/shared_db/bakta-20250224/db"
-THREADS = 16
+THREADS = 128  # Total core budget shared by all concurrent bakta jobs
+JOBS = 8  # Number of genomes annotated at the same time
+THREADS_PER_JOB = max(1, THREADS // JOBS)
+# Reuse annotations only if genome, bakta version, database and options match
+RESULT_CACHE: ResultCache | None = ResultCache(
+    ANNOTATION_ROOT.parent / "result_cache", maxBytes=50 * 1024**3
+)
 
 
 def strain_from_name(file_name_stem: str) -> str:
@@ -45,18 +55,25 @@ BEKTA_ENV = Path("/vol/local/conda_envs/bakta")
 CONDA_EXE = "micromamba"
 
 # Check and log bakta version
-BAKTA_VERSION_CMD = withActivateEnvCmd(
-    "bakta --version", BEKTA_ENV, CONDA_EXE, shell="bash"
-)
-bakta_version_result = run(
-    BAKTA_VERSION_CMD, shell=True, capture_output=True, text=True, check=False
+bakta_version_result = runInEnv(
+    ["bakta", "--version"],
+    BEKTA_ENV,
+    CONDA_EXE,
+    shell="bash",
+    capture_output=True,
+    text=True,
+    check=False,
 )
+BAKTA_VERSION: str | None = None
 if bakta_version_result.returncode != 0:
     logger.error(
         "Failed to get bakta version: %s", bakta_version_result.stderr.strip()
     )
 else:
-    logger.info("Bakta version: %s", bakta_version_result.stdout.strip())
+    BAKTA_VERSION = bakta_version_result.stdout.strip()
+    logger.info("Bakta version: %s", BAKTA_VERSION)
+if RESULT_CACHE is not None:
+    logger.info("Result cache at: %s", RESULT_CACHE.root)
 
 logger.info("With bakta database at:")
 logger.info(BAKTA_DB)
@@ -66,49 +83,136 @@ logger.info("Source FASTA files will be from:")
 logger.info(SOURCE_FASTA_DIR)
 logger.info("With extension: %s", SOURCE_FASTA_EXT)
 
-# Run bakta annotation
-source_fastas = list(SOURCE_FASTA_DIR.glob("*" + SOURCE_FASTA_EXT))
-logger.info("Found %d FASTA files to annotate.", len(source_fastas))
-for fasta_file in source_fastas:
-    logger.info("Annotating %s...", fasta_file.name)
-    if fasta_file.is_symlink():
-        logger.info("    -> %s", fasta_file.resolve().name)
+logger.info(
+    "Running %d bakta jobs concurrently with %d threads each.",
+    JOBS,
+    THREADS_PER_JOB,
+)
+
+
+def annotate_genome(fasta_file: Path, threads: int) -> bool:
+    """Run bakta on one genome, skip it if annotations are already there.
+
+    Returns True if the genome is annotated (now or before).
+    """
     file_stem = fasta_file.name.replace(SOURCE_FASTA_EXT, "")
     genus = file_stem.split("_")[0]
     species = file_stem.split("_")[1]
     strain = strain_from_name(file_stem)
     locus_tag = locus_tag_from_name(file_stem)
     outdir = ANNOTATION_ROOT / file_stem
+    gbff_file = outdir / (file_stem + ".fa.gbff")
+    cache_key = None
+    if RESULT_CACHE is not None and BAKTA_VERSION is not None:
+        cache_key = RESULT_CACHE.key(
+            "bakta",
+            BAKTA_VERSION,
+            [fasta_file],
+            {
+                "db": BAKTA_DB,
+                "genus": genus,
+                "species": species,
+                "strain": strain,
+                "gram": "+",
+                "locus_tag": locus_tag,
+            },
+        )
+        # Annotations made before the cache was used are trusted
+        if RESULT_CACHE.fetchOrAdopt(
+            cache_key, outdir, complete=gbff_file.exists()
+        ):
+            logger.info("Annotations of %s are up to date.", file_stem)
+            return True
     if outdir.exists():
         logger.warning("Output directory %s already exists.", outdir)
-        if (outdir / (file_stem + ".fa.gbff")).exists():
+        if cache_key is None and gbff_file.exists():
             logger.warning("Output annotations found. Skipping.")
-            continue
+            return True
         else:
             logger.info("Removing existing output directory %s", outdir)
-            for item in outdir.iterdir():
-                item.unlink()
-            outdir.rmdir()
-
-    bakta_cmd = withActivateEnvCmd(
-        f"bakta --db {BAKTA_DB} "
-        f"--output {outdir} "
-        f"--genus {genus} "
-        f"--species {species} "
-        f"--strain {strain} "
-        "--gram + "
-        f"--locus-tag {locus_tag} "
-        f"--threads {THREADS} "
-        f"{fasta_file}",
+            shutil.rmtree(outdir)
+
+    logger.info("Annotating %s...", fasta_file.name)
+    if fasta_file.is_symlink():
+        logger.info("    -> %s", fasta_file.resolve().name)
+    bakta_cmd = [
+        "bakta",
+        "--db",
+        BAKTA_DB,
+        "--output",
+        outdir,
+        "--genus",
+        genus,
+        "--species",
+        species,
+        "--strain",
+        strain,
+        "--gram",
+        "+",
+        "--locus-tag",
+        locus_tag,
+        "--threads",
+        threads,
+        fasta_file,
+    ]
+    ts = time.time()
+    bakta_result = runInEnv(
+        bakta_cmd,
         BEKTA_ENV,
         CONDA_EXE,
         shell="bash",
-    )
-    bakta_result = run(
-        bakta_cmd, shell=True, capture_output=True, text=True, check=False
+        capture_output=True,
+        text=True,
+        check=False,
     )
     if bakta_result.returncode != 0:
-        logger.error("Bakta annotation failed: %s", bakta_result.stderr.strip())
-    else:
-        logger.info("Bakta annotation completed successfully.")
-        logger.info(bakta_result.stdout.strip())
+        logger.error(
+            "Bakta annotation of %s failed after %s: %s",
+            fasta_file.name,
+            timeDiffStr(ts),
+            bakta_result.stderr.strip(),
+        )
+        return False
+    logger.info(
+        "Bakta annotation of %s completed successfully in %s.",
+        fasta_file.name,
+        timeDiffStr(ts),
+    )
+    logger.info(bakta_result.stdout.strip())
+    if cache_key is not None:
+        RESULT_CACHE.store(cache_key, outdir)
+    return True
+
+
+# Run bakta annotation
+# bakta spends most of its wall time in single-threaded steps, so several
+# genomes share the node. Each job is an external process, threads here only
+# wait for them.
+source_fastas = list(SOURCE_FASTA_DIR.glob("*" + SOURCE_FASTA_EXT))
+logger.info("Found %d FASTA files to annotate.", len(source_fastas))
+batch_ts = time.time()
+failed_fastas: list[Path] = []
+with ThreadPoolExecutor(max_workers=JOBS) as executor:
+    futures = {
+        executor.submit(
+            annotate_genome, fasta_file, THREADS_PER_JOB
+        ): fasta_file
+        for fasta_file in source_fastas
+    }
+    for future in as_completed(futures):
+        fasta_file = futures[future]
+        try:
+            if not future.result():
+                failed_fastas.append(fasta_file)
+        except Exception as e:
+            logger.error("Unexpected error annotating %s: %s", fasta_file, e)
+            failed_fastas.append(fasta_file)
+
+logger.info(
+    "Annotated %d of %d genomes in %s.",
+    len(source_fastas) - len(failed_fastas),
+    len(source_fastas),
+    timeDiffStr(batch_ts),
+)
+for fasta_file in failed_fastas:
+    logger.error("Failed: %s", fasta_file.name)
@@ -3,12 +3,23 @@
 
 import logging
 from pathlib import Path
-from subprocess import CalledProcessError, run
+
+from pyBioinfo_modules.basic.archive import archiveAndPruneDirectories
+from pyBioinfo_modules.basic.result_cache import RESULT_KEY_FILE, ResultCache
 
 SCRIPT_ROOT = Path(__file__).parent.resolve()
 ANNOTATION_ROOT = SCRIPT_ROOT.parent.resolve() / "Annotation" / "20250727_bakta"
 
-THREADS = 6  # More will not help
+THREADS = 48  # Total thread budget shared by all concurrent archive jobs
+JOBS = 8  # Number of directories archived at the same time
+# Compress in independent frames with a member index, so single files can be
+# read later with openArchivedMember() without decompressing the whole
+# archive. Existing archives without index are rewritten once.
+SEEKABLE = True
+# Result cache of 01_Annotation_using_bakta.py. Its entries are hard links
+# of the annotation files, so the entries of pruned directories are dropped
+# to free the space. None keeps them.
+RESULT_CACHE_ROOT: Path | None = ANNOTATION_ROOT.parent / "result_cache"
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -28,59 +39,53 @@ fh.setFormatter(formatter)
 logger.addHandler(fh)
 
 
-annotation_dirs = list(ANNOTATION_ROOT.glob("*/"))
-logger.info("Found %d annotation directories.", len(annotation_dirs))
-
-for d in annotation_dirs:
-    if not d.is_dir():
-        continue
+def archive_path_of(d: Path) -> Path:
+    return d / f"{d.name}_bakta.tar.xz"
 
-    logger.info("Processing directory: %s", d.name)
 
-    # Create archive name
-    archive_name = f"{d.name}_bakta.tar.xz"
-    archive_path = d / archive_name
-
-    # Check if archive already exists
-    if archive_path.exists():
-        logger.info("Archive already exists: %s", archive_name)
-    else:
-        # Create tar.xz archive of all files in the directory
-        logger.info("Creating archive: %s", archive_name)
-        try:
-            cmd = (
-                f"cd '{d}' && tar -cf - . | xz -T {THREADS} > '{archive_name}'"
-            )
-            result = run(
-                cmd, shell=True, check=True, capture_output=True, text=True
-            )
-            logger.info("Successfully created archive: %s", archive_name)
-        except (OSError, CalledProcessError) as e:
-            logger.error("Failed to create archive %s: %s", archive_name, e)
-            continue
+def keep_in_place(name: str) -> bool:
+    """
+    Keep *.gbff and *.faa files, the archive is kept anyway. Only top level
+    files are removed, files in sub directories are archived but left in
+    place.
+    """
+    # The result cache key tells 01_Annotation_using_bakta.py the
+    # annotations are up to date, without it they would be restored.
+    return (
+        "/" in name
+        or name.endswith((".gbff", ".faa"))
+        or name == RESULT_KEY_FILE
+    )
 
-    # Find files to keep (*.gbff and *.faa files, plus the archive)
-    gbff_files = list(d.glob("*.gbff"))
-    faa_files = list(d.glob("*.faa"))
-    files_to_keep = gbff_files + faa_files + [archive_path]
 
-    # Find all files in the directory
-    all_files = [f for f in d.glob("*") if f.is_file()]
+annotation_dirs = [d for d in ANNOTATION_ROOT.glob("*/") if d.is_dir()]
+logger.info("Found %d annotation directories.", len(annotation_dirs))
 
-    # Remove files that are not in the keep list
-    files_to_remove = [f for f in all_files if f not in files_to_keep]
+# Also log from the archive module
+logging.getLogger("pyBioinfo_modules.basic.archive").addHandler(ch)
+logging.getLogger("pyBioinfo_modules.basic.archive").addHandler(fh)
+logging.getLogger("pyBioinfo_modules.basic.archive").setLevel(logging.INFO)
 
-    logger.info(
-        "Keeping %d files (1 archive, %d .gbff, %d .faa)",
-        len(files_to_keep),
-        len(gbff_files),
-        len(faa_files),
-    )
-    logger.info("Removing %d files", len(files_to_remove))
+results = archiveAndPruneDirectories(
+    annotation_dirs,
+    archive_path_of,
+    keep=keep_in_place,
+    totalThreads=THREADS,
+    jobs=JOBS,
+    seekable=SEEKABLE,
+)
+if RESULT_CACHE_ROOT is not None and RESULT_CACHE_ROOT.is_dir():
+    cache = ResultCache(RESULT_CACHE_ROOT, maxBytes=None)
+    dropped = 0
+    for r in results:
+        key = ResultCache.resultKeyOf(r["directory"])
+        if r["ok"] and r["removed"] and key is not None:
+            dropped += cache.drop(key)
+    logger.info("Dropped %d result cache entries.", dropped)
 
-    for file_to_remove in files_to_remove:
-        try:
-            file_to_remove.unlink()
-            logger.debug("Removed: %s", file_to_remove.name)
-        except OSError as e:
-            logger.error("Failed to remove %s: %s", file_to_remove.name, e)
+logger.info(
+    "Cleaned %d of %d directories, removed %d files.",
+    sum(r["ok"] for r in results),
+    len(results),
+    sum(r["removed"] for r in results),
+)
@@ -2,17 +2,14 @@ import logging
 import shutil
 from pathlib import Path
 
-from pyBioinfo_modules.wrappers.antismash import (
-    log_antismash_version,
-    runAntismash,
-)
-from tqdm import tqdm
+from pyBioinfo_modules.wrappers.antismash import runAntismashBatch
 
 SCRIPT_ROOT = Path(__file__).parent.resolve()
 ANNOTATION_ROOT = SCRIPT_ROOT.parent.resolve() / "Annotation" / "20250727_bakta"
 log_file = ANNOTATION_ROOT.parent / ("20250727_bakta_antismash.log")
 ANTISMASH_OUT = ANNOTATION_ROOT.parent / "20250727_bakta_antismash"
-THREADS = 16
+THREADS = 64  # Total core budget shared by all concurrent antiSMASH jobs
+JOBS = 8  # Number of genomes analysed at the same time
 
 ANTISMASH_ENV = Path("/vol/local/conda_envs/antismash/")
 CONDA_EXE = "micromamba"
@@ -35,40 +32,34 @@ gbff_files = list(ANNOTATION_ROOT.glob("*/*.gbff"))
 
 logger.info("Found %d gbff files.", len(gbff_files))
 
-log_antismash_version(
-    antismash_env=ANTISMASH_ENV,
-    condaexe=CONDA_EXE,
-    shell=SHELL,
-)
-
-for gbff_file in tqdm(gbff_files, desc="Running antiSMASH"):
-    if not gbff_file.is_file():
-        continue
-
-    out_dir = ANTISMASH_OUT / gbff_file.stem
-    consolidated_zip = ANTISMASH_OUT / f"{out_dir}.zip"
-    if consolidated_zip.exists():
+# Genomes finished in an earlier run are in the batch journal; the check on
+# consolidated zips is for results from before the journal was used.
+consolidated_zips = {p.stem for p in ANTISMASH_OUT.glob("*.zip")}
+todo_gbffs = []
+for gbff_file in gbff_files:
+    if gbff_file.stem in consolidated_zips:
         logger.info(
-            "Consolidated zip file already exists: %s, skipping",
-            consolidated_zip.name,
+            "Consolidated zip file already exists: %s.zip, skipping",
+            gbff_file.stem,
         )
         continue
-    out_dir.mkdir(parents=True, exist_ok=True)
+    todo_gbffs.append(gbff_file)
 
-    # Run antiSMASH command
-    runAntismash(
-        gbff_file,
-        title=gbff_file.stem,
-        output=out_dir,
-        cpu=THREADS,
-        condaEnv=ANTISMASH_ENV,
-        condaExe=CONDA_EXE,
-        shell=SHELL,
-        geneFinding="none",
-        existsOk=True,
-        overwrite=False,
-        completeness=2,
-    )
+# antiSMASH uses few cores per genome, so several genomes share the node
+runAntismashBatch(
+    todo_gbffs,
+    output=ANTISMASH_OUT,
+    total_cpus=THREADS,
+    jobs=JOBS,
+    journalFile=ANTISMASH_OUT.parent / "20250727_bakta_antismash_jobs.json",
+    condaEnv=ANTISMASH_ENV,
+    condaExe=CONDA_EXE,
+    shell=SHELL,
+    geneFinding="none",
+    existsOk=True,
+    overwrite=False,
+    completeness=2,
+)
 
 # Consolidate zipped results
 for out_dir in ANTISMASH_OUT.glob("*/"):
@@ -0,0 +1,333 @@
+############################################
+# SQLite catalog of the BGC regions and protoclusters of all antiSMASH
+# results, so that which genome has which region or product is a query
+# instead of a re-parse of every result. Updated as results are added:
+#     updateBgcCatalog(catalogFile, sorted(ANTISMASH_OUT.glob("*.zip")))
+#     regionsByProduct(catalogFile, ["NRPS", "lanthipeptide-class-i"])
+############################################
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from Bio import SeqIO
+from Bio.SeqRecord import SeqRecord
+from pyBioinfo_modules.antismash_results.zip_reader import (
+    listResultZip,
+    openResultMember,
+)
+from pyBioinfo_modules.wrappers.antismash import (
+    ClusterInfo,
+    clusterGbkGlobTxt,
+    clusterInfoOfRecord,
+    findClusterNumberStr,
+)
+
+logger = logging.getLogger(__name__)
+
+BGC_CATALOG_FILE = "antismash_bgc_catalog.sqlite"
+BGC_CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS genomes (
+    genome TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    sourceStamp TEXT NOT NULL,
+    organism TEXT,
+    regions INTEGER NOT NULL,
+    added TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS regions (
+    regionId INTEGER PRIMARY KEY,
+    genome TEXT NOT NULL REFERENCES genomes (genome) ON DELETE CASCADE,
+    contig TEXT NOT NULL,
+    regionNumber INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    contigEdge INTEGER,
+    products TEXT NOT NULL,
+    organism TEXT,
+    gbkFile TEXT NOT NULL,
+    fastaId TEXT NOT NULL,
+    coreRelativeLocs TEXT NOT NULL,
+    proteinDigest TEXT NOT NULL,
+    proteinLength INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS protoclusters (
+    regionId INTEGER NOT NULL REFERENCES regions (regionId) ON DELETE CASCADE,
+    protoclusterNumber INTEGER NOT NULL,
+    product TEXT NOT NULL,
+    category TEXT,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    coreStart INTEGER,
+    coreEnd INTEGER
+);
+CREATE INDEX IF NOT EXISTS regionsGenome ON regions (genome);
+CREATE INDEX IF NOT EXISTS regionsOrganism ON regions (organism);
+CREATE INDEX IF NOT EXISTS regionsDigest ON regions (proteinDigest);
+CREATE INDEX IF NOT EXISTS protoclustersProduct
+    ON protoclusters (product, regionId);
+CREATE INDEX IF NOT EXISTS protoclustersRegion ON protoclusters (regionId);
+"""
+_REGION_COLUMNS = [
+    "genome",
+    "contig",
+    "regionNumber",
+    "start",
+    "end",
+    "contigEdge",
+    "products",
+    "organism",
+    "gbkFile",
+    "fastaId",
+    "coreRelativeLocs",
+    "proteinDigest",
+    "proteinLength",
+]
+_PROTOCLUSTER_COLUMNS = [
+    "protoclusterNumber",
+    "product",
+    "category",
+    "start",
+    "end",
+    "coreStart",
+    "coreEnd",
+]
+
+
+def openBgcCatalog(catalogFile: Path) -> sqlite3.Connection:
+    """Connection to the catalog, created if it does not exist."""
+    conn = sqlite3.connect(catalogFile)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(BGC_CATALOG_SCHEMA)
+    return conn
+
+
+def genomeOfSource(source: Path) -> str:
+    """A result zip or directory is named after its genome."""
+    return source.stem if source.suffix == ".zip" else source.name
+
+
+def _sourceStamp(source: Path) -> str:
+    """Changes when a result zip or the region gbks of a directory do."""
+    if source.is_file():
+        stat = source.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    stats = [f.stat() for f in source.rglob(clusterGbkGlobTxt)]
+    return f"{len(stats)}:{max((s.st_mtime_ns for s in stats), default=0)}"
+
+
+def _origPosition(record: SeqRecord, key: str, default: int) -> int:
+    """Region location on the contig, from the antiSMASH-Data comment."""
+    data = record.annotations.get("structured_comment", {}).get(
+        "antiSMASH-Data", {}
+    )
+    match = re.search(r"[0-9]+", str(data.get(key, "")))
+    return int(match[0]) if match else default
+
+
+def _regionRows(
+    record: SeqRecord, clusterInfo: ClusterInfo, joinedProteins: str
+) -> tuple[dict, list[dict]]:
+    """Row of a region and rows of its protoclusters, on the contig."""
+    offset = _origPosition(record, "Orig. start", 0)
+    contigEdge = None
+    cores = {}
+    protoclusters = []
+    for feature in record.features:
+        qualifiers = feature.qualifiers
+        if feature.type == "region" and "contig_edge" in qualifiers:
+            contigEdge = qualifiers["contig_edge"][0] == "True"
+        elif feature.type == "proto_core":
+            cores[qualifiers["protocluster_number"][0]] = feature.location
+        elif feature.type == "protocluster":
+            protoclusters.append(feature)
+    protoclusterRows = []
+    for feature in protoclusters:
+        number = feature.qualifiers["protocluster_number"][0]
+        core = cores.get(number)
+        protoclusterRows.append(
+            {
+                "protoclusterNumber": int(number),
+                "product": feature.qualifiers["product"][0],
+                "category": feature.qualifiers.get("category", [None])[0],
+                "start": offset + int(feature.location.start),
+                "end": offset + int(feature.location.end),
+                "coreStart": None if core is None else offset + int(core.start),
+                "coreEnd": None if core is None else offset + int(core.end),
+            }
+        )
+    regionRow = {
+        "contig": clusterInfo["fromSequence"],
+        "regionNumber": int(findClusterNumberStr(clusterInfo["gbkFile"], True)),
+        "start": offset,
+        "end": _origPosition(record, "Orig. end", offset + len(record)),
+        "contigEdge": contigEdge,
+        "products": clusterInfo["gcProducts"],
+        "organism": clusterInfo["organism"],
+        "gbkFile": str(clusterInfo["gbkFile"]),
+        "fastaId": clusterInfo["fastaId"],
+        "coreRelativeLocs": ",".join(
+            str(loc) for loc in clusterInfo["coreRelativeLocs"]
+        ),
+        "proteinDigest": hashlib.md5(joinedProteins.encode()).hexdigest(),
+        "proteinLength": len(joinedProteins),
+    }
+    return regionRow, protoclusterRows
+
+
+def _catalogSource(source: Path, nflank: int) -> list[tuple[dict, list[dict]]]:
+    """Region and protocluster rows of one result zip or directory."""
+    if source.suffix == ".zip":
+        gbks = [
+            (source / member, member)
+            for member in listResultZip(source)["regionGbks"]
+        ]
+    else:
+        gbks = [(gbk, None) for gbk in sorted(source.rglob(clusterGbkGlobTxt))]
+    rows = []
+    for gbk, member in gbks:
+        if member is None:
+            record = SeqIO.read(gbk, "genbank")
+        else:
+            with openResultMember(source, member, "r") as fh:
+                record = SeqIO.read(fh, "genbank")
+        rows.append(
+            _regionRows(record, *clusterInfoOfRecord(record, gbk, nflank))
+        )
+    return rows
+
+
+def updateBgcCatalog(
+    catalogFile: Path,
+    sources: list[Path],
+    jobs: int = os.cpu_count() or 1,
+    nflank: int = 0,
+    removeMissing: bool = False,
+) -> int:
+    """
+    Add antiSMASH result zips or directories to the catalog, one genome
+    each. Genomes already in the catalog are read again only when their
+    source changed. With removeMissing, genomes whose source is gone from
+    disk are dropped. Returns the number of genomes read.
+    """
+    for source in sources:
+        if not source.exists():
+            logger.warning(f"Skipping missing antiSMASH result {source}")
+    sources = [s for s in sources if s.exists()]
+    conn = openBgcCatalog(catalogFile)
+    known = dict(conn.execute("SELECT genome, sourceStamp FROM genomes"))
+    stamps = {genomeOfSource(s): _sourceStamp(s) for s in sources}
+    todo = [
+        s
+        for s in sources
+        if known.get(genomeOfSource(s)) != stamps[genomeOfSource(s)]
+    ]
+    logger.info(
+        f"BGC catalog has {len(known)} genomes, reading {len(todo)} of "
+        f"{len(sources)} results."
+    )
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+        results = executor.map(
+            _catalogSource,
+            todo,
+            [nflank] * len(todo),
+            chunksize=max(1, len(todo) // (8 * max(1, jobs))),
+        )
+        # One transaction per genome, an interrupted update keeps the rest
+        for source, rows in zip(todo, results):
+            genome = genomeOfSource(source)
+            with conn:
+                conn.execute("DELETE FROM genomes WHERE genome = ?", (genome,))
+                conn.execute(
+                    "INSERT INTO genomes VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        genome,
+                        str(source),
+                        stamps[genome],
+                        rows[0][0]["organism"] if rows else None,
+                        len(rows),
+                        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    ),
+                )
+                for regionRow, protoclusterRows in rows:
+                    regionId = conn.execute(
+                        f"INSERT INTO regions ({', '.join(_REGION_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(_REGION_COLUMNS))})",
+                        [genome] + [regionRow[c] for c in _REGION_COLUMNS[1:]],
+                    ).lastrowid
+                    conn.executemany(
+                        "INSERT INTO protoclusters (regionId, "
+                        f"{', '.join(_PROTOCLUSTER_COLUMNS)}) VALUES "
+                        f"(?, {', '.join('?' * len(_PROTOCLUSTER_COLUMNS))})",
+                        [
+                            [regionId] + [p[c] for c in _PROTOCLUSTER_COLUMNS]
+                            for p in protoclusterRows
+                        ],
+                    )
+    if removeMissing:
+        gone = [
+            (genome,)
+            for genome, source in conn.execute(
+                "SELECT genome, source FROM genomes"
+            )
+            if not Path(source).exists()
+        ]
+        if gone:
+            logger.info(f"Removing {len(gone)} genomes without results.")
+            with conn:
+                conn.executemany("DELETE FROM genomes WHERE genome = ?", gone)
+    conn.close()
+    return len(todo)
+
+
+def regionsByProduct(catalogFile: Path, products: list[str]) -> pd.DataFrame:
+    """Regions with a protocluster of one of products, with the matching
+    protoclusters, one row per protocluster."""
+    conn = openBgcCatalog(catalogFile)
+    table = pd.read_sql_query(
+        "SELECT r.*, p.protoclusterNumber, p.product, p.category, "
+        "p.start AS protoclusterStart, p.end AS protoclusterEnd "
+        "FROM protoclusters p JOIN regions r USING (regionId) "
+        f"WHERE p.product IN ({', '.join('?' * len(products)) or 'NULL'}) "
+        "ORDER BY r.genome, r.contig, r.regionNumber",
+        conn,
+        params=products,
+    )
+    conn.close()
+    return table
+
+
+def regionsOfStrains(
+    catalogFile: Path,
+    genomes: list[str] | None = None,
+    organism: str | None = None,
+) -> pd.DataFrame:
+    """
+    Regions of the given genomes, and/or of organisms matching an SQL
+    LIKE pattern, e.g. organism="Paenibacillus_polymyxa%".
+    """
+    where = []
+    params: list[str] = []
+    if genomes is not None:
+        where.append(f"genome IN ({', '.join('?' * len(genomes)) or 'NULL'})")
+        params += genomes
+    if organism is not None:
+        where.append("organism LIKE ?")
+        params.append(organism)
+    conn = openBgcCatalog(catalogFile)
+    table = pd.read_sql_query(
+        "SELECT * FROM regions "
+        + (f"WHERE {' AND '.join(where)} " if where else "")
+        + "ORDER BY genome, contig, regionNumber",
+        conn,
+        params=params,
+    )
+    conn.close()
+    return table
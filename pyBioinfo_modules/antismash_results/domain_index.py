@@ -0,0 +1,302 @@
+############################################
+# Index the aSDomain order of every CDS in many antiSMASH results once,
+# then answer domain architecture queries over the whole collection, e.g.
+#     index = DomainIndex.load(ANTISMASH_OUT / DOMAIN_INDEX_FILE)
+#     index.query(r"PCP (Thioesterase)", products=("NRPS",))
+############################################
+
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+from Bio.SeqRecord import SeqRecord
+from pyBioinfo_modules.antismash_results.zip_reader import (
+    listResultZip,
+    openResultMember,
+)
+from pyBioinfo_modules.wrappers.antismash import (
+    DomainHit,
+    domainHitSeqRecord,
+    iterCdsDomains,
+)
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_INDEX_FILE = "antismash_domains.parquet"
+# Side file with the mtime of every indexed source, also of those without
+# domains, which have no rows in the index
+DOMAIN_INDEX_SOURCES_SUFFIX = ".sources.json"
+# One row per aSDomain, rows of a CDS are consecutive and in order
+DOMAIN_INDEX_COLUMNS = [
+    "source",
+    "sourceMtime",
+    "resultName",
+    "recordId",
+    "regionNumber",
+    "protoclusterNumber",
+    "product",
+    "locusTag",
+    # Running number of the CDS in its source
+    "cds",
+    "domain",
+    "domainId",
+    "translation",
+]
+# Separates the CDSs of a protocluster in the text that is searched
+CDS_SEPARATOR = "|"
+
+
+def _indexResult(source: Path) -> pd.DataFrame:
+    """Domain rows of one result JSON or result zip."""
+    if source.suffix == ".zip":
+        resultJson = listResultZip(source)["resultJson"]
+        if resultJson is None:
+            logger.warning(f"No result JSON in {source}")
+            return pd.DataFrame(columns=DOMAIN_INDEX_COLUMNS)
+        cdsList = iterCdsDomains(
+            source.with_suffix(".json"),
+            jsonHandle=openResultMember(source, resultJson),
+        )
+    else:
+        cdsList = iterCdsDomains(source)
+    rows = []
+    for i, cds in enumerate(cdsList):
+        for domain in cds["domains"]:
+            qualifiers = domain["qualifiers"]
+            rows.append(
+                (
+                    cds["resultName"],
+                    cds["recordId"],
+                    cds["regionNumber"],
+                    cds["protoclusterNumber"],
+                    cds["protoclusterProduct"],
+                    cds["locusTag"],
+                    i,
+                    qualifiers["aSDomain"][0],
+                    qualifiers["domain_id"][0],
+                    qualifiers["translation"][0],
+                )
+            )
+    table = pd.DataFrame(rows, columns=DOMAIN_INDEX_COLUMNS[2:])
+    table.insert(0, "sourceMtime", source.stat().st_mtime_ns)
+    table.insert(0, "source", str(source))
+    return table
+
+
+def domainIndexSourcesPath(indexFile: Path) -> Path:
+    return indexFile.with_name(indexFile.name + DOMAIN_INDEX_SOURCES_SUFFIX)
+
+
+def updateDomainIndex(
+    indexFile: Path,
+    sources: list[Path],
+    jobs: int = os.cpu_count() or 1,
+) -> pd.DataFrame:
+    """
+    Bring the Parquet domain index at indexFile up to date with sources,
+    antiSMASH result JSONs or result zips: only new or changed sources
+    are read, rows of sources that are gone are dropped. Sources read are
+    kept in domainIndexSourcesPath(indexFile), with or without domains.
+    """
+    table = pd.read_parquet(indexFile) if indexFile.is_file() else None
+    current = {str(f): f.stat().st_mtime_ns for f in sources}
+    sourcesFile = domainIndexSourcesPath(indexFile)
+    if table is not None:
+        if sourcesFile.is_file():
+            with sourcesFile.open("r") as fh:
+                known = json.load(fh)
+        else:
+            known = (
+                table.drop_duplicates("source")
+                .set_index("source")["sourceMtime"]
+                .to_dict()
+            )
+        table = table[table["source"].map(current).eq(table["sourceMtime"])]
+        todo = [f for f in sources if known.get(str(f)) != current[str(f)]]
+        if not todo and known.keys() <= current.keys():
+            return table
+    else:
+        todo = list(sources)
+    logger.info(f"Indexing domains of {len(todo)} of {len(sources)} results.")
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+        new = list(
+            executor.map(
+                _indexResult,
+                todo,
+                chunksize=max(1, len(todo) // (4 * max(1, jobs))),
+            )
+        )
+    parts = ([table] if table is not None else []) + [t for t in new if len(t)]
+    table = (
+        pd.concat(parts, ignore_index=True)
+        if parts
+        else pd.DataFrame(columns=DOMAIN_INDEX_COLUMNS)
+    )
+    # Sources are kept together, so rows of a CDS stay consecutive
+    table = table.sort_values(["source", "cds"], kind="stable")
+    table = table.astype(
+        {
+            "regionNumber": "int32",
+            "protoclusterNumber": "int32",
+            "cds": "int32",
+            "sourceMtime": "int64",
+            "product": "category",
+            "domain": "category",
+        }
+    ).reset_index(drop=True)
+    tmpFile = indexFile.with_name(indexFile.name + ".part")
+    table.to_parquet(tmpFile, index=False)
+    tmpFile.replace(indexFile)
+    # Written after the index, a stale side file only causes a re-read
+    tmpFile = sourcesFile.with_name(sourcesFile.name + ".part")
+    with tmpFile.open("w") as fh:
+        json.dump(current, fh)
+    tmpFile.replace(sourcesFile)
+    return table
+
+
+class DomainIndex:
+    """
+    Domain architecture queries over a domain index table.
+
+    The domains of each CDS (scope "cds") or protocluster (scope
+    "protocluster") are searched as text: domain names separated by a
+    space, with CDS_SEPARATOR between the CDSs of a protocluster, e.g.
+        "Condensation_Starter AMP-binding PCP | Condensation_LCL ..."
+    A query is a regular expression over that text that matches whole
+    domain names only. Use \\S+ for any domain, and groups to pick the
+    domains to return, all domains of a match without groups, e.g.
+        index.query(r"(PKS_KS) PKS_AT (?:\\S+ )*ACP")
+    """
+
+    __slots__ = ("table", "_names", "_texts", "_cdsBounds")
+
+    def __init__(self, table: pd.DataFrame):
+        self.table = table.reset_index(drop=True)
+        self._names = self.table["domain"].astype(str).to_numpy().astype(str)
+        self._texts: dict[tuple, tuple[str, np.ndarray, np.ndarray]] = {}
+        cds = (
+            self.table["source"].astype(str)
+            + "\t"
+            + self.table["cds"].astype(str)
+        ).to_numpy()
+        starts = np.flatnonzero(np.r_[True, cds[1:] != cds[:-1]])
+        ends = np.r_[starts[1:], len(cds)]
+        sizes = ends - starts
+        # First and last + 1 row of the CDS of each row
+        self._cdsBounds = (
+            np.repeat(starts, sizes),
+            np.repeat(ends, sizes),
+        )
+
+    @classmethod
+    def load(cls, indexFile: Path) -> "DomainIndex":
+        return cls(pd.read_parquet(indexFile))
+
+    def _text(
+        self,
+        scope: Literal["cds", "protocluster"],
+        products: list[str] | tuple[str, ...] | None,
+    ) -> tuple[str, np.ndarray, np.ndarray]:
+        """
+        Searched text of the rows with products, offsets of the domain
+        names in it and their row numbers. Built once per scope and
+        products.
+        """
+        # Lists are not hashable, and the order of products does not matter
+        if products is not None:
+            products = tuple(sorted(set(products)))
+        key = (scope, products)
+        if key in self._texts:
+            return self._texts[key]
+        table = self.table
+        rows = np.arange(len(table))
+        if products is not None:
+            rows = rows[table["product"].isin(products).to_numpy()]
+        names = self._names[rows]
+        cdsStart = self._cdsBounds[0][rows]
+        newCds = np.r_[True, cdsStart[1:] != cdsStart[:-1]]
+        if scope == "cds":
+            newGroup = newCds
+        else:
+            unit = (
+                table["source"].astype(str)
+                + "\t"
+                + table["recordId"].astype(str)
+                + "\t"
+                + table["protoclusterNumber"].astype(str)
+            ).to_numpy()[rows]
+            newGroup = np.r_[True, unit[1:] != unit[:-1]]
+        # Each name is preceded by "\n" (new group), " | " (new CDS of a
+        # protocluster) or " ", so the offset of name i is known up front
+        prefixes = np.where(
+            newGroup, "\n", np.where(newCds, f" {CDS_SEPARATOR} ", " ")
+        )
+        pieces = np.char.add(prefixes.astype(str), names)
+        offsets = np.cumsum(np.char.str_len(pieces)) - np.char.str_len(names)
+        text = "".join(pieces.tolist()) + "\n"
+        self._texts[key] = (text, offsets, rows)
+        return self._texts[key]
+
+    def queryRows(
+        self,
+        pattern: str,
+        scope: Literal["cds", "protocluster"] = "cds",
+        products: list[str] | tuple[str, ...] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Domain rows picked by pattern, with the number of the match in
+        column "match".
+        """
+        text, offsets, rows = self._text(scope, products)
+        regex = re.compile(rf"(?<![^ \n])(?:{pattern})(?![^ \n])")
+        picked = []
+        matchNumbers = []
+        for n, match in enumerate(regex.finditer(text)):
+            groups = range(1, regex.groups + 1) if regex.groups else [0]
+            spans = [match.span(g) for g in groups if match.start(g) != -1]
+            for start, end in spans:
+                first, last = np.searchsorted(offsets, [start, end])
+                picked.append(rows[first:last])
+                matchNumbers.append(np.full(last - first, n))
+        if not picked:
+            return self.table.iloc[:0].assign(match=pd.Series(dtype=int))
+        picked = np.concatenate(picked)
+        result = self.table.iloc[picked].assign(
+            match=np.concatenate(matchNumbers)
+        )
+        return result[~result.index.duplicated()]
+
+    def query(
+        self,
+        pattern: str,
+        scope: Literal["cds", "protocluster"] = "cds",
+        products: list[str] | tuple[str, ...] | None = None,
+    ) -> list[SeqRecord]:
+        """Domains picked by pattern, as find_NRPS_TE_domain() gives them."""
+        result = self.queryRows(pattern, scope, products)
+        seqRecords = []
+        for i, row in zip(result.index, result.itertuples(index=False)):
+            start, end = self._cdsBounds[0][i], self._cdsBounds[1][i]
+            seqRecords.append(
+                domainHitSeqRecord(
+                    DomainHit(
+                        pattern=pattern,
+                        resultName=row.resultName,
+                        recordId=row.recordId,
+                        regionNumber=row.regionNumber,
+                        protoclusterNumber=row.protoclusterNumber,
+                        locusTag=row.locusTag,
+                        domainId=row.domainId,
+                        cdsDomains=self._names[start:end].tolist(),
+                        translation=row.translation,
+                    )
+                )
+            )
+        return seqRecords
@@ -0,0 +1,180 @@
+############################################
+# Read antiSMASH results from the consolidated result zips, without
+# unpacking them. Only the central directory of a zip is read to list it,
+# and listings of many zips are kept in an index file next to them.
+############################################
+
+import io
+import json
+import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path, PurePath
+from typing import IO, Iterator, TypedDict
+
+from Bio.SeqRecord import SeqRecord
+from pyBioinfo_modules.wrappers.antismash import (
+    ClusterInfo,
+    clusterGbkGlobTxt,
+    find_NRPS_TE_domain,
+    parseClusterGbk,
+)
+
+logger = logging.getLogger(__name__)
+
+# Listings of all zips in a directory, see scanResultZips()
+RESULT_ZIP_INDEX_FILE = "antismash_zip_index.json"
+
+
+class ResultZipContents(TypedDict):
+    zipFile: Path
+    # Main result JSON, None for incomplete runs
+    resultJson: str | None
+    regionGbks: list[str]
+
+
+def _zipStamp(zipFile: Path) -> tuple[int, int]:
+    stat = zipFile.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+@lru_cache(maxsize=16)
+def _openResultZip(
+    zipFile: str, stamp: tuple[int, int], pid: int
+) -> zipfile.ZipFile:
+    """
+    Open archives are kept, a zip replaced on disk is opened again. Forked
+    workers open their own, a handle of the parent shares its file offset.
+    """
+    return zipfile.ZipFile(zipFile)
+
+
+def _resultZip(zipFile: Path) -> zipfile.ZipFile:
+    return _openResultZip(str(zipFile), _zipStamp(zipFile), os.getpid())
+
+
+def listResultZip(zipFile: Path) -> ResultZipContents:
+    """Result JSON and region gbks in an antiSMASH result zip."""
+    names = _resultZip(zipFile).namelist()
+    jsons = [n for n in names if "/" not in n and n.endswith(".json")]
+    # <genome>.json, other top level JSONs are unexpected
+    resultJson = next(
+        (n for n in jsons if n == f"{zipFile.stem}.json"),
+        jsons[0] if len(jsons) == 1 else None,
+    )
+    return ResultZipContents(
+        zipFile=zipFile,
+        resultJson=resultJson,
+        regionGbks=sorted(
+            n for n in names if PurePath(n).match(clusterGbkGlobTxt)
+        ),
+    )
+
+
+def scanResultZips(
+    zipFiles: list[Path],
+    indexFile: Path | None = None,
+    jobs: int = 8,
+) -> list[ResultZipContents]:
+    """
+    listResultZip() of many zips. With indexFile, listings are kept there
+    and only zips that are new or changed (size, mtime) are opened again,
+    e.g. scanResultZips(
+        sorted(ANTISMASH_OUT.glob("*.zip")),
+        ANTISMASH_OUT / RESULT_ZIP_INDEX_FILE,
+    )
+    """
+    index: dict[str, dict] = {}
+    if indexFile is not None and indexFile.is_file():
+        try:
+            with indexFile.open("r") as fh:
+                index = json.load(fh)
+        except ValueError:
+            logger.warning(f"Ignoring unreadable zip index {indexFile}")
+    stamps = {str(f): list(_zipStamp(f)) for f in zipFiles}
+    todo = [
+        f
+        for f in zipFiles
+        if index.get(str(f), {}).get("stamp") != stamps[str(f)]
+    ]
+    if todo:
+        logger.info(f"Listing {len(todo)} of {len(zipFiles)} result zips.")
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            for zipFile, contents in zip(
+                todo, executor.map(listResultZip, todo)
+            ):
+                index[str(zipFile)] = {
+                    "stamp": stamps[str(zipFile)],
+                    "resultJson": contents["resultJson"],
+                    "regionGbks": contents["regionGbks"],
+                }
+        if indexFile is not None:
+            # Zips removed from the list are dropped from the index
+            index = {k: v for k, v in index.items() if k in stamps}
+            tmpFile = indexFile.with_name(indexFile.name + ".part")
+            with tmpFile.open("w") as fh:
+                json.dump(index, fh)
+            tmpFile.replace(indexFile)
+    return [
+        ResultZipContents(
+            zipFile=f,
+            resultJson=index[str(f)]["resultJson"],
+            regionGbks=index[str(f)]["regionGbks"],
+        )
+        for f in zipFiles
+    ]
+
+
+def openResultMember(
+    zipFile: Path, member: str, mode: str = "rb", encoding: str = "utf-8"
+) -> IO:
+    """Open one file of a result zip for streaming reads."""
+    assert mode in ("r", "rt", "rb"), "Only reading is supported."
+    handle = _resultZip(zipFile).open(member)
+    if mode == "rb":
+        return handle
+    return io.TextIOWrapper(handle, encoding=encoding)
+
+
+def iterRegionGbks(
+    contents: list[ResultZipContents],
+) -> Iterator[tuple[Path, str]]:
+    """(zip, member) of all region gbks, e.g. of scanResultZips()."""
+    for c in contents:
+        for member in c["regionGbks"]:
+            yield c["zipFile"], member
+
+
+def parseZipClusterGbks(
+    zipFile: Path,
+    proteinFastaDir: Path,
+    nflank: int = 0,
+) -> list[ClusterInfo]:
+    """
+    parseClusterGbk() on the region gbks of one result zip. gbkFile of the
+    records is zipFile / member. For all zips at once see
+    parseClusterGbks(), which also takes a list of zips.
+    """
+    clusterInfos = []
+    for member in listResultZip(zipFile)["regionGbks"]:
+        with openResultMember(zipFile, member, "r") as fh:
+            clusterInfos.append(
+                parseClusterGbk(
+                    zipFile / member, proteinFastaDir, nflank=nflank, handle=fh
+                )
+            )
+    return clusterInfos
+
+
+def findZipNRPS_TE_domain(zipFile: Path) -> list[SeqRecord]:
+    """find_NRPS_TE_domain() on the result JSON of a zip."""
+    resultJson = listResultZip(zipFile)["resultJson"]
+    if resultJson is None:
+        logger.warning(f"No result JSON in {zipFile}")
+        return []
+    return find_NRPS_TE_domain(
+        zipFile.with_suffix(".json"),
+        jsonHandle=openResultMember(zipFile, resultJson),
+    )
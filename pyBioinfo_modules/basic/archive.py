@@ -0,0 +1,544 @@
+############################################
+# Pack result directories into compressed tarballs, check the tarball and
+# remove the archived files that are not needed in place any more.
+############################################
+
+import io
+import json
+import logging
+import lzma
+import os
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+from typing import IO, Callable, Iterator, TypedDict
+
+from pyBioinfo_modules.basic.decompress import (
+    compressBytes,
+    decompressBytes,
+    openCompressed,
+    openCompressedWriter,
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_INDEX_SUFFIX = ".index.json"
+# A seekable archive is a series of independently compressed frames, cut
+# between members once this many uncompressed bytes are collected.
+SEEKABLE_FRAME_SIZE = 4 << 20
+
+
+class ArchiveResult(TypedDict):
+    directory: Path
+    archive: Path
+    archived: int
+    removed: int
+    kept: int
+    seconds: float
+    ok: bool
+
+
+def archiveIndexPath(archivePath: Path) -> Path:
+    """Side file listing frames and members of a seekable archive."""
+    return archivePath.with_name(archivePath.name + ARCHIVE_INDEX_SUFFIX)
+
+
+def scanDirectory(directory: Path) -> dict[str, int]:
+    """
+    Relative path -> size of all files below directory, with one
+    os.scandir() per (sub)directory. Symlinks are left out.
+    """
+    files: dict[str, int] = {}
+    stack = [(directory, "")]
+    while stack:
+        path, prefix = stack.pop()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), name + "/"))
+                elif entry.is_file(follow_symlinks=False):
+                    files[name] = entry.stat(follow_symlinks=False).st_size
+    return files
+
+
+def _writeTar(
+    directory: Path,
+    names: list[str],
+    archivePath: Path,
+    compressionFormat: str,
+    threads: int,
+    level: int | None,
+) -> None:
+    """One compressed stream, the compression program gets all threads."""
+    with openCompressedWriter(
+        archivePath, compressionFormat, threads=threads, level=level
+    ) as out:
+        with tarfile.open(fileobj=out, mode="w|") as tar:
+            for name in names:
+                tar.add(directory / name, arcname=name, recursive=False)
+
+
+class _TarSink:
+    """Write end for tarfile, collects the uncompressed tar stream."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offset = 0
+
+    def write(self, b) -> int:
+        self.buffer += b
+        self.offset += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self.offset
+
+
+def _addFiles(
+    directory: Path, names: list[str]
+) -> Callable[[tarfile.TarFile], Iterator[tarfile.TarInfo]]:
+    """Member writer for _writeSeekableTar(): files of a directory."""
+
+    def addMembers(tar: tarfile.TarFile) -> Iterator[tarfile.TarInfo]:
+        for name in names:
+            info = tar.gettarinfo(directory / name, arcname=name)
+            with open(directory / name, "rb") as fh:
+                tar.addfile(info, fh)
+            yield info
+
+    return addMembers
+
+
+def _writeSeekableTar(
+    addMembers: Callable[[tarfile.TarFile], Iterator[tarfile.TarInfo]],
+    archivePath: Path,
+    indexPath: Path,
+    compressionFormat: str,
+    threads: int,
+    level: int | None,
+) -> None:
+    """
+    Frames are compressed in parallel and concatenated, which is still a
+    valid .tar.xz/.tar.zst/.tar.gz. No member spans two frames, so the
+    index (member -> frame, offset in frame, size) is enough to read one
+    member by decompressing only its frame.
+
+    addMembers adds members to the tar one by one, yielding each TarInfo.
+    Frames are written in order as they are done, with at most 2 * threads
+    frames in memory.
+    """
+    sink = _TarSink()
+    # (uncompressed start, length, future) of frames not written yet
+    pending: deque = deque()
+    # At most this many frames are held in memory, compressed or not
+    maxPending = 2 * max(1, threads)
+    members: dict[str, list[int]] = {}
+    frameTable = []
+    nFrames = 0
+    frameStart = 0
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor, open(
+        archivePath, "wb"
+    ) as out:
+
+        def writeFrame():
+            start, length, future = pending.popleft()
+            data = future.result()
+            frameTable.append([out.tell(), len(data), start, length])
+            out.write(data)
+
+        def cutFrame():
+            nonlocal frameStart, nFrames
+            data = bytes(sink.buffer)
+            sink.buffer.clear()
+            if len(pending) >= maxPending:
+                writeFrame()
+            pending.append(
+                (
+                    frameStart,
+                    len(data),
+                    executor.submit(
+                        compressBytes, data, compressionFormat, level
+                    ),
+                )
+            )
+            nFrames += 1
+            frameStart = sink.offset
+
+        with tarfile.open(fileobj=sink, mode="w") as tar:
+            for info in addMembers(tar):
+                if info.isfile():
+                    padded = (
+                        -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+                    )
+                    members[info.name] = [
+                        nFrames,
+                        sink.offset - padded - frameStart,
+                        info.size,
+                    ]
+                if len(sink.buffer) >= SEEKABLE_FRAME_SIZE:
+                    cutFrame()
+        # End of archive blocks
+        cutFrame()
+        while pending:
+            writeFrame()
+        archiveSize = out.tell()
+
+    with open(indexPath, "w") as fh:
+        json.dump(
+            {
+                "format": compressionFormat,
+                "archiveSize": archiveSize,
+                # compressed offset, compressed size,
+                # uncompressed offset, uncompressed size
+                "frames": frameTable,
+                # frame, offset in frame, size
+                "members": members,
+            },
+            fh,
+        )
+
+
+def readArchiveIndex(
+    archivePath: Path, indexPath: Path | None = None
+) -> dict | None:
+    indexPath = indexPath or archiveIndexPath(archivePath)
+    if not indexPath.is_file():
+        return None
+    with indexPath.open("r") as fh:
+        return json.load(fh)
+
+
+def createArchive(
+    directory: Path,
+    names: list[str],
+    archivePath: Path,
+    threads: int = 1,
+    seekable: bool = False,
+    level: int | None = None,
+) -> None:
+    """
+    Pack directory/names into archivePath, compressed by its suffix.
+    Files are written under temporary names and renamed when complete.
+    """
+    compressionFormat = archivePath.suffix
+    tmpArchive = archivePath.with_name(archivePath.name + ".part")
+    indexPath = archiveIndexPath(archivePath)
+    tmpIndex = indexPath.with_name(indexPath.name + ".part")
+    try:
+        if seekable:
+            _writeSeekableTar(
+                _addFiles(directory, names),
+                tmpArchive,
+                tmpIndex,
+                compressionFormat,
+                threads,
+                level,
+            )
+            tmpIndex.replace(indexPath)
+        else:
+            _writeTar(
+                directory, names, tmpArchive, compressionFormat, threads, level
+            )
+        tmpArchive.replace(archivePath)
+    finally:
+        for f in (tmpArchive, tmpIndex):
+            if f.exists():
+                f.unlink()
+
+
+def makeArchiveSeekable(
+    archivePath: Path, threads: int = 1, level: int | None = None
+) -> bool:
+    """
+    Rewrite an archive made without index (e.g. by tar | xz) as a seekable
+    one, in one streaming pass. The old archive is replaced only if the new
+    one holds the same files. Returns True on success.
+    """
+    ownNames = {archivePath.name, archiveIndexPath(archivePath).name}
+    listing: dict[str, int] = {}
+
+    def addMembers(tar: tarfile.TarFile) -> Iterator[tarfile.TarInfo]:
+        with openCompressed(archivePath, "rb") as fh, tarfile.open(
+            fileobj=fh, mode="r|"
+        ) as old:
+            for info in old:
+                info.name = info.name.removeprefix("./")
+                # tar run inside the directory may have caught the archive
+                if info.name in ownNames:
+                    continue
+                if info.isfile():
+                    listing[info.name] = info.size
+                    tar.addfile(info, old.extractfile(info))
+                else:
+                    tar.addfile(info)
+                yield info
+
+    # Keeps the compression suffix, verifyArchive() reads the new archive
+    tmpArchive = archivePath.with_name(
+        archivePath.stem + ".seekable" + archivePath.suffix
+    )
+    indexPath = archiveIndexPath(archivePath)
+    tmpIndex = indexPath.with_name(indexPath.name + ".part")
+    try:
+        _writeSeekableTar(
+            addMembers,
+            tmpArchive,
+            tmpIndex,
+            archivePath.suffix,
+            threads,
+            level,
+        )
+        # Check against the listing of the old archive before replacing it
+        if not verifyArchive(tmpArchive, listing, tmpIndex):
+            return False
+        tmpArchive.replace(archivePath)
+        tmpIndex.replace(indexPath)
+    except (OSError, EOFError, tarfile.TarError, lzma.LZMAError) as e:
+        logger.error(f"Cannot make {archivePath} seekable: {e}")
+        return False
+    finally:
+        for f in (tmpArchive, tmpIndex):
+            if f.exists():
+                f.unlink()
+    return True
+
+
+def verifyArchive(
+    archivePath: Path,
+    expected: dict[str, int],
+    indexPath: Path | None = None,
+) -> bool:
+    """
+    True if archivePath can be read to the end and holds every file of
+    expected (relative path -> size) with the same size.
+    """
+    try:
+        archiveSize = archivePath.stat().st_size
+        index = readArchiveIndex(archivePath, indexPath)
+        if archiveSize == 0 or (
+            index is not None and index["archiveSize"] != archiveSize
+        ):
+            logger.error(f"Archive {archivePath} has a wrong size.")
+            return False
+        listing: dict[str, int] = {}
+        with openCompressed(archivePath, "rb") as fh, tarfile.open(
+            fileobj=fh, mode="r|"
+        ) as tar:
+            for info in tar:
+                if info.isfile():
+                    listing[info.name.removeprefix("./")] = info.size
+    except (OSError, EOFError, tarfile.TarError, lzma.LZMAError) as e:
+        logger.error(f"Cannot read archive {archivePath}: {e}")
+        return False
+    missing = [
+        name for name, size in expected.items() if listing.get(name) != size
+    ]
+    if missing:
+        logger.error(
+            f"{len(missing)} files missing or different in {archivePath}, "
+            f"e.g. {missing[0]}"
+        )
+        return False
+    return True
+
+
+@lru_cache(maxsize=64)
+def _cachedArchiveIndex(indexPath: str, mtime: int) -> dict:
+    with open(indexPath, "r") as fh:
+        return json.load(fh)
+
+
+def listArchivedMembers(archivePath: Path) -> dict[str, int]:
+    """Member name -> size of the files in an archive."""
+    indexPath = archiveIndexPath(archivePath)
+    if indexPath.is_file():
+        index = _cachedArchiveIndex(
+            str(indexPath), indexPath.stat().st_mtime_ns
+        )
+        return {name: m[2] for name, m in index["members"].items()}
+    with openCompressed(archivePath, "rb") as fh, tarfile.open(
+        fileobj=fh, mode="r|"
+    ) as tar:
+        return {
+            info.name.removeprefix("./"): info.size
+            for info in tar
+            if info.isfile()
+        }
+
+
+def openArchivedMember(
+    archivePath: Path,
+    member: str,
+    mode: str = "rb",
+    encoding: str | None = None,
+) -> IO:
+    """
+    Open one file of an archive for reading, e.g.
+        openArchivedMember(d / f"{d.name}_bakta.tar.xz", f"{d.name}.gff3")
+
+    With an index (seekable archive) only the frame holding the member is
+    read and decompressed. Otherwise the archive is decompressed up to the
+    member, see makeArchiveSeekable().
+    """
+    assert mode in ("r", "rt", "rb"), "Only reading is supported."
+    member = member.removeprefix("./")
+    indexPath = archiveIndexPath(archivePath)
+    if indexPath.is_file():
+        index = _cachedArchiveIndex(
+            str(indexPath), indexPath.stat().st_mtime_ns
+        )
+        if member not in index["members"]:
+            raise KeyError(f"{member} not in {archivePath}")
+        frame, offset, size = index["members"][member]
+        frameOffset, frameSize = index["frames"][frame][:2]
+        with open(archivePath, "rb") as fh:
+            fh.seek(frameOffset)
+            data = decompressBytes(fh.read(frameSize), index["format"])
+        handle = io.BytesIO(data[offset : offset + size])
+    else:
+        logger.debug(f"No index for {archivePath}, scanning the archive.")
+        with openCompressed(archivePath, "rb") as fh, tarfile.open(
+            fileobj=fh, mode="r|"
+        ) as tar:
+            for info in tar:
+                if info.isfile() and info.name.removeprefix("./") == member:
+                    handle = io.BytesIO(tar.extractfile(info).read())
+                    break
+            else:
+                raise KeyError(f"{member} not in {archivePath}")
+    if mode == "rb":
+        return handle
+    return io.TextIOWrapper(handle, encoding=encoding)
+
+
+def pruneDirectory(directory: Path, names: list[str]) -> int:
+    """Remove directory/names and sub directories left empty."""
+    removed = 0
+    for name in names:
+        try:
+            (directory / name).unlink()
+            removed += 1
+        except OSError as e:
+            logger.error(f"Failed to remove {directory / name}: {e}")
+    subDirs = {str(Path(name).parent) for name in names if "/" in name}
+    for subDir in sorted(subDirs, key=len, reverse=True):
+        try:
+            (directory / subDir).rmdir()
+        except OSError:
+            pass
+    return removed
+
+
+def archiveAndPrune(
+    directory: Path,
+    archivePath: Path,
+    keep: Callable[[str], bool] = lambda name: False,
+    threads: int = 1,
+    seekable: bool = False,
+    level: int | None = None,
+) -> ArchiveResult:
+    """
+    Archive all files of directory into archivePath (unless it exists),
+    verify the archive, then remove the files for which keep(relative
+    path) is False. Nothing is removed if the archive does not check out.
+    """
+    ts = time.time()
+    files = scanDirectory(directory)
+    # The archive may live in the directory it archives
+    if archivePath.parent.resolve() == directory.resolve():
+        for ownFile in (archivePath, archiveIndexPath(archivePath)):
+            for name in (ownFile.name, ownFile.name + ".part"):
+                files.pop(name, None)
+    result = ArchiveResult(
+        directory=directory,
+        archive=archivePath,
+        archived=len(files),
+        removed=0,
+        kept=0,
+        seconds=0.0,
+        ok=False,
+    )
+
+    if archivePath.exists():
+        logger.info(f"Archive already exists: {archivePath.name}")
+        if seekable and not archiveIndexPath(archivePath).exists():
+            logger.info(f"Making {archivePath.name} seekable")
+            makeArchiveSeekable(archivePath, threads=threads, level=level)
+    else:
+        logger.info(f"Creating archive: {archivePath.name}")
+        try:
+            createArchive(
+                directory,
+                sorted(files),
+                archivePath,
+                threads=threads,
+                seekable=seekable,
+                level=level,
+            )
+        except (OSError, tarfile.TarError) as e:
+            logger.error(f"Failed to create archive {archivePath.name}: {e}")
+            result["seconds"] = time.time() - ts
+            return result
+
+    toRemove = [name for name in files if not keep(name)]
+    result["kept"] = len(files) - len(toRemove)
+    if toRemove and not verifyArchive(
+        archivePath, {name: files[name] for name in toRemove}
+    ):
+        logger.error(f"Keep files of {directory}, archive check failed.")
+        result["seconds"] = time.time() - ts
+        return result
+    result["removed"] = pruneDirectory(directory, toRemove)
+    result["ok"] = result["removed"] == len(toRemove)
+    result["seconds"] = time.time() - ts
+    logger.info(
+        f"{directory.name}: kept {result['kept']} files, "
+        f"removed {result['removed']} archived files."
+    )
+    return result
+
+
+def archiveAndPruneDirectories(
+    directories: list[Path],
+    archivePathOf: Callable[[Path], Path],
+    keep: Callable[[str], bool] = lambda name: False,
+    totalThreads: int = os.cpu_count() or 1,
+    jobs: int = 4,
+    seekable: bool = False,
+    level: int | None = None,
+) -> list[ArchiveResult]:
+    """
+    archiveAndPrune() for many directories, jobs at a time, sharing
+    totalThreads between them. archivePathOf gives the archive of a
+    directory.
+    """
+    if not directories:
+        return []
+    jobs = max(1, min(jobs, len(directories)))
+    threads = max(1, totalThreads // jobs)
+    results: list[ArchiveResult] = []
+    # Threads are enough: compression runs in external programs or in
+    # lzma/zlib code that releases the GIL.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                archiveAndPrune,
+                d,
+                archivePathOf(d),
+                keep,
+                threads,
+                seekable,
+                level,
+            )
+            for d in directories
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+    failed = [r["directory"].name for r in results if not r["ok"]]
+    if failed:
+        logger.warning(f"{len(failed)} directories not cleaned: {failed}")
+    return results
@@ -1,117 +1,288 @@
-############################################
-# by Chao DU
-# Institute of Biology Leiden
-# Leiden University
-# c.du@biology.leidenuniv.nl
-# durand[dot]dc[at]hot[no space]mail.com
-############################################
-# Designed in mind that all types of data can be calculated
-# resulting the same hash across platform.
-# Should be safe with nested dict but no guarantee
-################################################################
-
-import json
-import os
-from collections import OrderedDict
-from hashlib import md5
-
-# Optional imports
-import pandas as pd
-from sklearn.cross_decomposition import PLSRegression as PLS
-from sklearn.decomposition import PCA
-
-
-def calHash(*args) -> str:
-    """Produce 6 digit string with unlimited number of arguments passed in
-    Designed in mind that all types of data can be calculated
-    resulting the same hash across platform.
-    Should be safe with nested dict but no guarantee
-    """
-
-    def orderDict(di):
-        try:
-            d = di.copy()
-        except BaseException:
-            d = di
-        if isinstance(d, dict):
-            od = OrderedDict(sorted(d.items()))
-            for k, v in od.items():
-                v = orderDict(v)
-                od[str(k)] = v
-            d = od
-        elif isinstance(d, (list, tuple, set)):
-            d = [orderDict(el) for el in d]
-        else:
-            d = str(d).strip()
-        return d
-
-    def hashDict(di):
-        od = orderDict(di)
-        ha = md5(
-            json.dumps(
-                od, sort_keys=True, ensure_ascii=True, default=str
-            ).encode()
-        ).digest()
-        return ha
-
-    haRaw = "".encode()
-    for arg in args:
-        if isinstance(arg, str):
-            if os.path.isfile(arg):
-                # Do not think about making a dir recognisable.
-                with open(arg, "rb") as f:
-                    haRaw += md5(f.read()).digest()
-            else:
-                haRaw += arg.encode()
-        elif isinstance(arg, set):
-            haRaw += str(sorted(list())).encode()
-        elif isinstance(arg, dict):
-            haRaw += hashDict(arg)
-        elif isinstance(arg, pd.core.frame.DataFrame) or isinstance(
-            arg, pd.core.series.Series
-        ):
-            haRaw += md5(arg.to_json().encode()).digest()
-        elif isinstance(arg, PCA):
-            haRaw += arg.components_.tobytes()
-        elif isinstance(arg, PLS):
-            haRaw += arg.x_loadings_.tobytes()
-        elif isinstance(arg, bytes):
-            haRaw += arg
-        else:
-            haRaw += str(arg).encode()
-    return md5(haRaw).hexdigest()[:6]
-
-
-# TEST
-if __name__ == "__main__":
-    import warnings
-
-    import numpy as np
-
-    warnings.filterwarnings("ignore")
-    tmpfile = "abc.tmp"
-    with open(tmpfile, "wb") as tf:
-        tf.write("iviviv".encode())
-    a = pd.DataFrame(dict(a=[1, 2], b=[3, 4]), index=[1, 2])
-    b = dict(x="iv", y="83", z=dict(i=0, u=5, k=dict(kj="kj", hs="qf")))
-    c = "avb"
-    d = 1
-    e = PLS()
-    e.fit(np.linspace(1, 100, 50).reshape(-1, 2).T, [[1], [1.5]])
-    f = PCA()
-    f.fit(np.linspace(4, 5, 100).reshape(-1, 5))
-    ha = calHash(a, b, c, d, e, f, tmpfile)
-    correctHa = "89c28a"
-    if ha == correctHa:
-        print("Test OK")
-    else:
-        print(f"Test fail, previous ha is {correctHa}, current ha is {ha}")
-        print(f"a now {calHash(a)} - previous 177438")
-        print(f"b now {calHash(b)} - previous 9536de")
-        print(f"c now {calHash(c)} - previous 539183")
-        print(f"d now {calHash(d)} - previous c4ca42")
-        print(f"e now {calHash(e)} - previous 8889c7")
-        print(f"f now {calHash(f)} - previous 5473de")
-        print(f"tmpfile now {calHash(tmpfile)} - previous")
-
-    os.remove(tmpfile)
+############################################
+# by Chao DU
+# Institute of Biology Leiden
+# Leiden University
+# c.du@biology.leidenuniv.nl
+# durand[dot]dc[at]hot[no space]mail.com
+############################################
+# Designed in mind that all types of data can be calculated
+# resulting the same hash across platform.
+# Should be safe with nested dict but no guarantee
+################################################################
+
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Hash schemes are versioned so that old hashes stay reproducible.
+# 1: md5 everywhere, the original calHash.
+# 2: blake2b, faster on 64 bit machines, no extra dependency.
+# 3: xxh3_128, fastest, needs the xxhash package.
+HASH_SCHEMES: dict[int, str] = {1: "md5", 2: "blake2b", 3: "xxh3_128"}
+DEFAULT_HASH_SCHEME = 1
+
+# Objects of optional packages are recognised by module and class name, so
+# importing this module does not pull in pandas or sklearn.
+# (package, class names, how to turn the object into bytes)
+_OPTIONAL_TYPES: list[tuple[str, tuple[str, ...], str]] = [
+    ("pandas", ("DataFrame", "Series"), "json"),
+    ("sklearn", ("PCA",), "components_"),
+    ("sklearn", ("PLSRegression",), "x_loadings_"),
+]
+
+HASH_CHUNK_SIZE = 1 << 20
+# Files smaller than this are hashed faster than the digest cache is read.
+DIGEST_CACHE_MIN_SIZE = 1 << 20
+DIGEST_CACHE_FILE: Path = Path(
+    os.environ.get(
+        "PYBIOINFO_DIGEST_CACHE",
+        Path.home() / ".cache" / "pyBioinfo_modules" / "file_digests.sqlite",
+    )
+)
+_digestCacheLocal = threading.local()
+
+
+def _newHasher(algorithm: str):
+    if algorithm == "xxh3_128":
+        try:
+            import xxhash
+        except ImportError as e:
+            raise ImportError(
+                "Hash scheme with xxh3_128 needs the xxhash package."
+            ) from e
+        return xxhash.xxh3_128()
+    return hashlib.new(algorithm)
+
+
+def _digestCache() -> sqlite3.Connection | None:
+    """One connection per thread and process, None if unusable."""
+    pid = os.getpid()
+    if getattr(_digestCacheLocal, "pid", None) != pid:
+        try:
+            DIGEST_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(DIGEST_CACHE_FILE, timeout=30)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS digests ("
+                "path TEXT, algorithm TEXT, inode INTEGER, size INTEGER, "
+                "mtime_ns INTEGER, digest BLOB, "
+                "PRIMARY KEY (path, algorithm))"
+            )
+            conn.commit()
+        except (sqlite3.Error, OSError):
+            # Unwritable cache location, hash without the cache
+            conn = None
+        _digestCacheLocal.conn = conn
+        _digestCacheLocal.pid = pid
+    return _digestCacheLocal.conn
+
+
+def _optionalTypeOf(arg) -> str | None:
+    """How to hash arg if it is one of _OPTIONAL_TYPES, else None.
+
+    Subclasses count, as with isinstance().
+    """
+    for cls in type(arg).__mro__:
+        package = cls.__module__.split(".", 1)[0]
+        for optPackage, names, how in _OPTIONAL_TYPES:
+            if package == optPackage and cls.__name__ in names:
+                return how
+    return None
+
+
+def hashFile(
+    filePath: str | Path,
+    algorithm: str = "md5",
+    useMmap: bool = False,
+    useCache: bool = True,
+    chunkSize: int = HASH_CHUNK_SIZE,
+) -> bytes:
+    """Digest of a file's content, read in chunks or memory mapped.
+
+    Digests of large files are kept in DIGEST_CACHE_FILE keyed by
+    (path, inode, size, mtime_ns), so unchanged files are not read again.
+    """
+    filePath = os.path.realpath(filePath)
+    st = os.stat(filePath)
+    stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+    conn = None
+    if useCache and st.st_size >= DIGEST_CACHE_MIN_SIZE:
+        conn = _digestCache()
+    if conn is not None:
+        row = conn.execute(
+            "SELECT inode, size, mtime_ns, digest FROM digests "
+            "WHERE path = ? AND algorithm = ?",
+            (filePath, algorithm),
+        ).fetchone()
+        if row is not None and tuple(row[:3]) == stamp:
+            return bytes(row[3])
+
+    hasher = _newHasher(algorithm)
+    with open(filePath, "rb") as f:
+        if useMmap and st.st_size > 0:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                hasher.update(m)
+        else:
+            while chunk := f.read(chunkSize):
+                hasher.update(chunk)
+    digest = hasher.digest()
+
+    if conn is not None:
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?)",
+                (filePath, algorithm, *stamp, digest),
+            )
+            conn.commit()
+        except sqlite3.Error:
+            pass
+    return digest
+
+
+def calHash(
+    *args,
+    digits: int = 6,
+    scheme: int = DEFAULT_HASH_SCHEME,
+    useMmap: bool = False,
+) -> str:
+    """Produce 6 digit string with unlimited number of arguments passed in
+    Designed in mind that all types of data can be calculated
+    resulting the same hash across platform.
+    Should be safe with nested dict but no guarantee
+    Pass a larger digits (max 32) when the hash is used as a storage key.
+    scheme selects the hash algorithm (see HASH_SCHEMES), scheme 1 gives
+    the same hashes as before.
+    """
+    algorithm = HASH_SCHEMES[scheme]
+
+    def digest(b: bytes) -> bytes:
+        hasher = _newHasher(algorithm)
+        hasher.update(b)
+        return hasher.digest()
+
+    def orderDict(di):
+        try:
+            d = di.copy()
+        except BaseException:
+            d = di
+        if isinstance(d, dict):
+            od = OrderedDict(sorted(d.items()))
+            for k, v in od.items():
+                v = orderDict(v)
+                od[str(k)] = v
+            d = od
+        elif isinstance(d, (list, tuple, set)):
+            d = [orderDict(el) for el in d]
+        else:
+            d = str(d).strip()
+        return d
+
+    def hashDict(di):
+        od = orderDict(di)
+        ha = digest(
+            json.dumps(
+                od, sort_keys=True, ensure_ascii=True, default=str
+            ).encode()
+        )
+        return ha
+
+    haRaw = "".encode()
+    for arg in args:
+        if isinstance(arg, str):
+            if os.path.isfile(arg):
+                # Do not think about making a dir recognisable.
+                haRaw += hashFile(arg, algorithm, useMmap=useMmap)
+            else:
+                haRaw += arg.encode()
+        elif isinstance(arg, set):
+            haRaw += str(sorted(list())).encode()
+        elif isinstance(arg, dict):
+            haRaw += hashDict(arg)
+        elif isinstance(arg, bytes):
+            haRaw += arg
+        elif (how := _optionalTypeOf(arg)) == "json":
+            haRaw += digest(arg.to_json().encode())
+        elif how is not None:
+            haRaw += getattr(arg, how).tobytes()
+        else:
+            haRaw += str(arg).encode()
+    hasher = _newHasher(algorithm)
+    hasher.update(haRaw)
+    return hasher.hexdigest()[:digits]
+
+
+# TEST
+if __name__ == "__main__":
+    import subprocess
+    import sys
+    import warnings
+
+    import numpy as np
+    import pandas as pd
+    from sklearn.cross_decomposition import PLSRegression as PLS
+    from sklearn.decomposition import PCA
+
+    # Importing calHash must stay cheap: no pandas/sklearn, < 50 ms.
+    probe = (
+        "import sys, time; t = time.perf_counter(); "
+        "import pyBioinfo_modules.basic.calHash_on_args; "
+        "t = time.perf_counter() - t; "
+        "heavy = [m for m in ('pandas', 'sklearn') if m in sys.modules]; "
+        "print(t, *heavy)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", probe],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[2],
+    ).stdout.split()
+    importTime, heavy = float(out[0]), out[1:]
+    if heavy or importTime > 0.05:
+        print(f"Import test fail, {importTime * 1000:.1f} ms, loaded {heavy}")
+    else:
+        print(f"Import test OK, {importTime * 1000:.1f} ms")
+
+    warnings.filterwarnings("ignore")
+    tmpfile = "abc.tmp"
+    with open(tmpfile, "wb") as tf:
+        tf.write("iviviv".encode())
+    a = pd.DataFrame(dict(a=[1, 2], b=[3, 4]), index=[1, 2])
+    b = dict(x="iv", y="83", z=dict(i=0, u=5, k=dict(kj="kj", hs="qf")))
+    c = "avb"
+    d = 1
+    e = PLS()
+    e.fit(np.linspace(1, 100, 50).reshape(-1, 2).T, [[1], [1.5]])
+    f = PCA()
+    f.fit(np.linspace(4, 5, 100).reshape(-1, 5))
+    ha = calHash(a, b, c, d, e, f, tmpfile)
+    correctHa = "89c28a"
+    if ha == correctHa:
+        print("Test OK")
+    else:
+        print(f"Test fail, previous ha is {correctHa}, current ha is {ha}")
+        print(f"a now {calHash(a)} - previous 177438")
+        print(f"b now {calHash(b)} - previous 9536de")
+        print(f"c now {calHash(c)} - previous 539183")
+        print(f"d now {calHash(d)} - previous c4ca42")
+        print(f"e now {calHash(e)} - previous 8889c7")
+        print(f"f now {calHash(f)} - previous 5473de")
+        print(f"tmpfile now {calHash(tmpfile)} - previous")
+
+    # An unusable digest cache must not stop hashing of large files.
+    DIGEST_CACHE_FILE = Path("/proc/nonexistent/file_digests.sqlite")
+    _digestCacheLocal = threading.local()
+    with open(tmpfile, "wb") as tf:
+        tf.write(b"iv" * DIGEST_CACHE_MIN_SIZE)
+    try:
+        digests = {hashFile(tmpfile), hashFile(tmpfile)}
+        assert digests == {hashFile(tmpfile, useCache=False)}
+        print("Unwritable digest cache test OK")
+    except Exception as e:
+        print(f"Unwritable digest cache test fail: {e!r}")
+
+    os.remove(tmpfile)
@@ -1,140 +1,673 @@
-import subprocess
-from os.path import commonpath
-from pathlib import Path
-from tempfile import NamedTemporaryFile, _TemporaryFileWrapper
-
-IMPLEMENTED_COMPRESSION_FORMATS: list[str] = [".gz", ".xz"]
-
-
-def compressFile(
-    filePath: Path, compressionFormat: str, keepOrigion=False, dry=False
-) -> Path:
-    match compressionFormat:
-        case ".gz":
-            prog = "gzip"
-        case ".xz":
-            prog = "xz"
-        case _:
-            raise NotImplementedError(
-                f"Decompress {filePath.suffix} file is not supported."
-            )
-    assert filePath.suffix != compressionFormat
-    resultFile = filePath.parent / (filePath.name + compressionFormat)
-    if dry:
-        return resultFile
-
-    with open(resultFile, "wb") as rf:
-        compress = subprocess.run(
-            [prog, "-c", filePath.resolve()], stdout=rf, stderr=subprocess.PIPE
-        )
-        assert compress.returncode == 0
-
-    if not keepOrigion:
-        assert resultFile.exists()
-        filePath.unlink()
-    return resultFile
-
-
-def splitStemSuffixIfCompressed(
-    filePath: Path,
-    allowedFormats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS,
-    fullSuffix: bool = False,
-) -> tuple[str, str]:
-    if filePath.suffix in allowedFormats:
-        stem = filePath.with_suffix("").stem
-        suffix = filePath.with_suffix("").suffix
-        if fullSuffix:
-            suffix = filePath.suffix + suffix
-        return stem, suffix
-    else:
-        return filePath.stem, filePath.suffix
-
-
-def getSuffixIfCompressed(
-    filePath: Path,
-    allowedFormats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS,
-    fullSuffix: bool = False,
-) -> str:
-    return splitStemSuffixIfCompressed(filePath, allowedFormats, fullSuffix)[1]
-
-
-def getStemIfCompressed(
-    filePath: Path, allowedFormats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS
-) -> str:
-    return splitStemSuffixIfCompressed(filePath, allowedFormats)[0]
-
-
-def decompressFile(filePath: Path) -> Path:
-    match filePath.suffix:
-        case ".gz":
-            prog = "gzip"
-        case ".xz":
-            prog = "xz"
-        case _:
-            raise NotImplementedError(
-                f"Decompress {filePath.suffix} file is not supported."
-            )
-    resultFilePath = filePath.with_suffix("")
-    with open(resultFilePath, "w") as rf:
-        decompress = subprocess.run(
-            [prog, "-dc", filePath.resolve()], stdout=rf, stderr=subprocess.PIPE
-        )
-    if not resultFilePath.exists():
-        raise FileNotFoundError(
-            "\n".join(
-                [
-                    f"Unzip file {filePath} failed: no output file found:",
-                    " ".join(decompress.args),
-                    decompress.stderr.decode(),
-                ]
-            )
-        )
-    return resultFilePath
-
-
-def decompFileIfCompressed(
-    filePath: Path, allowedFormats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS
-) -> tuple[Path, bool]:
-    if filePath.suffix in allowedFormats:
-        return decompressFile(filePath), True
-    else:
-        return filePath, False
-
-
-def decompressToTempTxt(filePath: Path) -> _TemporaryFileWrapper:
-    # To access the file outside this function,
-    # do NOT: a = decompressToTempTxt(filePath).name
-    # it will kill the temporary file.
-    # You can do with decompressToTempTxt(filePath) as t:
-    match filePath.suffix:
-        case ".gz":
-            prog = "gzip"
-        case ".xz":
-            prog = "xz"
-        case _:
-            raise NotImplementedError(
-                f"Decompress {filePath.suffix} file is not supported."
-            )
-    outTempFile = NamedTemporaryFile()
-    with open(outTempFile.name, "w") as out:
-        subprocess.run([prog, "-dc", filePath], stdout=out, check=True)
-    return outTempFile
-
-
-def getRootAndFiles(
-    pathList: list[Path], allowedExts
-) -> tuple[Path, list[Path]]:
-    targetFiles: list[Path] = []
-    for pathIn in pathList:
-        pathIn = Path(pathIn).resolve()
-        if pathIn.is_dir():
-            for f in pathIn.iterdir():
-                if getSuffixIfCompressed(f) in allowedExts:
-                    targetFiles.append(f)
-        elif pathIn.is_file():
-            assert getSuffixIfCompressed(pathIn) in allowedExts
-            targetFiles.append(pathIn)
-    rootPath: Path = Path(commonpath(targetFiles))
-    if rootPath.is_file():
-        rootPath = rootPath.parent
-    return rootPath, targetFiles
+import bz2
+import gzip
+import io
+import logging
+import lzma
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
+from os.path import commonpath
+from pathlib import Path
+from tempfile import (
+    NamedTemporaryFile,
+    TemporaryDirectory,
+    TemporaryFile,
+    _TemporaryFileWrapper,
+)
+from typing import IO, Iterator, Literal, TypedDict
+
+logger = logging.getLogger(__name__)
+
+IMPLEMENTED_COMPRESSION_FORMATS: list[str] = [".gz", ".xz", ".bz2", ".zst"]
+# Command line programs, all take -c (compress) and -dc (decompress).
+COMPRESSION_PROGRAMS: dict[str, str] = {
+    ".gz": "gzip",
+    ".xz": "xz",
+    ".bz2": "bzip2",
+    ".zst": "zstd",
+}
+# Decompressed copies for programs that need a real file go to memory.
+TMPFS_DIR: Path | None = (
+    Path("/dev/shm") if os.access("/dev/shm", os.W_OK) else None
+)
+# Parallel programs, tried in order before the ones above when threads > 1.
+PARALLEL_COMPRESSION_PROGRAMS: dict[str, list[list[str]]] = {
+    ".gz": [["pigz", "-p", "{threads}"]],
+    ".xz": [["xz", "-T", "{threads}"]],
+    ".bz2": [["pbzip2", "-p{threads}"], ["lbzip2", "-n", "{threads}"]],
+    ".zst": [["zstd", "-q", "-T{threads}"]],
+}
+STREAM_CHUNK_SIZE = 1 << 20
+
+
+class CompressionStats(TypedDict):
+    inputFile: Path
+    outputFile: Path
+    backend: str
+    rawBytes: int
+    compressedBytes: int
+    seconds: float
+    # Uncompressed bytes per second, for compression and decompression
+    mbPerSecond: float
+
+
+@lru_cache
+def _programCmd(compressionFormat: str, threads: int) -> tuple[str, ...] | None:
+    """Command of the fastest available program, None if none is found."""
+    candidates = []
+    if threads > 1:
+        candidates += PARALLEL_COMPRESSION_PROGRAMS.get(compressionFormat, [])
+    candidates.append([COMPRESSION_PROGRAMS[compressionFormat]])
+    for cmd in candidates:
+        if shutil.which(cmd[0]) is not None:
+            return tuple(arg.format(threads=threads) for arg in cmd)
+    return None
+
+
+def _openInProcess(
+    filePath: Path, compressionFormat: str, threads: int, level: int | None
+) -> IO:
+    """Binary write handle compressing in this process."""
+    match compressionFormat:
+        case ".gz":
+            # Same default level as the gzip program
+            return gzip.open(
+                filePath, "wb", compresslevel=6 if level is None else level
+            )
+        case ".xz":
+            return lzma.open(filePath, "wb", preset=level)
+        case ".bz2":
+            return bz2.open(
+                filePath, "wb", compresslevel=9 if level is None else level
+            )
+        case ".zst":
+            import zstandard
+
+            return zstandard.open(
+                filePath,
+                "wb",
+                cctx=zstandard.ZstdCompressor(
+                    level=3 if level is None else level, threads=threads
+                ),
+            )
+    raise NotImplementedError(
+        f"Compress to {compressionFormat} file is not supported."
+    )
+
+
+def _runCodec(
+    inputFile: Path,
+    outputFile: Path,
+    compressionFormat: str,
+    decompress: bool,
+    threads: int = 1,
+    level: int | None = None,
+    backend: Literal["auto", "program", "python"] = "auto",
+) -> CompressionStats:
+    """
+    (De)compress inputFile to outputFile with a command line program
+    (parallel one when threads > 1) or, if none is installed or backend is
+    "python", in process. outputFile appears only when complete.
+    """
+    if compressionFormat not in COMPRESSION_PROGRAMS:
+        raise NotImplementedError(
+            f"{'Decompress' if decompress else 'Compress to'} "
+            f"{compressionFormat} file is not supported."
+        )
+    cmd = (
+        None
+        if backend == "python"
+        else _programCmd(compressionFormat, max(1, threads))
+    )
+    if cmd is None and backend == "program":
+        raise FileNotFoundError(
+            f"No program found for {compressionFormat} files."
+        )
+    tmpFile = outputFile.with_name(outputFile.name + ".part")
+    ts = time.time()
+    try:
+        if cmd is not None:
+            args = list(cmd) + ["-dc" if decompress else "-c"]
+            if level is not None and not decompress:
+                args.append(f"-{level}")
+            args.append(str(inputFile.resolve()))
+            with open(tmpFile, "wb") as out:
+                result = subprocess.run(
+                    args, stdout=out, stderr=subprocess.PIPE
+                )
+            if result.returncode != 0:
+                raise OSError(
+                    f"{' '.join(args)} failed: "
+                    + result.stderr.decode(errors="replace")
+                )
+            backendName = cmd[0]
+        elif decompress:
+            with (
+                openCompressed(inputFile, "rb") as src,
+                open(tmpFile, "wb") as dst,
+            ):
+                shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+            backendName = "python"
+        else:
+            with (
+                open(inputFile, "rb") as src,
+                _openInProcess(
+                    tmpFile, compressionFormat, threads, level
+                ) as dst,
+            ):
+                shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+            backendName = "python"
+        tmpFile.replace(outputFile)
+    finally:
+        if tmpFile.exists():
+            tmpFile.unlink()
+    seconds = time.time() - ts
+    rawFile, compressedFile = (
+        (outputFile, inputFile) if decompress else (inputFile, outputFile)
+    )
+    rawBytes = rawFile.stat().st_size
+    stats = CompressionStats(
+        inputFile=inputFile,
+        outputFile=outputFile,
+        backend=backendName,
+        rawBytes=rawBytes,
+        compressedBytes=compressedFile.stat().st_size,
+        seconds=seconds,
+        mbPerSecond=rawBytes / 1e6 / max(seconds, 1e-6),
+    )
+    logger.debug(
+        f"{'Decompressed' if decompress else 'Compressed'} {inputFile.name} "
+        f"with {backendName}: {stats['mbPerSecond']:.1f} MB/s"
+    )
+    return stats
+
+
+def compressFile(
+    filePath: Path,
+    compressionFormat: str,
+    keepOrigion=False,
+    dry=False,
+    threads: int = 1,
+    level: int | None = None,
+    backend: Literal["auto", "program", "python"] = "auto",
+    stats: list[CompressionStats] | None = None,
+) -> Path:
+    """
+    Compress filePath to filePath + compressionFormat.
+
+    With threads > 1, pigz, xz -T, pbzip2/lbzip2 or zstd -T is used when
+    installed. Without a program, gzip/lzma/bz2/zstandard compress in
+    process. Timing and throughput are appended to stats if given.
+    """
+    assert filePath.suffix != compressionFormat
+    resultFile = filePath.parent / (filePath.name + compressionFormat)
+    if dry:
+        return resultFile
+
+    result = _runCodec(
+        filePath,
+        resultFile,
+        compressionFormat,
+        decompress=False,
+        threads=threads,
+        level=level,
+        backend=backend,
+    )
+    if stats is not None:
+        stats.append(result)
+
+    if not keepOrigion:
+        assert resultFile.exists()
+        filePath.unlink()
+    return resultFile
+
+
+def compressFiles(
+    filePaths: list[Path],
+    compressionFormat: str,
+    threads: int = os.cpu_count() or 1,
+    jobs: int | None = None,
+    keepOrigion=False,
+    level: int | None = None,
+    backend: Literal["auto", "program", "python"] = "auto",
+) -> list[CompressionStats]:
+    """
+    Compress many files at once, jobs files at a time with threads // jobs
+    threads each (default: one file per thread, as small files do not gain
+    from parallel codecs). Logs the overall throughput.
+    """
+    if not filePaths:
+        return []
+    jobs = min(len(filePaths), jobs if jobs is not None else threads)
+    threadsPerJob = max(1, threads // jobs)
+    stats: list[CompressionStats] = []
+    ts = time.time()
+    # Threads are enough: programs run outside, and zlib/lzma/bz2 release
+    # the GIL while compressing in process.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                compressFile,
+                filePath,
+                compressionFormat,
+                keepOrigion=keepOrigion,
+                threads=threadsPerJob,
+                level=level,
+                backend=backend,
+                stats=stats,
+            )
+            for filePath in filePaths
+        ]
+        for future in as_completed(futures):
+            future.result()
+    seconds = time.time() - ts
+    rawBytes = sum(s["rawBytes"] for s in stats)
+    compressedBytes = sum(s["compressedBytes"] for s in stats)
+    logger.info(
+        f"Compressed {len(stats)} files to {compressionFormat} in "
+        f"{seconds:.1f} s: {rawBytes / 1e6 / max(seconds, 1e-6):.1f} MB/s, "
+        f"ratio {rawBytes / max(compressedBytes, 1):.2f}"
+    )
+    return stats
+
+
+def compareCodecs(
+    filePath: Path,
+    formats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS,
+    threads: int = 1,
+    level: int | None = None,
+) -> dict[str, tuple[CompressionStats, CompressionStats]]:
+    """
+    Compress and decompress a sample file with every format, in a temporary
+    directory, to choose a codec for a type of file.
+    Returns {format: (compression stats, decompression stats)}.
+    """
+    results = {}
+    with TemporaryDirectory(prefix="codecs_") as tmp:
+        for compressionFormat in formats:
+            compressed = Path(tmp) / (filePath.name + compressionFormat)
+            restored = Path(tmp) / filePath.name
+            try:
+                results[compressionFormat] = (
+                    _runCodec(
+                        filePath,
+                        compressed,
+                        compressionFormat,
+                        False,
+                        threads,
+                        level,
+                    ),
+                    _runCodec(
+                        compressed, restored, compressionFormat, True, threads
+                    ),
+                )
+            except (NotImplementedError, ImportError, OSError) as e:
+                logger.warning(f"Skip {compressionFormat}: {e}")
+                continue
+            finally:
+                for f in (compressed, restored):
+                    if f.exists():
+                        f.unlink()
+            comp, decomp = results[compressionFormat]
+            logger.info(
+                f"{compressionFormat} ({comp['backend']}): ratio "
+                f"{comp['rawBytes'] / max(comp['compressedBytes'], 1):.2f}, "
+                f"compress {comp['mbPerSecond']:.1f} MB/s, "
+                f"decompress {decomp['mbPerSecond']:.1f} MB/s"
+            )
+    return results
+
+
+def splitStemSuffixIfCompressed(
+    filePath: Path,
+    allowedFormats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS,
+    fullSuffix: bool = False,
+) -> tuple[str, str]:
+    if filePath.suffix in allowedFormats:
+        stem = filePath.with_suffix("").stem
+        suffix = filePath.with_suffix("").suffix
+        if fullSuffix:
+            suffix = filePath.suffix + suffix
+        return stem, suffix
+    else:
+        return filePath.stem, filePath.suffix
+
+
+def getSuffixIfCompressed(
+    filePath: Path,
+    allowedFormats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS,
+    fullSuffix: bool = False,
+) -> str:
+    return splitStemSuffixIfCompressed(filePath, allowedFormats, fullSuffix)[1]
+
+
+def getStemIfCompressed(
+    filePath: Path, allowedFormats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS
+) -> str:
+    return splitStemSuffixIfCompressed(filePath, allowedFormats)[0]
+
+
+def decompressFile(filePath: Path, threads: int = 1) -> Path:
+    """Decompress next to filePath, the compressed file is kept."""
+    resultFilePath = filePath.with_suffix("")
+    _runCodec(
+        filePath,
+        resultFilePath,
+        filePath.suffix,
+        decompress=True,
+        threads=threads,
+    )
+    return resultFilePath
+
+
+def decompFileIfCompressed(
+    filePath: Path, allowedFormats: list[str] = IMPLEMENTED_COMPRESSION_FORMATS
+) -> tuple[Path, bool]:
+    if filePath.suffix in allowedFormats:
+        return decompressFile(filePath), True
+    else:
+        return filePath, False
+
+
+def decompressToTempTxt(filePath: Path) -> _TemporaryFileWrapper:
+    # To access the file outside this function,
+    # do NOT: a = decompressToTempTxt(filePath).name
+    # it will kill the temporary file.
+    # You can do with decompressToTempTxt(filePath) as t:
+    if filePath.suffix not in COMPRESSION_PROGRAMS:
+        raise NotImplementedError(
+            f"Decompress {filePath.suffix} file is not supported."
+        )
+    prog = COMPRESSION_PROGRAMS[filePath.suffix]
+    outTempFile = NamedTemporaryFile()
+    with open(outTempFile.name, "w") as out:
+        subprocess.run([prog, "-dc", filePath], stdout=out, check=True)
+    return outTempFile
+
+
+class _ProcessReader(io.RawIOBase):
+    """Read the stdout of a decompression program like a file."""
+
+    def __init__(self, cmd: list):
+        self._stderr = TemporaryFile()
+        self._proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=self._stderr
+        )
+        self.cmd = cmd
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        return self._proc.stdout.readinto(b)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+        self._proc.stdout.close()
+        returncode = self._proc.wait()
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode(errors="replace")
+        self._stderr.close()
+        # A reader that stops early kills the program with SIGPIPE.
+        if returncode not in (0, -signal.SIGPIPE):
+            raise OSError(f"{' '.join(map(str, self.cmd))} failed: {stderr}")
+
+
+def openCompressed(
+    filePath: Path, mode: str = "rt", encoding: str | None = None
+) -> IO:
+    """
+    Open a plain or compressed (.gz, .xz, .bz2, .zst) file for reading,
+    decompressing while reading, no copy is written to disk.
+
+    gz, xz and bz2 are read in process. zst uses the zstandard package when
+    installed, else a pipe from the zstd program.
+    Usage:
+        with openCompressed(gbkPath) as handle:
+            records = SeqIO.parse(handle, "genbank")
+    """
+    filePath = Path(filePath)
+    assert mode in ("r", "rt", "rb"), "Only reading is supported."
+    textMode = mode != "rb"
+    match filePath.suffix:
+        case ".gz":
+            return gzip.open(filePath, mode, encoding=encoding)
+        case ".xz":
+            return lzma.open(filePath, mode, encoding=encoding)
+        case ".bz2":
+            return bz2.open(filePath, mode, encoding=encoding)
+        case ".zst":
+            try:
+                import zstandard
+
+                # Files may hold several frames, see compressBytes()
+                binary = zstandard.ZstdDecompressor().stream_reader(
+                    open(filePath, "rb"), read_across_frames=True
+                )
+            except ImportError:
+                binary = io.BufferedReader(
+                    _ProcessReader(["zstd", "-dc", str(filePath)]),
+                    STREAM_CHUNK_SIZE,
+                )
+        case _:
+            return open(filePath, mode, encoding=encoding)
+    return io.TextIOWrapper(binary, encoding=encoding) if textMode else binary
+
+
+class _ProcessWriter(io.RawIOBase):
+    """Feed a compression program writing to outputFile like a file."""
+
+    def __init__(self, cmd: list, outputFile: Path):
+        self._out = open(outputFile, "wb")
+        self._stderr = TemporaryFile()
+        self._proc = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=self._out, stderr=self._stderr
+        )
+        self.cmd = cmd
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        return self._proc.stdin.write(b)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()
+        self._proc.stdin.close()
+        returncode = self._proc.wait()
+        self._out.close()
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode(errors="replace")
+        self._stderr.close()
+        if returncode != 0:
+            raise OSError(f"{' '.join(map(str, self.cmd))} failed: {stderr}")
+
+
+def openCompressedWriter(
+    filePath: Path,
+    compressionFormat: str | None = None,
+    threads: int = 1,
+    level: int | None = None,
+    backend: Literal["auto", "program", "python"] = "auto",
+) -> IO:
+    """
+    Binary handle compressing what is written to it into filePath, the
+    streaming counterpart of compressFile(). compressionFormat defaults
+    to the suffix of filePath.
+    """
+    filePath = Path(filePath)
+    compressionFormat = compressionFormat or filePath.suffix
+    if compressionFormat not in COMPRESSION_PROGRAMS:
+        raise NotImplementedError(
+            f"Compress to {compressionFormat} file is not supported."
+        )
+    cmd = (
+        None
+        if backend == "python"
+        else _programCmd(compressionFormat, max(1, threads))
+    )
+    if cmd is None:
+        if backend == "program":
+            raise FileNotFoundError(
+                f"No program found for {compressionFormat} files."
+            )
+        return _openInProcess(filePath, compressionFormat, threads, level)
+    args = list(cmd) + ["-c"]
+    if level is not None:
+        args.append(f"-{level}")
+    return io.BufferedWriter(_ProcessWriter(args, filePath), STREAM_CHUNK_SIZE)
+
+
+def compressBytes(
+    data: bytes, compressionFormat: str, level: int | None = None
+) -> bytes:
+    """
+    Compress data as one complete stream (frame). Such streams can be
+    concatenated into a valid file and decompressed one by one, this is
+    what makes an archive seekable.
+    """
+    match compressionFormat:
+        case ".gz":
+            return gzip.compress(data, 6 if level is None else level)
+        case ".xz":
+            return lzma.compress(data, preset=level)
+        case ".bz2":
+            return bz2.compress(data, 9 if level is None else level)
+        case ".zst":
+            try:
+                import zstandard
+
+                return zstandard.ZstdCompressor(
+                    level=3 if level is None else level
+                ).compress(data)
+            except ImportError:
+                args = ["zstd", "-q", "-c"]
+                if level is not None:
+                    args.append(f"-{level}")
+                return subprocess.run(
+                    args, input=data, capture_output=True, check=True
+                ).stdout
+    raise NotImplementedError(
+        f"Compress to {compressionFormat} file is not supported."
+    )
+
+
+def decompressBytes(data: bytes, compressionFormat: str) -> bytes:
+    """Decompress one or more concatenated streams made by compressBytes()."""
+    match compressionFormat:
+        case ".gz":
+            return gzip.decompress(data)
+        case ".xz":
+            return lzma.decompress(data)
+        case ".bz2":
+            return bz2.decompress(data)
+        case ".zst":
+            try:
+                import zstandard
+
+                with zstandard.ZstdDecompressor().stream_reader(
+                    io.BytesIO(data), read_across_frames=True
+                ) as reader:
+                    return reader.read()
+            except ImportError:
+                return subprocess.run(
+                    ["zstd", "-q", "-dc"],
+                    input=data,
+                    capture_output=True,
+                    check=True,
+                ).stdout
+    raise NotImplementedError(
+        f"Decompress {compressionFormat} file is not supported."
+    )
+
+
+@contextmanager
+def decompressedPath(
+    filePath: Path, useFifo: bool = False, tmpDir: Path | None = TMPFS_DIR
+) -> Iterator[Path]:
+    """
+    Path to the decompressed content of filePath, for programs that only
+    take a file name. Uncompressed files are given as they are.
+
+    The decompressed file has the same name without the compression suffix
+    and is written to tmpDir (memory backed when /dev/shm is available),
+    never next to the input. With useFifo, it is a named pipe fed while
+    the program reads, for programs reading their input once from start to
+    end. Removed when leaving the with block.
+    """
+    filePath = Path(filePath)
+    if filePath.suffix not in IMPLEMENTED_COMPRESSION_FORMATS:
+        yield filePath
+        return
+    with TemporaryDirectory(dir=tmpDir, prefix="decompressed_") as tmp:
+        outPath = Path(tmp) / filePath.with_suffix("").name
+        if not useFifo:
+            with (
+                openCompressed(filePath, "rb") as src,
+                outPath.open("wb") as dst,
+            ):
+                shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+            yield outPath
+            return
+
+        os.mkfifo(outPath)
+        errors: list[Exception] = []
+        pipeOpened = threading.Event()
+
+        def feed():
+            try:
+                with outPath.open("wb") as dst:
+                    pipeOpened.set()
+                    with openCompressed(filePath, "rb") as src:
+                        shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+            except BrokenPipeError:
+                # The program stopped reading before the end.
+                pass
+            except Exception as e:
+                errors.append(e)
+            finally:
+                pipeOpened.set()
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        try:
+            yield outPath
+        finally:
+            if not pipeOpened.is_set():
+                # The pipe was never read, give the feeder a reader to
+                # unblock its open(), then let it fail on the closed pipe.
+                fd = os.open(outPath, os.O_RDONLY | os.O_NONBLOCK)
+                pipeOpened.wait()
+                os.close(fd)
+            feeder.join()
+        if errors:
+            raise errors[0]
+
+
+def getRootAndFiles(
+    pathList: list[Path], allowedExts
+) -> tuple[Path, list[Path]]:
+    targetFiles: list[Path] = []
+    for pathIn in pathList:
+        pathIn = Path(pathIn).resolve()
+        if pathIn.is_dir():
+            for f in pathIn.iterdir():
+                if getSuffixIfCompressed(f) in allowedExts:
+                    targetFiles.append(f)
+        elif pathIn.is_file():
+            assert getSuffixIfCompressed(pathIn) in allowedExts
+            targetFiles.append(pathIn)
+    rootPath: Path = Path(commonpath(targetFiles))
+    if rootPath.is_file():
+        rootPath = rootPath.parent
+    return rootPath, targetFiles
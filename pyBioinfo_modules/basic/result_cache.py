@@ -0,0 +1,219 @@
+############################################
+# Content-addressed store for outputs of external tools.
+# An entry is keyed on the digest of the input files, the tool version and
+# the normalized arguments, so a rerun only recomputes what changed.
+############################################
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from pyBioinfo_modules.basic.calHash_on_args import calHash
+
+logger = logging.getLogger(__name__)
+
+# Written into a cached result directory, tells which entry it came from.
+RESULT_KEY_FILE = ".result_cache_key"
+
+
+def _linkOrCopy(src: str, dst: str) -> str:
+    """Hard link when possible, so cache and output share the disk space."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
+
+def _sizeOf(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _removePath(path: Path) -> None:
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+class ResultCache:
+    """
+    Content-addressed store of tool results with LRU eviction.
+
+    Layout:
+        root/objects/<key[:2]>/<key>/data       the cached file or directory
+        root/objects/<key[:2]>/<key>/meta.json  tool, version, params, size
+    The modification time of meta.json is the last time the entry was used.
+
+    Cached files are hard links of the outputs when possible, so removing
+    an output does not free its disk space while the entry exists. A stage
+    that prunes outputs should drop() their entries, a directory keeps
+    counting as restored from its key after that (see fetch()).
+
+    Usage:
+        cache = ResultCache(root, maxBytes=50 * 1024**3)
+        key = cache.key("antismash", version, [gbff], params)
+        if not cache.fetch(key, outdir):
+            ...  # run the tool into outdir
+            cache.store(key, outdir)
+    """
+
+    def __init__(self, root: Path, maxBytes: int | None):
+        """maxBytes is the size the cache is evicted to, None for no limit."""
+        self.root = Path(root)
+        self.maxBytes = maxBytes
+        self._lock = threading.Lock()
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        (self.root / "tmp").mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(
+        tool: str,
+        version: str,
+        inputFiles: list[Path],
+        params: dict,
+    ) -> str:
+        """Key on input file contents + tool version + normalized params.
+
+        Parameters that do not change the result (cpu, output location)
+        should be left out of params.
+        """
+        normParams = {
+            str(k): (str(v) if isinstance(v, Path) else v)
+            for k, v in params.items()
+        }
+        return calHash(
+            tool,
+            version.strip(),
+            *[str(Path(f).resolve()) for f in inputFiles],
+            normParams,
+            digits=32,
+        )
+
+    def _entryDir(self, key: str) -> Path:
+        return self.root / "objects" / key[:2] / key
+
+    def has(self, key: str) -> bool:
+        return (self._entryDir(key) / "meta.json").is_file()
+
+    @staticmethod
+    def resultKeyOf(dest: Path) -> str | None:
+        """Key of the cached result a directory was restored from or
+        stored as, None if it does not come from the cache."""
+        keyFile = dest / RESULT_KEY_FILE
+        if keyFile.is_file():
+            return keyFile.read_text().strip()
+        return None
+
+    def fetch(self, key: str, dest: Path) -> bool:
+        """Put the cached result of key at dest.
+
+        Returns False on cache miss. dest is replaced on cache hit, unless
+        it is a directory already restored from the same entry, which is a
+        hit even if the entry was dropped or evicted since.
+        """
+        entry = self._entryDir(key)
+        if dest.is_dir() and self.resultKeyOf(dest) == key:
+            if (entry / "meta.json").is_file():
+                os.utime(entry / "meta.json")
+            return True
+        if not (entry / "meta.json").is_file():
+            return False
+        os.utime(entry / "meta.json")
+        data = entry / "data"
+        _removePath(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if data.is_dir():
+            shutil.copytree(data, dest, copy_function=_linkOrCopy)
+            (dest / RESULT_KEY_FILE).write_text(key)
+        else:
+            _linkOrCopy(str(data), str(dest))
+        logger.info(f"Restored {dest} from result cache {key}")
+        return True
+
+    def fetchOrAdopt(self, key: str, dest: Path, complete: bool) -> bool:
+        """fetch(), or take over a complete result directory at dest that
+        was made before the cache was used.
+
+        complete is the tool specific "output exists" check. A directory
+        restored from another entry is stale and never adopted.
+        """
+        if self.fetch(key, dest):
+            return True
+        if complete and dest.is_dir() and self.resultKeyOf(dest) is None:
+            logger.info(f"Adopting existing result {dest} into result cache")
+            self.store(key, dest, {"adopted": True})
+            return True
+        return False
+
+    def store(self, key: str, src: Path, meta: dict | None = None) -> None:
+        """Add the result at src to the cache under key."""
+        entry = self._entryDir(key)
+        if (entry / "meta.json").is_file():
+            return
+        if src.is_dir():
+            (src / RESULT_KEY_FILE).write_text(key)
+        tmp = self.root / "tmp" / f"{key}.{os.getpid()}.{threading.get_ident()}"
+        _removePath(tmp)
+        tmp.mkdir(parents=True)
+        if src.is_dir():
+            shutil.copytree(src, tmp / "data", copy_function=_linkOrCopy)
+        else:
+            _linkOrCopy(str(src), str(tmp / "data"))
+        info = dict(meta) if meta is not None else {}
+        info.update(
+            {
+                "key": key,
+                "source": str(src),
+                "size": _sizeOf(tmp / "data"),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+        with (tmp / "meta.json").open("w") as fh:
+            json.dump(info, fh, default=str, indent=1)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            tmp.rename(entry)
+        except OSError:
+            # Another worker stored the same result meanwhile.
+            shutil.rmtree(tmp)
+        self.evict()
+
+    def drop(self, key: str) -> bool:
+        """Remove the entry of key, e.g. after its outputs were pruned, so
+        the hard linked files are freed. Returns False if there is none."""
+        entry = self._entryDir(key)
+        if not (entry / "meta.json").is_file():
+            return False
+        with self._lock:
+            logger.info(f"Dropping {key} from cache")
+            shutil.rmtree(entry, ignore_errors=True)
+        return True
+
+    def evict(self) -> None:
+        """Drop least recently used entries until under maxBytes."""
+        if self.maxBytes is None:
+            return
+        with self._lock:
+            entries = []
+            total = 0
+            for metaFile in (self.root / "objects").glob("*/*/meta.json"):
+                try:
+                    with metaFile.open("r") as fh:
+                        size = json.load(fh)["size"]
+                    entries.append((metaFile.stat().st_mtime, size, metaFile))
+                except (OSError, ValueError, KeyError):
+                    continue
+                total += size
+            for _, size, metaFile in sorted(entries):
+                if total <= self.maxBytes:
+                    break
+                logger.info(f"Evicting {metaFile.parent.name} from cache")
+                shutil.rmtree(metaFile.parent, ignore_errors=True)
+                total -= size
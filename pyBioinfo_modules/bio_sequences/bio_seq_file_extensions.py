@@ -1,3 +1,3 @@
-FNA_EXTENSIONS = [".fna", ".fasta", ".fa"]
-GBK_EXTENSIONS = [".gbk", ".gb", ".genbank", ".gbff"]
-FAA_EXTENSIONS = [".faa"]
+FNA_EXTENSIONS = [".fna", ".fasta", ".fa"]
+GBK_EXTENSIONS = [".gbk", ".gb", ".genbank", ".gbff"]
+FAA_EXTENSIONS = [".faa"]
@@ -0,0 +1,305 @@
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TypedDict
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SHORT_SUMMARY_PREFIX = re.compile(
+    r"^short_summary\.(specific|generic)\.[^.]+\."
+)
+BATCH_SUMMARY_COLUMNS = [
+    "Input_file",
+    "Dataset",
+    "Complete",
+    "Single",
+    "Duplicated",
+    "Fragmented",
+    "Missing",
+    "n_markers",
+]
+
+
+class BuscoSummary(TypedDict):
+    genome: str
+    lineage: str
+    complete: int
+    single: int
+    duplicated: int
+    fragmented: int
+    missing: int
+    nMarkers: int
+    completePercent: float
+    # Only in genome mode
+    n50: int | None
+
+
+def genomeNameOfSummary(summaryFile: Path) -> str:
+    """
+    short_summary.specific.<lineage>.<input file>.json -> <input file>,
+    names without the prefix are left as they are.
+    """
+    return SHORT_SUMMARY_PREFIX.sub("", summaryFile.name).removesuffix(
+        summaryFile.suffix
+    )
+
+
+def collectedGenomes(jsonDir: Path) -> set[str]:
+    """Input file names that already have a short summary JSON in jsonDir."""
+    if not jsonDir.is_dir():
+        return set()
+    return {genomeNameOfSummary(f) for f in jsonDir.glob("*.json")}
+
+
+def _parseSize(value) -> int | None:
+    """N50 values are numbers or strings like "1.2 MB"."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.match(r"^\s*([0-9.]+)\s*([KMG]?B?)\s*$", str(value))
+    if not match:
+        return None
+    factor = {"": 1, "B": 1, "KB": 1e3, "MB": 1e6, "GB": 1e9}.get(match[2], 1)
+    return int(float(match[1]) * factor)
+
+
+def parseShortSummaryJson(jsonFile: Path) -> BuscoSummary:
+    """
+    Read a BUSCO short_summary JSON. Counts are taken as they are (BUSCO
+    >= 5.5) or computed from the percentages of older versions.
+    """
+    with open(jsonFile, "r") as fh:
+        data = json.load(fh)
+    results = data["results"]
+    params = data.get("parameters", {})
+    nMarkers = int(results["n_markers"])
+
+    def count(name: str) -> int:
+        if f"{name} BUSCOs" in results:
+            return int(results[f"{name} BUSCOs"])
+        # Older versions only give the percentage, under the bare name
+        return round(float(results[name]) * nMarkers / 100)
+
+    lineage = (
+        data.get("lineage_dataset", {}).get("name")
+        or Path(params.get("lineage_dataset", "")).name
+    )
+    metrics = data.get("metrics", {})
+    return BuscoSummary(
+        genome=(
+            Path(params["in"]).name
+            if "in" in params
+            else genomeNameOfSummary(jsonFile)
+        ),
+        lineage=lineage,
+        complete=count("Complete"),
+        single=count("Single copy"),
+        duplicated=count("Multi copy"),
+        fragmented=count("Fragmented"),
+        missing=count("Missing"),
+        nMarkers=nMarkers,
+        completePercent=float(
+            results.get("Complete percentage", results.get("Complete"))
+        ),
+        n50=_parseSize(metrics.get("Scaffold N50", metrics.get("Contigs N50"))),
+    )
+
+
+def parseShortSummaryTxt(txtFile: Path) -> BuscoSummary:
+    """Read a BUSCO short_summary text file, for runs without JSON."""
+    values: dict[str, str] = {}
+    lineage = ""
+    genome = genomeNameOfSummary(txtFile)
+    with open(txtFile, "r") as fh:
+        for line in fh:
+            if match := re.search(r"The lineage dataset is: (\S+)", line):
+                lineage = match[1]
+            elif match := re.search(r"notation for file (\S+)", line):
+                genome = Path(match[1]).name
+            elif match := re.match(
+                r"^\s*([0-9.]+(?: [KMG]?B)?)\s+(\S.*?)\s*$", line
+            ):
+                values[match[2]] = match[1]
+    nMarkers = int(values["Total BUSCO groups searched"])
+    complete = int(values["Complete BUSCOs (C)"])
+    return BuscoSummary(
+        genome=genome,
+        lineage=lineage,
+        complete=complete,
+        single=int(values["Complete and single-copy BUSCOs (S)"]),
+        duplicated=int(values["Complete and duplicated BUSCOs (D)"]),
+        fragmented=int(values["Fragmented BUSCOs (F)"]),
+        missing=int(values["Missing BUSCOs (M)"]),
+        nMarkers=nMarkers,
+        completePercent=round(100 * complete / nMarkers, 1) if nMarkers else 0,
+        n50=_parseSize(values.get("Scaffold N50", values.get("Contigs N50"))),
+    )
+
+
+def writeBatchSummary(summaries: list[BuscoSummary], outFile: Path) -> Path:
+    """Tab separated table like the batch_summary.txt of BUSCO."""
+
+    def percent(n: int, s: BuscoSummary) -> str:
+        return f"{100 * n / s['nMarkers']:.1f}" if s["nMarkers"] else "0.0"
+
+    with open(outFile, "w") as fh:
+        fh.write("\t".join(BATCH_SUMMARY_COLUMNS) + "\n")
+        for s in sorted(summaries, key=lambda s: s["genome"]):
+            fh.write(
+                "\t".join(
+                    [
+                        s["genome"],
+                        s["lineage"],
+                        percent(s["complete"], s),
+                        percent(s["single"], s),
+                        percent(s["duplicated"], s),
+                        percent(s["fragmented"], s),
+                        percent(s["missing"], s),
+                        str(s["nMarkers"]),
+                    ]
+                )
+                + "\n"
+            )
+    return outFile
+
+
+# Columnar store of BUSCO results, one row per genome and lineage
+BUSCO_TABLE_FILE = "busco_results.parquet"
+BUSCO_TABLE_COLUMNS = [
+    "genome",
+    "lineage",
+    "complete",
+    "single",
+    "duplicated",
+    "fragmented",
+    "missing",
+    "nMarkers",
+    "completePercent",
+    "n50",
+    "summaryFile",
+    "summaryMtime",
+]
+
+
+def _parseSummaryFile(summaryFile: Path) -> dict | None:
+    try:
+        if summaryFile.suffix == ".json":
+            summary = parseShortSummaryJson(summaryFile)
+            # Named after the input file, as in a BUSCO batch summary
+            summary["genome"] = genomeNameOfSummary(summaryFile)
+        else:
+            summary = parseShortSummaryTxt(summaryFile)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Cannot parse BUSCO summary {summaryFile}: {e}")
+        return None
+    return {
+        **summary,
+        "summaryFile": str(summaryFile),
+        "summaryMtime": summaryFile.stat().st_mtime_ns,
+    }
+
+
+def collectBuscoResults(
+    summaryFiles: list[Path], jobs: int = os.cpu_count() or 1
+) -> pd.DataFrame:
+    """
+    Parse short summary JSON/TXT files in parallel into one table with
+    BUSCO_TABLE_COLUMNS. When a genome has both, JSON is used.
+    """
+    byGenome: dict[str, Path] = {}
+    for f in sorted(summaryFiles, key=lambda f: f.suffix != ".json"):
+        byGenome.setdefault(genomeNameOfSummary(f), f)
+    files = list(byGenome.values())
+    if jobs > 1 and len(files) > 64:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            rows = list(
+                executor.map(
+                    _parseSummaryFile,
+                    files,
+                    chunksize=max(1, len(files) // (4 * jobs)),
+                )
+            )
+    else:
+        rows = [_parseSummaryFile(f) for f in files]
+    table = pd.DataFrame(
+        [row for row in rows if row is not None], columns=BUSCO_TABLE_COLUMNS
+    )
+    return table.astype({"n50": "Int64"})
+
+
+def updateBuscoTable(
+    tableFile: Path,
+    summaryFiles: list[Path],
+    jobs: int = os.cpu_count() or 1,
+) -> pd.DataFrame:
+    """
+    Bring the Parquet table at tableFile up to date with summaryFiles:
+    only new or changed files are parsed, rows of files that are gone are
+    dropped. Returns the table.
+    """
+    table = loadBuscoTable(tableFile) if tableFile.is_file() else None
+    if table is not None:
+        known = dict(zip(table["summaryFile"], table["summaryMtime"]))
+        current = {str(f): f.stat().st_mtime_ns for f in summaryFiles}
+        unchanged = table["summaryFile"].map(current).eq(table["summaryMtime"])
+        # Rows of removed summaries must go from the file too
+        dropped = not unchanged.all()
+        table = table[unchanged]
+        todo = [f for f in summaryFiles if known.get(str(f)) != current[str(f)]]
+    else:
+        todo = list(summaryFiles)
+        dropped = False
+    if todo or dropped or table is None:
+        new = collectBuscoResults(todo, jobs)
+        table = new if table is None else pd.concat([table, new])
+        table = table.drop_duplicates(["genome", "lineage"], keep="last")
+        table = table.sort_values(["genome", "lineage"], ignore_index=True)
+        tmpFile = tableFile.with_name(tableFile.name + ".part")
+        table.to_parquet(tmpFile, index=False)
+        tmpFile.replace(tableFile)
+    return table
+
+
+def loadBuscoTable(
+    tableFile: Path, columns: list[str] | None = None
+) -> pd.DataFrame:
+    """Read the Parquet table written by updateBuscoTable()."""
+    return pd.read_parquet(tableFile, columns=columns)
+
+
+def selectGenomes(
+    table: pd.DataFrame,
+    minComplete: float | None = None,
+    maxComplete: float | None = None,
+    maxDuplicated: float | None = None,
+    maxFragmented: float | None = None,
+    maxMissing: float | None = None,
+    lineage: str | None = None,
+) -> pd.DataFrame:
+    """
+    Rows passing all given thresholds, in percent of nMarkers.
+    min* keeps values >= threshold, max* keeps values < threshold, e.g.
+    selectGenomes(table, maxComplete=95) are genomes below 95% complete.
+    """
+    keep = pd.Series(True, index=table.index)
+    if lineage is not None:
+        keep &= table["lineage"] == lineage
+    markers = table["nMarkers"].where(table["nMarkers"] > 0)
+    if minComplete is not None:
+        keep &= table["completePercent"] >= minComplete
+    if maxComplete is not None:
+        keep &= table["completePercent"] < maxComplete
+    for column, threshold in (
+        ("duplicated", maxDuplicated),
+        ("fragmented", maxFragmented),
+        ("missing", maxMissing),
+    ):
+        if threshold is not None:
+            keep &= 100 * table[column] / markers < threshold
+    return table[keep]
@@ -0,0 +1,388 @@
+############################################
+# In-process MinHash sketches and Mash distances, no mash executable needed.
+# Sketches are the bottom-s hashes of the (canonical) k-mers of each fasta
+# file, stored as one array-backed .npz file.
+# Distances are computed blockwise from an inverted index of all hashes,
+# see minhashDistance().
+############################################
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Literal
+
+import numpy as np
+
+from pyBioinfo_modules.basic.decompress import openCompressed
+
+logger = logging.getLogger(__name__)
+
+MINHASH_SKETCH_SUFFIX = ".msk.npz"
+ALPHABETS: dict[str, bytes] = {
+    "DNA": b"ACGT",
+    "protein": b"ACDEFGHIKLMNPQRSTVWY",
+}
+# k-mers are packed into 64 bits before hashing
+BITS_PER_LETTER: dict[str, int] = {"DNA": 2, "protein": 5}
+MAX_KMER: dict[str, int] = {"DNA": 32, "protein": 12}
+DEFAULT_SEED = 42
+_UINT64_MAX = np.uint64(np.iinfo(np.uint64).max)
+
+
+def _codeTable(molecule: str) -> np.ndarray:
+    """Letter -> code, 255 for letters not in the alphabet."""
+    table = np.full(256, 255, dtype=np.uint8)
+    for code, letter in enumerate(ALPHABETS[molecule]):
+        table[letter] = code
+        table[ord(chr(letter).lower())] = code
+    return table
+
+
+def _readFastaSequences(fastaFile: Path) -> Iterator[bytes]:
+    """Sequences of a plain or compressed fasta file."""
+    chunks: list[bytes] = []
+    with openCompressed(fastaFile, "rb") as fh:
+        for line in fh:
+            if line.startswith(b">"):
+                if chunks:
+                    yield b"".join(chunks)
+                chunks = []
+            else:
+                chunks.append(line.strip())
+    if chunks:
+        yield b"".join(chunks)
+
+
+def _packKmers(codes: np.ndarray, kmer: int, bits: int) -> np.ndarray:
+    """All k-mers of a code array as uint64, first letter in the high bits."""
+    n = len(codes) - kmer + 1
+    packed = np.zeros(n, dtype=np.uint64)
+    for i in range(kmer):
+        packed <<= np.uint64(bits)
+        packed |= codes[i : i + n].astype(np.uint64)
+    return packed
+
+
+def _mix64(values: np.ndarray, seed: int) -> np.ndarray:
+    """fmix64 of MurmurHash3, vectorized. Overflow wraps as in C."""
+    x = values ^ np.uint64((seed * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xFF51AFD7ED558CCD)
+    x ^= x >> np.uint64(33)
+    x *= np.uint64(0xC4CEB9FE1A85EC53)
+    x ^= x >> np.uint64(33)
+    return x
+
+
+def hashKmers(
+    sequence: bytes,
+    kmer: int,
+    molecule: Literal["DNA", "protein"] = "DNA",
+    seed: int = DEFAULT_SEED,
+) -> np.ndarray:
+    """
+    Hashes of all k-mers of sequence, k-mers with letters outside the
+    alphabet (N, X, *, ...) are skipped. DNA k-mers are canonical: the
+    smaller of the k-mer and its reverse complement is hashed.
+    """
+    if not 0 < kmer <= MAX_KMER[molecule]:
+        raise ValueError(
+            f"kmer for {molecule} must be 1 to {MAX_KMER[molecule]}, got {kmer}"
+        )
+    codes = _codeTable(molecule)[np.frombuffer(sequence, dtype=np.uint8)]
+    if len(codes) < kmer:
+        return np.empty(0, dtype=np.uint64)
+    # A k-mer is valid when no invalid letter falls in its window
+    invalid = np.concatenate([[0], np.cumsum(codes == 255)])
+    valid = invalid[kmer:] == invalid[:-kmer]
+    codes = np.where(codes == 255, 0, codes)
+    bits = BITS_PER_LETTER[molecule]
+    packed = _packKmers(codes, kmer, bits)
+    if molecule == "DNA":
+        # Reverse complement k-mers, in the order of the forward ones
+        reverse = _packKmers(3 - codes[::-1], kmer, bits)[::-1]
+        packed = np.minimum(packed, reverse)
+    return _mix64(packed[valid], seed)
+
+
+def sketchSequences(
+    sequences: Iterator[bytes],
+    kmer: int,
+    sketchSize: int,
+    molecule: Literal["DNA", "protein"] = "DNA",
+    seed: int = DEFAULT_SEED,
+) -> np.ndarray:
+    """Bottom-sketchSize distinct hashes over all sequences, sorted."""
+    sketch = np.empty(0, dtype=np.uint64)
+    for sequence in sequences:
+        hashes = np.concatenate(
+            [sketch, hashKmers(sequence, kmer, molecule, seed)]
+        )
+        # Keep the running sketch small instead of all hashes of the file
+        sketch = np.unique(hashes)[:sketchSize]
+    return sketch
+
+
+class MinHashSketches:
+    """
+    Bottom-s MinHash sketches of a set of fasta files.
+
+    hashes holds the sorted sketches one after another, sketch i is
+    hashes[offsets[i]:offsets[i + 1]]. A sketch is shorter than sketchSize
+    only when the file has fewer distinct k-mers, it is then exact.
+    """
+
+    def __init__(
+        self,
+        names: list[str],
+        hashes: np.ndarray,
+        offsets: np.ndarray,
+        kmer: int,
+        sketchSize: int,
+        molecule: Literal["DNA", "protein"] = "DNA",
+        seed: int = DEFAULT_SEED,
+    ):
+        assert len(offsets) == len(names) + 1
+        self.names = list(names)
+        self.hashes = hashes
+        self.offsets = offsets
+        self.kmer = kmer
+        self.sketchSize = sketchSize
+        self.molecule = molecule
+        self.seed = seed
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def sketch(self, i: int) -> np.ndarray:
+        return self.hashes[self.offsets[i] : self.offsets[i + 1]]
+
+    def save(self, outputFile: Path) -> Path:
+        """Uncompressed .npz, written under a temporary name first."""
+        tmpFile = outputFile.with_name(outputFile.name + ".part.npz")
+        np.savez(
+            tmpFile,
+            names=np.array(self.names, dtype=str),
+            hashes=self.hashes,
+            offsets=self.offsets,
+            params=np.array(
+                [self.kmer, self.sketchSize, self.seed], dtype=np.int64
+            ),
+            molecule=np.array(self.molecule),
+        )
+        tmpFile.replace(outputFile)
+        return outputFile
+
+    @classmethod
+    def load(cls, sketchFile: Path) -> "MinHashSketches":
+        with np.load(sketchFile) as data:
+            kmer, sketchSize, seed = (int(v) for v in data["params"])
+            return cls(
+                names=data["names"].tolist(),
+                hashes=data["hashes"],
+                offsets=data["offsets"],
+                kmer=kmer,
+                sketchSize=sketchSize,
+                molecule=str(data["molecule"]),
+                seed=seed,
+            )
+
+
+def sketchFiles(
+    inputFiles: list[Path],
+    output: Path,
+    kmer: int,
+    sketch: int,
+    nthreads: int = 1,
+    molecule: Literal["DNA", "protein"] = "DNA",
+    seed: int = DEFAULT_SEED,
+) -> Path:
+    """
+    In-process counterpart of wrappers.mash.mashSketchFiles(), same names
+    (relative to the working directory) and parameters.
+    Returns output + MINHASH_SKETCH_SUFFIX, see MinHashSketches.load().
+    """
+    outputFile = Path(str(output) + MINHASH_SKETCH_SUFFIX)
+    names = [
+        str(f.resolve().relative_to(Path(".").resolve())) for f in inputFiles
+    ]
+
+    def sketchFile(fastaFile: Path) -> np.ndarray:
+        return sketchSequences(
+            _readFastaSequences(fastaFile), kmer, sketch, molecule, seed
+        )
+
+    # NumPy releases the GIL in the hashing and sorting
+    with ThreadPoolExecutor(max_workers=max(1, nthreads)) as executor:
+        sketches = list(executor.map(sketchFile, inputFiles))
+    offsets = np.zeros(len(sketches) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(s) for s in sketches])
+    hashes = (
+        np.concatenate(sketches) if sketches else np.empty(0, dtype=np.uint64)
+    )
+    logger.info(f"Sketched {len(names)} files into {outputFile}")
+    return MinHashSketches(
+        names, hashes, offsets, kmer, sketch, molecule, seed
+    ).save(outputFile)
+
+
+def mashDistanceFromJaccard(jaccard: np.ndarray, kmer: int) -> np.ndarray:
+    """Mash distance -1/k * ln(2j / (1 + j)), 1 for j == 0."""
+    with np.errstate(divide="ignore"):
+        distance = -np.log(2 * jaccard / (1 + jaccard)) / kmer
+    return np.clip(np.nan_to_num(distance, posinf=1.0), 0, 1)
+
+
+def minhashDistance(
+    sketches: MinHashSketches,
+    distanceOut: np.ndarray | None = None,
+    jaccardOut: np.ndarray | None = None,
+    blockCells: int = 1 << 22,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    All-vs-all Mash distances and Jaccard estimates as float32 N x N
+    matrices, in the order of sketches.names. The outputs may be given,
+    e.g. as np.memmap for large N.
+
+    For two sketches A and B, all hashes of A | B up to
+    x = min(max(A), max(B)) are known, the Jaccard estimate is
+    |A & B| / |A | B up to x|. This uses at least as many hashes as the
+    bottom-s union of mash dist, so values are close but not identical.
+
+    Rows are processed in blocks of about blockCells cells, sketches in
+    the order of their largest hash: for row i, the number of hashes of
+    every sketch up to max(A_i) is a running count over the sorted hashes.
+    """
+    n = len(sketches)
+    sizes = np.diff(sketches.offsets)
+    distance = (
+        distanceOut
+        if distanceOut is not None
+        else np.empty((n, n), dtype=np.float32)
+    )
+    jaccard = (
+        jaccardOut
+        if jaccardOut is not None
+        else np.empty((n, n), dtype=np.float32)
+    )
+    # Inverted index: all hashes sorted, with the sketch they belong to
+    owner = np.repeat(np.arange(n), sizes)
+    order = np.argsort(sketches.hashes, kind="stable")
+    allHashes = sketches.hashes[order]
+    allOwners = owner[order]
+    # Largest hash of full sketches, shorter sketches hold all their hashes
+    lastHash = sketches.hashes[np.maximum(sketches.offsets[1:] - 1, 0)]
+    maxHash = np.where(sizes >= sketches.sketchSize, lastHash, _UINT64_MAX)
+    maxHash[sizes == 0] = _UINT64_MAX
+    rowOrder = np.argsort(maxHash, kind="stable")
+
+    blockRows = max(1, blockCells // max(1, n))
+    countBelow = np.zeros(n, dtype=np.int64)
+    position = 0
+    for start in range(0, n, blockRows):
+        rows = rowOrder[start : start + blockRows]
+        b = len(rows)
+        # |A_i & B_j| by looking up every hash of the block rows
+        rowHashes = np.concatenate([sketches.sketch(i) for i in rows])
+        rowLabels = np.repeat(np.arange(b), sizes[rows])
+        left = np.searchsorted(allHashes, rowHashes, "left")
+        lengths = np.searchsorted(allHashes, rowHashes, "right") - left
+        hits = np.repeat(left - np.cumsum(lengths) + lengths, lengths)
+        hits += np.arange(len(hits))
+        shared = np.bincount(
+            np.repeat(rowLabels, lengths) * n + allOwners[hits],
+            minlength=b * n,
+        ).reshape(b, n)
+        # |B_j up to max(A_i)|, maxHash is ascending along rowOrder
+        ends = np.searchsorted(allHashes, maxHash[rows], "right")
+        segmentLabels = np.repeat(
+            np.arange(b), np.diff(np.concatenate([[position], ends]))
+        )
+        below = (
+            np.bincount(
+                segmentLabels * n + allOwners[position : ends[-1]],
+                minlength=b * n,
+            )
+            .reshape(b, n)
+            .cumsum(axis=0)
+            + countBelow
+        )
+        countBelow = below[-1]
+        position = ends[-1]
+        union = sizes[rows][:, None] + below - shared
+        with np.errstate(divide="ignore", invalid="ignore"):
+            blockJaccard = np.where(union > 0, shared / union, 0.0)
+        blockDistance = mashDistanceFromJaccard(blockJaccard, sketches.kmer)
+        # Valid for sketches with a larger largest hash: fill both halves
+        for t, i in enumerate(rows):
+            columns = rowOrder[start + t :]
+            jaccard[i, columns] = blockJaccard[t, columns]
+            jaccard[columns, i] = blockJaccard[t, columns]
+            distance[i, columns] = blockDistance[t, columns]
+            distance[columns, i] = blockDistance[t, columns]
+    return distance, jaccard
+
+
+if __name__ == "__main__":
+    # Self check against exact Jaccard on random sequences
+    import os
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(0)
+    letters = np.frombuffer(ALPHABETS["protein"], dtype=np.uint8)
+    base = rng.choice(letters, 3000).tobytes()
+    sequences = []
+    for i in range(40):
+        mutated = np.frombuffer(base, dtype=np.uint8).copy()
+        changed = rng.random(len(mutated)) < i / 100
+        mutated[changed] = rng.choice(letters, changed.sum())
+        sequences.append(mutated.tobytes())
+    kmer = 7
+
+    def kmerSet(sequence: bytes) -> set:
+        # Two proteins per file, see below
+        return set(hashKmers(sequence[:1500], kmer, "protein").tolist()) | set(
+            hashKmers(sequence[1500:], kmer, "protein").tolist()
+        )
+
+    def exactJaccard(a: bytes, b: bytes) -> float:
+        return len(kmerSet(a) & kmerSet(b)) / len(kmerSet(a) | kmerSet(b))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Sketch names are relative to the working directory
+        os.chdir(tmp)
+        files = []
+        for i, sequence in enumerate(sequences):
+            files.append(Path(tmp) / f"bgc{i}.faa")
+            files[-1].write_bytes(b">p1\n" + sequence[:1500] + b"\n>p2\n")
+            with files[-1].open("ab") as fh:
+                fh.write(sequence[1500:] + b"\n")
+        for sketchSize in (5000, 500):
+            sketchFile = sketchFiles(
+                files, Path(tmp) / "sketch", kmer, sketchSize, 2, "protein"
+            )
+            sketches = MinHashSketches.load(sketchFile)
+            start = time.time()
+            distance, jaccard = minhashDistance(sketches, blockCells=200)
+            print(f"s={sketchSize}: {time.time() - start:.3f} s")
+            exact = np.array(
+                [[exactJaccard(a, b) for b in sequences] for a in sequences]
+            )
+            error = np.abs(jaccard - exact).max()
+            assert np.allclose(jaccard, jaccard.T) and np.all(
+                np.diag(distance) == 0
+            )
+            if sketchSize == 5000:
+                # Sketches hold all k-mers, the estimate is exact
+                assert error < 1e-6, error
+            else:
+                assert error < 0.1, error
+            print(f"Max Jaccard error {error:.4f}, Test pass")
+    # DNA k-mers are canonical
+    dna = b"ACGTTGCAAGGCTTNACGGATCCA"
+    reverse = dna[::-1].translate(bytes.maketrans(b"ACGTN", b"TGCAN"))
+    assert np.array_equal(
+        np.sort(hashKmers(dna, 5)), np.sort(hashKmers(reverse, 5))
+    )
+    print("Canonical DNA k-mers, Test pass")
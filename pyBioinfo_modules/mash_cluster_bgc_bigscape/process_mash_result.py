@@ -1,154 +1,764 @@
-import sys
-from pathlib import Path
-
-import numpy as np
-from tqdm import tqdm
-
-
-class mashBGC_ClusteringResult:
-    """
-    Store major results after mash clustering and medoid calculating.
-    Including:
-        clusterInfoDict: dict = pickle.load(fh)
-        family_distance_matrice: dict[str, list[list[float]]] = pickle.load(fh)
-        dict_medoids: dict[str, list[str]] = pickle.load(fh)
-
-
-
-    """
-
-    def __init__(
-        self,
-    ) -> None:
-        pass
-
-
-def calculate_medoid(
-    inputDistanceTablePath: Path,  # output file (return) of mashDistance()
-    cutOff: float,  # default 0.8
-    med: dict[str, list[str]] = {},  # looks like you can pass previous result?
-) -> tuple[dict[str, list[str]], dict[str, list[list[float]]]]:
-    """
-    re-write of function in BiGMAP https://github.com/medema-group/BiG-MAP
-    calculates the GCFs based on similarity threshold
-    parameters and calculates the medoid of that GCF
-    ----------
-    outdir
-        string, the path to output directory
-    cut_off
-        float, between 0 and 1
-    returns
-    ----------
-    dict_medoids = {fasta file of medoid: similar fasta files}
-    """
-    # Parse the input into a dictionary of gene families
-    family: dict[str, str] = {}
-    # family dict, key = family members, values = family names
-    familyFiltered = {}
-    family_members: dict[str, list[str]] = {}
-    # family_members dict, key = family name, values = list of members
-    family_distance_matrices: dict[str, list[list[float]]] = {}
-    dict_medoids: dict[str, list[str]] = med
-
-    def add_to_distance_matrix(familyName, refId, queryId, distance):
-        def add_new_gene(familyName, idList, id) -> int:
-            if id not in idList:
-                idList.append(id)
-                # Extend distance matrix: One new row, one new column
-                for row in family_distance_matrices[familyName]:
-                    row.append(0)
-                family_distance_matrices[familyName].append([0] * len(idList))
-            return idList.index(id)
-
-        index1 = add_new_gene(familyName, family_members[familyName], refId)
-        index2 = add_new_gene(familyName, family_members[familyName], queryId)
-        family_distance_matrices[familyName][index1][index2] = distance
-        family_distance_matrices[familyName][index2][index1] = distance
-        return ()
-
-    with inputDistanceTablePath.open("r") as input:
-        pbar = tqdm(
-            total=inputDistanceTablePath.stat().st_size,
-            bar_format=r"{l_bar}{bar}| {n:,.0f}/{total:,.0f} {unit} "
-            + r"[{elapsed}<{remaining}, {rate_fmt}{postfix}]",
-            unit_scale=1 / 1048576,
-            unit="MB",
-            desc="Generating families from distance file",
-        )
-        readSize = 0
-        for idx, line in enumerate(input):
-            readSize += sys.getsizeof(line) - 50  # length of '\n'
-            if idx % 10000 == 0:
-                pbar.update(readSize)
-                readSize = 0
-            if line.startswith("#") or line.strip() == "":
-                continue
-
-            # Split into tab-separated elements
-            refId, queryId, distanceStr, pValueStr, nHashesStr = (
-                line.strip().split("\t")
-            )
-            sharedNhashes, totalNhashes = (
-                int(n) for n in nHashesStr.split("/")
-            )
-            shareRatio = sharedNhashes / totalNhashes
-            distance = float(distanceStr)
-            pValue = float(pValueStr)
-            # Look up the family of the first gene
-            # Each family is named by the first gene of the family
-            if queryId in family.keys():
-                familyName = family[queryId]
-            else:  # init a new family
-                familyName = queryId
-                family[queryId] = familyName
-                family_members[familyName] = []
-                family_distance_matrices[familyName] = []
-            # filter genes that are already part of another family
-            if queryId == family[queryId]:
-                familyFiltered[queryId] = family[queryId]
-            # If refId and queryId don't overlap, then there are two options:
-            # 1. refId and queryId do belong to the same family, and the
-            #    "not overlap" is "odd" in this case we accept queryId into
-            #    our family
-            # 2. refId and queryId actually belong to different families,
-            #    and we might have to create that family
-            if shareRatio <= cutOff:
-                # refId doesn't overlap at all, so put that one into a separate
-                # family
-                if refId in family.keys():
-                    if family[refId] == familyName:
-                        # refId is in our family, so record the distance
-                        add_to_distance_matrix(
-                            familyName, queryId, refId, distance
-                        )
-                    else:
-                        # gene is above cut off or doesn't belong to the family
-                        pass
-                else:
-                    # refId doesn't have a family yet, make one
-                    gene1_family_name = refId
-                    family[refId] = gene1_family_name
-                    family_members[gene1_family_name] = []
-                    family_distance_matrices[gene1_family_name] = []
-                    # insert refId into that family as only member, with a
-                    # distance of 0
-                    add_to_distance_matrix(
-                        gene1_family_name, refId, refId, distance
-                    )
-            else:
-                # There is some overlap, and we want refId also in this family
-                family[refId] = familyName
-                add_to_distance_matrix(familyName, queryId, refId, distance)
-
-        pbar.update(readSize)
-        pbar.close()
-    # For each family: Build a distance matrix, and then work out the medoid
-    for familyName in familyFiltered.keys():
-        # Calculate the medoid from the distances
-        np_array = np.asarray(family_distance_matrices[familyName])
-        medoid_index = np.argmin(np_array.sum(axis=0))
-        # Create a dictionary using the medoid as key and
-        # the family_members as values
-        medoidName = family_members[familyName][medoid_index]
-        dict_medoids[medoidName] = family_members[familyName]
-    return dict_medoids, family_distance_matrices
+import json
+import pickle
+import shutil
+import sys
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from pyBioinfo_modules.wrappers.mash import loadMashMatrix, readMashTable
+
+# (query, reference, distance, shared / total) of consecutive table lines
+MashEdges = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+# progress(done, total): bytes of a table or rows of a matrix
+ProgressCallback = Callable[[int, int], None]
+# The table is read in blocks of this size, progress is the file offset
+TABLE_READ_BUFFER = 16 << 20
+# Parsed edge list of a table, next to it, see cacheMashEdges()
+EDGE_CACHE_SUFFIX = ".edges"
+_EDGE_ARRAYS = {
+    "reference": np.int32,
+    "distance": np.float64,
+    "shareRatio": np.float64,
+}
+
+
+class _LazyFamilyMatrices(Mapping):
+    """Family distance matrices of a saved result, read on first access."""
+
+    def __init__(self, bundle, familyNames: list[str]) -> None:
+        self._bundle = bundle
+        self._keys = {name: f"family_{i}" for i, name in enumerate(familyNames)}
+        self._loaded: dict[str, np.ndarray] = {}
+
+    def __getitem__(self, familyName: str) -> np.ndarray:
+        if familyName not in self._loaded:
+            self._loaded[familyName] = self._bundle[self._keys[familyName]]
+        return self._loaded[familyName]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class mashBGC_ClusteringResult:
+    """
+    Store major results after mash clustering and medoid calculating.
+    Including:
+        clusterInfoDict: dict
+        family_distance_matrice: {family name: distance matrix}
+        dict_medoids: dict[str, list[str]]
+    The output of calculate_medoid() is (dict_medoids,
+    family_distance_matrice).
+
+    save() writes one uncompressed .npz bundle, each family matrix as its
+    own array. load() only reads the names and dicts, a family matrix is
+    read when it is first used. Older results of three pickle.dump() in a
+    row are read with loadPickle().
+    """
+
+    __slots__ = (
+        "clusterInfoDict",
+        "family_distance_matrice",
+        "dict_medoids",
+        "_bundle",
+    )
+
+    def __init__(
+        self,
+        clusterInfoDict: dict | None = None,
+        family_distance_matrice: Mapping[str, np.ndarray] | None = None,
+        dict_medoids: dict[str, list[str]] | None = None,
+    ) -> None:
+        self.clusterInfoDict = clusterInfoDict if clusterInfoDict else {}
+        self.family_distance_matrice = (
+            family_distance_matrice if family_distance_matrice else {}
+        )
+        self.dict_medoids = dict_medoids if dict_medoids else {}
+        self._bundle = None
+
+    def save(self, outputFile: Path) -> Path:
+        """Write the bundle under a temporary name first."""
+        familyNames = list(self.family_distance_matrice)
+        tmpFile = outputFile.with_name(outputFile.name + ".part.npz")
+        np.savez(
+            tmpFile,
+            familyNames=np.array(familyNames, dtype=str),
+            # Small and of any type, pickled as bytes
+            clusterInfoDict=np.frombuffer(
+                pickle.dumps(self.clusterInfoDict), dtype=np.uint8
+            ),
+            dict_medoids=np.frombuffer(
+                pickle.dumps(self.dict_medoids), dtype=np.uint8
+            ),
+            **{
+                f"family_{i}": np.asarray(
+                    self.family_distance_matrice[name], dtype=np.float64
+                )
+                for i, name in enumerate(familyNames)
+            },
+        )
+        tmpFile.replace(outputFile)
+        return outputFile
+
+    @classmethod
+    def load(cls, bundleFile: Path) -> "mashBGC_ClusteringResult":
+        """Open a bundle of save(), it stays open until close()."""
+        bundle = np.load(bundleFile)
+        result = cls(
+            pickle.loads(bundle["clusterInfoDict"].tobytes()),
+            None,
+            pickle.loads(bundle["dict_medoids"].tobytes()),
+        )
+        result.family_distance_matrice = _LazyFamilyMatrices(
+            bundle, bundle["familyNames"].tolist()
+        )
+        result._bundle = bundle
+        return result
+
+    @classmethod
+    def loadPickle(cls, pickleFile: Path) -> "mashBGC_ClusteringResult":
+        """Result pickled as clusterInfoDict, family matrices, medoids."""
+        with pickleFile.open("rb") as fh:
+            clusterInfoDict = pickle.load(fh)
+            family_distance_matrice = pickle.load(fh)
+            dict_medoids = pickle.load(fh)
+        return cls(
+            clusterInfoDict,
+            {
+                name: np.asarray(matrix, dtype=np.float64)
+                for name, matrix in family_distance_matrice.items()
+            },
+            dict_medoids,
+        )
+
+    def close(self) -> None:
+        if self._bundle is not None:
+            self._bundle.close()
+            self._bundle = None
+
+    def __enter__(self) -> "mashBGC_ClusteringResult":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _IdCodes:
+    """Sketch names to integer codes, in order of appearance."""
+
+    def __init__(self) -> None:
+        self.ids: list[str] = []
+        self._index = pd.Index([], dtype=object)
+
+    def extend(self, names) -> None:
+        self.ids.extend(names)
+        self._index = pd.Index(self.ids, dtype=object)
+
+    def encode(self, names: pd.Series) -> np.ndarray:
+        """Codes of categorical names, see readMashTable()."""
+        categories = names.cat.categories
+        codes = self._index.get_indexer(categories)
+        if (codes < 0).any():
+            self.extend(categories[codes < 0])
+            codes = self._index.get_indexer(categories)
+        return codes[names.cat.codes]
+
+
+def tqdmProgress(
+    desc: str = "Generating families",
+    unit: str = "MB",
+    unitScale: float = 1 / 1048576,
+) -> ProgressCallback:
+    """
+    progress callback drawing a tqdm bar, tqdm is only needed here.
+    For a matrix use unit="rows", unitScale=1.
+    """
+    from tqdm import tqdm
+
+    pbar = None
+
+    def progress(done: int, total: int) -> None:
+        nonlocal pbar
+        if pbar is None:
+            pbar = tqdm(
+                total=total,
+                bar_format=r"{l_bar}{bar}| {n:,.0f}/{total:,.0f} {unit} "
+                + r"[{elapsed}<{remaining}, {rate_fmt}{postfix}]",
+                unit_scale=unitScale,
+                unit=unit,
+                desc=desc,
+            )
+        pbar.update(done - pbar.n)
+        if done >= total:
+            pbar.close()
+
+    return progress
+
+
+def _parseMashTable(
+    inputDistanceTablePath: Path,
+    idCodes: _IdCodes,
+    chunkLines: int = 1 << 20,
+    progress: ProgressCallback | None = None,
+) -> Iterator[MashEdges]:
+    """
+    Edges of a mash dist table in line order, read in bulk.
+    inputDistanceTablePath is the text table or a dense matrix directory of
+    mashTableToMatrix(), whose row-major order is the line order.
+    progress is called after each chunk with the offset in the file, or
+    the rows done of a matrix.
+    """
+    if inputDistanceTablePath.is_dir():
+        matrix = loadMashMatrix(inputDistanceTablePath)
+        assert matrix["query"] is None, "Only dense matrices keep all pairs"
+        idCodes.extend(matrix["ids"])
+        n = len(matrix["ids"])
+        reference = np.arange(n)
+        for query in range(n):
+            yield (
+                np.full(n, query),
+                reference,
+                np.asarray(matrix["distance"][query], dtype=np.float64),
+                matrix["shared"][query] / matrix["total"][query],
+            )
+            if progress is not None:
+                progress(query + 1, n)
+        return
+    totalSize = inputDistanceTablePath.stat().st_size
+    with inputDistanceTablePath.open("rb", buffering=TABLE_READ_BUFFER) as fh:
+        for chunk in readMashTable(fh, chunkLines):
+            edges = (
+                idCodes.encode(chunk["query"]),
+                idCodes.encode(chunk["reference"]),
+                chunk["distance"].to_numpy(),
+                chunk["shared"].to_numpy(np.int64) / chunk["total"].to_numpy(),
+            )
+            if progress is not None:
+                # Read ahead by the parser, not more than one buffer
+                progress(fh.tell(), totalSize)
+            yield edges
+        if progress is not None:
+            progress(totalSize, totalSize)
+
+
+class _FamilyAssembler:
+    """
+    The family assignment of _calculate_medoid_legacy(), on integer codes,
+    fed chunk by chunk with add().
+
+    Lines are processed in runs of one query. Within a run every line
+    only reads and writes the family of its own reference, so a run with
+    distinct references is one array pass over the state at its start.
+    Runs with a repeated reference fall back to one line at a time.
+    Per family in order of creation, members is {member: index} and
+    writes the (row, column, distance) writes to its matrix in line order.
+    familyFiltered are the families to calculate a medoid for.
+    """
+
+    def __init__(self, cutOff: float) -> None:
+        self.cutOff = cutOff
+        self.familyOf = np.full(0, -1, dtype=np.int64)
+        self.members: dict[int, dict[int, int]] = {}
+        self.writes: dict[int, list[np.ndarray]] = {}
+        self.familyFiltered: dict[int, None] = {}
+
+    def _addRun(self, query, reference, distance, shareRatio) -> None:
+        familyOf, members, writes = self.familyOf, self.members, self.writes
+        familyName = int(familyOf[query])
+        if familyName < 0:  # init a new family, named by its first gene
+            familyName = query
+            familyOf[query] = query
+            members[query] = {}
+            writes[query] = []
+        if familyName == query:
+            self.familyFiltered[query] = None
+        known = familyOf[reference]
+        overlap = shareRatio > self.cutOff
+        # Overlapping, or not but already in our family: add to the family
+        add = overlap | (known == familyName)
+        # Not overlapping and without family: a family of its own
+        new = ~overlap & (known < 0)
+        familyOf[reference[overlap]] = familyName
+        for refId, refDistance in zip(
+            reference[new].tolist(), distance[new].tolist()
+        ):
+            familyOf[refId] = refId
+            members[refId] = {refId: 0}
+            writes[refId] = [np.array([[0, 0, refDistance]])]
+        if not add.any():
+            return
+        familyMembers = members[familyName]
+        familyMembers.setdefault(query, len(familyMembers))
+        for refId in reference[add].tolist():
+            familyMembers.setdefault(refId, len(familyMembers))
+        queryIndex = familyMembers[query]
+        refIndex = np.array([familyMembers[r] for r in reference[add].tolist()])
+        # [query][ref] then [ref][query], line by line
+        rows = np.column_stack([np.full(len(refIndex), queryIndex), refIndex])
+        writes[familyName].append(
+            np.column_stack(
+                [
+                    rows.ravel(),
+                    rows[:, ::-1].ravel(),
+                    np.repeat(distance[add], 2),
+                ]
+            )
+        )
+
+    def add(self, edges: MashEdges) -> None:
+        query, reference, distance, shareRatio = edges
+        if len(query) == 0:
+            return
+        size = int(max(query.max(), reference.max())) + 1
+        if size > len(self.familyOf):
+            self.familyOf = np.concatenate(
+                [
+                    self.familyOf,
+                    np.full(size - len(self.familyOf), -1, dtype=np.int64),
+                ]
+            )
+        starts = np.flatnonzero(np.r_[True, query[1:] != query[:-1]])
+        for start, end in zip(starts, np.r_[starts[1:], len(query)]):
+            q = int(query[start])
+            run = reference[start:end]
+            if len(np.unique(run)) == len(run):
+                self._addRun(q, run, distance[start:end], shareRatio[start:end])
+                continue
+            for i in range(start, end):
+                self._addRun(
+                    q,
+                    reference[i : i + 1],
+                    distance[i : i + 1],
+                    shareRatio[i : i + 1],
+                )
+
+    def medoids(
+        self, ids: list[str], med: dict[str, list[str]]
+    ) -> tuple[dict[str, list[str]], dict[str, np.ndarray]]:
+        """dict_medoids (added to med) and family distance matrices."""
+        family_distance_matrices = {
+            ids[familyName]: _familyMatrix(
+                self.members[familyName], self.writes[familyName]
+            )
+            for familyName in self.members
+        }
+        dict_medoids = med
+        # For each family: work out the medoid from the distance matrix
+        for familyName in self.familyFiltered:
+            medoid_index = np.argmin(
+                family_distance_matrices[ids[familyName]].sum(axis=0)
+            )
+            # Create a dictionary using the medoid as key and
+            # the family_members as values
+            familyMembers = [ids[m] for m in self.members[familyName]]
+            dict_medoids[familyMembers[medoid_index]] = familyMembers
+        return dict_medoids, family_distance_matrices
+
+
+def _familyMatrix(
+    familyMembers: dict[int, int], familyWrites: list[np.ndarray]
+) -> np.ndarray:
+    """Dense distance matrix of a family, the last write to a cell wins."""
+    n = len(familyMembers)
+    matrix = np.zeros((n, n))
+    if not familyWrites:
+        return matrix
+    cells = np.concatenate(familyWrites)
+    flat = cells[:, 0].astype(np.int64) * n + cells[:, 1].astype(np.int64)
+    # First occurrence in reversed order is the last write
+    _, last = np.unique(flat[::-1], return_index=True)
+    last = len(flat) - 1 - last
+    matrix.flat[flat[last]] = cells[last, 2]
+    return matrix
+
+
+def calculate_medoid(
+    inputDistanceTablePath: Path,  # output file (return) of mashDistance()
+    cutOff: float,  # default 0.8
+    med: dict[str, list[str]] = {},  # looks like you can pass previous result?
+    progress: ProgressCallback | None = None,
+) -> tuple[dict[str, list[str]], dict[str, np.ndarray]]:
+    """
+    re-write of function in BiGMAP https://github.com/medema-group/BiG-MAP
+    calculates the GCFs based on similarity threshold
+    parameters and calculates the medoid of that GCF
+    Same results as the line by line _calculate_medoid_legacy(), but
+    family distance matrices are NumPy arrays.
+    ----------
+    inputDistanceTablePath
+        mash dist table, or a dense matrix directory of mashDistance()
+    cut_off
+        float, between 0 and 1
+    progress
+        called as progress(done, total) while reading, e.g. tqdmProgress(),
+        None runs silent
+    returns
+    ----------
+    dict_medoids = {fasta file of medoid: similar fasta files}
+    """
+    idCodes = _IdCodes()
+    assembler = _FamilyAssembler(cutOff)
+    for edges in _parseMashTable(
+        inputDistanceTablePath, idCodes, progress=progress
+    ):
+        assembler.add(edges)
+    return assembler.medoids(idCodes.ids, med)
+
+
+def _tableStamp(tablePath: Path) -> dict:
+    stat = tablePath.stat()
+    return {
+        "table": str(tablePath.resolve()),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+    }
+
+
+def cacheMashEdges(
+    inputDistanceTablePath: Path,
+    cacheDir: Path | None = None,
+    progress: ProgressCallback | None = None,
+) -> Path:
+    """
+    Parse a mash dist table once into a compact edge list on disk, reused
+    while the table is unchanged (same size and mtime).
+
+    cacheDir (default: the table name + EDGE_CACHE_SUFFIX) holds ids.txt,
+    meta.json, one raw array per _EDGE_ARRAYS column and the runs of equal
+    queries (runQuery.npy, runStart.npy): 20 bytes per line instead of
+    the text line.
+    """
+    if cacheDir is None:
+        cacheDir = inputDistanceTablePath.with_name(
+            inputDistanceTablePath.name + EDGE_CACHE_SUFFIX
+        )
+    stamp = _tableStamp(inputDistanceTablePath)
+    metaFile = cacheDir / "meta.json"
+    if metaFile.is_file():
+        with metaFile.open("r") as fh:
+            if json.load(fh)["source"] == stamp:
+                return cacheDir
+    tmpDir = cacheDir.with_name(cacheDir.name + ".part")
+    if tmpDir.exists():
+        shutil.rmtree(tmpDir)
+    tmpDir.mkdir(parents=True)
+    idCodes = _IdCodes()
+    runQuery, runStart = [], []
+    nEdges = 0
+    handles = {
+        name: (tmpDir / f"{name}.bin").open("wb") for name in _EDGE_ARRAYS
+    }
+    try:
+        for edges in _parseMashTable(
+            inputDistanceTablePath, idCodes, progress=progress
+        ):
+            query = edges[0]
+            starts = np.flatnonzero(np.r_[True, query[1:] != query[:-1]])
+            runQuery.append(query[starts])
+            runStart.append(starts + nEdges)
+            for (name, dtype), values in zip(_EDGE_ARRAYS.items(), edges[1:]):
+                values.astype(dtype).tofile(handles[name])
+            nEdges += len(query)
+    finally:
+        for fh in handles.values():
+            fh.close()
+    np.save(tmpDir / "runQuery.npy", np.concatenate(runQuery).astype(np.int32))
+    np.save(tmpDir / "runStart.npy", np.concatenate(runStart).astype(np.int64))
+    (tmpDir / "ids.txt").write_text("".join(f"{i}\n" for i in idCodes.ids))
+    with (tmpDir / "meta.json").open("w") as fh:
+        json.dump({"source": stamp, "edges": nEdges}, fh, indent=1)
+    if cacheDir.exists():
+        shutil.rmtree(cacheDir)
+    tmpDir.rename(cacheDir)
+    return cacheDir
+
+
+def _readEdgeCache(
+    cacheDir: Path,
+    chunkEdges: int = 1 << 22,
+    progress: ProgressCallback | None = None,
+) -> Iterator[MashEdges]:
+    """Edges of cacheMashEdges() in line order, memory-mapped."""
+    with (cacheDir / "meta.json").open("r") as fh:
+        nEdges = json.load(fh)["edges"]
+    runQuery = np.load(cacheDir / "runQuery.npy")
+    runStart = np.load(cacheDir / "runStart.npy")
+    arrays = [
+        (
+            np.memmap(cacheDir / f"{name}.bin", dtype=dtype, mode="r")
+            if nEdges
+            else np.empty(0, dtype=dtype)
+        )
+        for name, dtype in _EDGE_ARRAYS.items()
+    ]
+    for start in range(0, nEdges, chunkEdges):
+        end = min(start + chunkEdges, nEdges)
+        run = np.searchsorted(runStart, np.arange(start, end), "right") - 1
+        yield (
+            runQuery[run],
+            *(np.asarray(a[start:end]) for a in arrays),
+        )
+        if progress is not None:
+            progress(end, nEdges)
+
+
+def calculate_medoid_sweep(
+    inputDistanceTablePath: Path,
+    cutOffs: list[float],
+    cacheDir: Path | None = None,
+    progress: ProgressCallback | None = None,
+) -> dict[float, tuple[dict[str, list[str]], dict[str, np.ndarray]]]:
+    """
+    calculate_medoid() at several cutoffs, {cutOff: (dict_medoids,
+    family distance matrices)}.
+
+    A text table is parsed once into the edge list of cacheMashEdges(),
+    later sweeps of the same table start from that cache. All cutoffs
+    are assembled in one pass over the edges. Dense matrix directories
+    are read directly.
+    """
+    assemblers = {cutOff: _FamilyAssembler(cutOff) for cutOff in cutOffs}
+    if inputDistanceTablePath.is_dir():
+        idCodes = _IdCodes()
+        edgeChunks = _parseMashTable(
+            inputDistanceTablePath, idCodes, progress=progress
+        )
+        ids = idCodes.ids
+    else:
+        cacheDir = cacheMashEdges(inputDistanceTablePath, cacheDir, progress)
+        edgeChunks = _readEdgeCache(cacheDir)
+        ids = (cacheDir / "ids.txt").read_text().splitlines()
+    for edges in edgeChunks:
+        for assembler in assemblers.values():
+            assembler.add(edges)
+    return {
+        cutOff: assembler.medoids(ids, {})
+        for cutOff, assembler in assemblers.items()
+    }
+
+
+def _calculate_medoid_legacy(
+    inputDistanceTablePath: Path,  # output file (return) of mashDistance()
+    cutOff: float,  # default 0.8
+    med: dict[str, list[str]] = {},  # looks like you can pass previous result?
+) -> tuple[dict[str, list[str]], dict[str, list[list[float]]]]:
+    """
+    Line by line original of calculate_medoid(), kept as reference for the
+    regression check in __main__.
+    re-write of function in BiGMAP https://github.com/medema-group/BiG-MAP
+    calculates the GCFs based on similarity threshold
+    parameters and calculates the medoid of that GCF
+    ----------
+    outdir
+        string, the path to output directory
+    cut_off
+        float, between 0 and 1
+    returns
+    ----------
+    dict_medoids = {fasta file of medoid: similar fasta files}
+    """
+    # Parse the input into a dictionary of gene families
+    family: dict[str, str] = {}
+    # family dict, key = family members, values = family names
+    familyFiltered = {}
+    family_members: dict[str, list[str]] = {}
+    # family_members dict, key = family name, values = list of members
+    family_distance_matrices: dict[str, list[list[float]]] = {}
+    dict_medoids: dict[str, list[str]] = med
+
+    def add_to_distance_matrix(familyName, refId, queryId, distance):
+        def add_new_gene(familyName, idList, id) -> int:
+            if id not in idList:
+                idList.append(id)
+                # Extend distance matrix: One new row, one new column
+                for row in family_distance_matrices[familyName]:
+                    row.append(0)
+                family_distance_matrices[familyName].append([0] * len(idList))
+            return idList.index(id)
+
+        index1 = add_new_gene(familyName, family_members[familyName], refId)
+        index2 = add_new_gene(familyName, family_members[familyName], queryId)
+        family_distance_matrices[familyName][index1][index2] = distance
+        family_distance_matrices[familyName][index2][index1] = distance
+        return ()
+
+    from tqdm import tqdm
+
+    with inputDistanceTablePath.open("r") as input:
+        pbar = tqdm(
+            total=inputDistanceTablePath.stat().st_size,
+            bar_format=r"{l_bar}{bar}| {n:,.0f}/{total:,.0f} {unit} "
+            + r"[{elapsed}<{remaining}, {rate_fmt}{postfix}]",
+            unit_scale=1 / 1048576,
+            unit="MB",
+            desc="Generating families from distance file",
+        )
+        readSize = 0
+        for idx, line in enumerate(input):
+            readSize += sys.getsizeof(line) - 50  # length of '\n'
+            if idx % 10000 == 0:
+                pbar.update(readSize)
+                readSize = 0
+            if line.startswith("#") or line.strip() == "":
+                continue
+
+            # Split into tab-separated elements
+            refId, queryId, distanceStr, pValueStr, nHashesStr = (
+                line.strip().split("\t")
+            )
+            sharedNhashes, totalNhashes = (
+                int(n) for n in nHashesStr.split("/")
+            )
+            shareRatio = sharedNhashes / totalNhashes
+            distance = float(distanceStr)
+            pValue = float(pValueStr)
+            # Look up the family of the first gene
+            # Each family is named by the first gene of the family
+            if queryId in family.keys():
+                familyName = family[queryId]
+            else:  # init a new family
+                familyName = queryId
+                family[queryId] = familyName
+                family_members[familyName] = []
+                family_distance_matrices[familyName] = []
+            # filter genes that are already part of another family
+            if queryId == family[queryId]:
+                familyFiltered[queryId] = family[queryId]
+            # If refId and queryId don't overlap, then there are two options:
+            # 1. refId and queryId do belong to the same family, and the
+            #    "not overlap" is "odd" in this case we accept queryId into
+            #    our family
+            # 2. refId and queryId actually belong to different families,
+            #    and we might have to create that family
+            if shareRatio <= cutOff:
+                # refId doesn't overlap at all, so put that one into a separate
+                # family
+                if refId in family.keys():
+                    if family[refId] == familyName:
+                        # refId is in our family, so record the distance
+                        add_to_distance_matrix(
+                            familyName, queryId, refId, distance
+                        )
+                    else:
+                        # gene is above cut off or doesn't belong to the family
+                        pass
+                else:
+                    # refId doesn't have a family yet, make one
+                    gene1_family_name = refId
+                    family[refId] = gene1_family_name
+                    family_members[gene1_family_name] = []
+                    family_distance_matrices[gene1_family_name] = []
+                    # insert refId into that family as only member, with a
+                    # distance of 0
+                    add_to_distance_matrix(
+                        gene1_family_name, refId, refId, distance
+                    )
+            else:
+                # There is some overlap, and we want refId also in this family
+                family[refId] = familyName
+                add_to_distance_matrix(familyName, queryId, refId, distance)
+
+        pbar.update(readSize)
+        pbar.close()
+    # For each family: Build a distance matrix, and then work out the medoid
+    for familyName in familyFiltered.keys():
+        # Calculate the medoid from the distances
+        np_array = np.asarray(family_distance_matrices[familyName])
+        medoid_index = np.argmin(np_array.sum(axis=0))
+        # Create a dictionary using the medoid as key and
+        # the family_members as values
+        medoidName = family_members[familyName][medoid_index]
+        dict_medoids[medoidName] = family_members[familyName]
+    return dict_medoids, family_distance_matrices
+
+
+if __name__ == "__main__":
+    # Regression check against the line by line original
+    import random
+    import tempfile
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        tablePath = Path(tmp) / "dist.tsv"
+        # Clustered BGCs, all-vs-all in the line order of mash dist
+        ids = [f"bgcs/bgc_{i}.fasta" for i in range(150)]
+        group = {i: random.randrange(12) for i in ids}
+        with tablePath.open("w") as fh:
+            for query in ids:
+                for ref in ids:
+                    if ref == query:
+                        shared = 1000
+                    elif group[ref] == group[query]:
+                        shared = random.randint(550, 1000)
+                    else:
+                        shared = random.randint(0, 300)
+                    distance = round(random.random() * (1 - shared / 1000), 6)
+                    fh.write(f"{ref}\t{query}\t{distance}\t0\t{shared}/1000\n")
+        # Not all-vs-all, with repeated references
+        partialPath = Path(tmp) / "partial.tsv"
+        with tablePath.open() as fh, partialPath.open("w") as out:
+            lines = fh.readlines()
+            # Keep self hits, else the original fails on empty families
+            kept = sorted(
+                random.sample(range(len(lines)), 4000)
+                + [i * (len(ids) + 1) for i in range(len(ids))]
+            )
+            for i in kept + list(range(150)) * 2:
+                out.write(lines[i])
+
+        from pyBioinfo_modules.wrappers.mash import mashTableToMatrix
+
+        matrixDir = mashTableToMatrix(tablePath, Path(tmp) / "matrix")
+        for path in (tablePath, partialPath, matrixDir):
+            for cutOff in (0.5, 0.6, 0.7, 0.8, 0.9):
+                legacyPath = tablePath if path == matrixDir else path
+                legacy, legacyMatrices = _calculate_medoid_legacy(
+                    legacyPath, cutOff, {}
+                )
+                medoids, matrices = calculate_medoid(path, cutOff, {})
+                assert medoids == legacy, (path, cutOff)
+                assert list(medoids) == list(legacy), (path, cutOff)
+                assert list(matrices) == list(legacyMatrices)
+                for name, matrix in legacyMatrices.items():
+                    expected = np.asarray(matrix, dtype=np.float64)
+                    if path == matrixDir:
+                        # Distances are stored as float32
+                        assert np.allclose(matrices[name], expected)
+                    else:
+                        assert np.array_equal(matrices[name], expected)
+                print(f"{path.name} cutOff {cutOff}: Test pass")
+            # All cutoffs from one pass, a second sweep from the cache
+            for sweep in range(2):
+                results = calculate_medoid_sweep(path, [0.5, 0.8])
+                for cutOff, (medoids, _) in results.items():
+                    assert medoids == calculate_medoid(path, cutOff, {})[0]
+            print(f"{path.name} sweep: Test pass")
+
+        # Save and lazy load of a result, and the pickled format
+        dict_medoids, matrices = calculate_medoid(tablePath, 0.8, {})
+        result = mashBGC_ClusteringResult(
+            {"cutOff": 0.8}, matrices, dict_medoids
+        )
+        bundleFile = result.save(Path(tmp) / "result.npz")
+        with mashBGC_ClusteringResult.load(bundleFile) as loaded:
+            assert loaded.dict_medoids == dict_medoids
+            assert list(loaded.family_distance_matrice) == list(matrices)
+            for name, matrix in matrices.items():
+                assert np.array_equal(
+                    loaded.family_distance_matrice[name], matrix
+                )
+        pickleFile = Path(tmp) / "result.pkl"
+        with pickleFile.open("wb") as fh:
+            pickle.dump({"cutOff": 0.8}, fh)
+            pickle.dump({k: v.tolist() for k, v in matrices.items()}, fh)
+            pickle.dump(dict_medoids, fh)
+        fromPickle = mashBGC_ClusteringResult.loadPickle(pickleFile)
+        assert fromPickle.clusterInfoDict == {"cutOff": 0.8}
+        assert fromPickle.dict_medoids == dict_medoids
+        print("mashBGC_ClusteringResult save/load: Test pass")
@@ -1,57 +1,310 @@
-# TODO: write a script change this file
-from pathlib import Path
-from typing import Literal
-
-SHELL: Literal["bash", "zsh"] = "zsh"
-CONDAEXE: Literal["conda", "mamba", "micromamba"] = "micromamba"
-
-MACS_ENV: Path | None = Path.home() / "genvs/macs3"
-MACS_PROGRAM = "macs3"
-
-ANTISMASH_ENV: Path | None = Path.home() / "genvs/quasan"
-BUSCO_ENV: Path | None = Path.home() / "genvs/quasan"
-PROKKA_ENV: Path | None = Path.home() / "genvs/quasan"
-MASH_ENV: Path | None = Path.home() / "genvs/phylophlan"
-BIGSCAPE_ENV: Path | None = Path.home() / "genvs/bigscape"
-SHORTREADS_ENV: Path | None = Path.home() / "genvs/shortReads"
-
-PFAM_DB: Path | None = None
-try:
-    PFAM_DB = sorted(
-        [
-            p
-            for p in (Path.home() / "dbMisc/antismash_databases/pfam").iterdir()
-            if p.is_dir()
-        ]
-    )[-1]
-except FileNotFoundError:
-    pass
-
-
-def withActivateEnvCmd(
-    cmd: str, condaEnv: Path | None = None, condaExe=CONDAEXE, shell=SHELL
-) -> str:
-    """
-    Join commands that activate your environment and your command.
-
-    Running this with popen needs shell=True.
-
-    Parameters:
-    cmd (str): The command to run after activating the environment.
-    condaEnv (Path | None): The path to the conda environment to activate.
-    condaExe (str): The conda executable to use (default is CONDAEXE).
-    shell (str): The shell to use (default is SHELL).
-
-    Returns:
-    str: The combined command to activate the environment and run the given command.
-    """
-    if condaEnv is not None:
-        if condaExe == "micromamba":
-            activateEnvCmd = f'eval "$(micromamba shell hook --shell={shell})"'
-        else:
-            activateEnvCmd = f'eval "$({condaExe} shell.{shell} hook)"'
-        activateEnvCmd += f" && micromamba activate {condaEnv}"
-        if isinstance(cmd, list):
-            cmd = " ".join(cmd)
-        cmd = activateEnvCmd + " && " + cmd
-    return cmd
+# TODO: write a script change this file
+import json
+import logging
+import os
+import subprocess
+import threading
+from functools import lru_cache
+from hashlib import md5
+from pathlib import Path
+from tempfile import TemporaryFile
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+SHELL: Literal["bash", "zsh"] = "zsh"
+CONDAEXE: Literal["conda", "mamba", "micromamba"] = "micromamba"
+
+MACS_ENV: Path | None = Path.home() / "genvs/macs3"
+MACS_PROGRAM = "macs3"
+
+ANTISMASH_ENV: Path | None = Path.home() / "genvs/quasan"
+BUSCO_ENV: Path | None = Path.home() / "genvs/quasan"
+PROKKA_ENV: Path | None = Path.home() / "genvs/quasan"
+MASH_ENV: Path | None = Path.home() / "genvs/phylophlan"
+BIGSCAPE_ENV: Path | None = Path.home() / "genvs/bigscape"
+SHORTREADS_ENV: Path | None = Path.home() / "genvs/shortReads"
+
+PFAM_DB: Path | None = None
+try:
+    PFAM_DB = sorted(
+        [
+            p
+            for p in (Path.home() / "dbMisc/antismash_databases/pfam").iterdir()
+            if p.is_dir()
+        ]
+    )[-1]
+except FileNotFoundError:
+    pass
+
+
+def withActivateEnvCmd(
+    cmd: str, condaEnv: Path | None = None, condaExe=CONDAEXE, shell=SHELL
+) -> str:
+    """
+    Join commands that activate your environment and your command.
+
+    Running this with popen needs shell=True.
+
+    Parameters:
+    cmd (str): The command to run after activating the environment.
+    condaEnv (Path | None): The path to the conda environment to activate.
+    condaExe (str): The conda executable to use (default is CONDAEXE).
+    shell (str): The shell to use (default is SHELL).
+
+    Returns:
+    str: The combined command to activate the environment and run the given command.
+    """
+    if condaEnv is not None:
+        if condaExe == "micromamba":
+            activateEnvCmd = f'eval "$(micromamba shell hook --shell={shell})"'
+        else:
+            activateEnvCmd = f'eval "$({condaExe} shell.{shell} hook)"'
+        activateEnvCmd += f" && micromamba activate {condaEnv}"
+        if isinstance(cmd, list):
+            cmd = " ".join(cmd)
+        cmd = activateEnvCmd + " && " + cmd
+    return cmd
+
+
+# Activating an environment through a shell hook costs seconds per call.
+# Instead, activate each environment once, record which variables the
+# activation changes and launch the tools directly with those variables.
+ENV_CACHE_DIR: Path = Path(
+    os.environ.get(
+        "PYBIOINFO_ENV_CACHE",
+        Path.home() / ".cache" / "pyBioinfo_modules" / "conda_envs",
+    )
+)
+# Variables the shell itself sets, they say nothing about the environment.
+_SHELL_OWN_VARS = {"_", "SHLVL", "PWD", "OLDPWD"}
+_activatedEnvVars: dict[tuple[str, str], dict] = {}
+_activatedEnvVarsLock = threading.Lock()
+
+
+def _envStamp(condaEnv: Path) -> int:
+    """Changes whenever packages are installed or removed in the env."""
+    condaMeta = condaEnv / "conda-meta"
+    if condaMeta.is_dir():
+        return condaMeta.stat().st_mtime_ns
+    return condaEnv.stat().st_mtime_ns
+
+
+def _envCacheFile(condaEnv: Path, condaExe: str) -> Path:
+    key = md5(f"{condaEnv.resolve()}|{condaExe}".encode()).hexdigest()
+    return ENV_CACHE_DIR / f"{condaEnv.name}_{key[:12]}.json"
+
+
+def _captureEnvVars(condaEnv: Path, condaExe: str, shell: str) -> dict:
+    cmd = withActivateEnvCmd("env -0", condaEnv, condaExe, shell)
+    result = subprocess.run(
+        cmd, capture_output=True, shell=True, executable=shell
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"Failed to activate {condaEnv}:\n{cmd}\n" + result.stderr.decode()
+        )
+    activated: dict[str, str] = {}
+    for item in result.stdout.decode().split("\0"):
+        if "=" in item:
+            k, v = item.split("=", 1)
+            activated[k] = v
+    changed = {
+        k: v
+        for k, v in activated.items()
+        if k not in _SHELL_OWN_VARS and os.environ.get(k) != v
+    }
+    removed = [
+        k for k in os.environ if k not in activated and k not in _SHELL_OWN_VARS
+    ]
+    # Keep only the entries activation puts in front of PATH, so the
+    # cache does not freeze the PATH of the process that created it.
+    pathPrepend = None
+    basePath = os.environ.get("PATH", "")
+    newPath = changed.get("PATH")
+    if newPath is not None and basePath and newPath.endswith(basePath):
+        pathPrepend = newPath[: -len(basePath)]
+        changed.pop("PATH")
+    return {
+        "condaEnv": str(condaEnv),
+        "condaExe": condaExe,
+        "stamp": _envStamp(condaEnv),
+        "set": changed,
+        "unset": removed,
+        "pathPrepend": pathPrepend,
+    }
+
+
+def getActivatedEnvVars(
+    condaEnv: Path, condaExe=CONDAEXE, shell=SHELL, refresh: bool = False
+) -> dict:
+    """
+    Variables changed by activating condaEnv, captured once.
+
+    The result is kept in memory and on disk (ENV_CACHE_DIR), keyed by the
+    environment path. It is captured again when the environment changes
+    (conda-meta is modified) or when refresh is True.
+
+    Returns:
+    dict: {"set": {var: value}, "unset": [var], "pathPrepend": str | None}
+    """
+    key = (str(condaEnv), condaExe)
+    with _activatedEnvVarsLock:
+        if not refresh and key in _activatedEnvVars:
+            return _activatedEnvVars[key]
+        cacheFile = _envCacheFile(condaEnv, condaExe)
+        envVars = None
+        if not refresh and cacheFile.is_file():
+            try:
+                with cacheFile.open("r") as fh:
+                    envVars = json.load(fh)
+                if envVars.get("stamp") != _envStamp(condaEnv):
+                    envVars = None
+            except (OSError, ValueError):
+                envVars = None
+        if envVars is None:
+            logger.info(f"Capturing activated environment of {condaEnv}")
+            envVars = _captureEnvVars(condaEnv, condaExe, shell)
+            try:
+                cacheFile.parent.mkdir(parents=True, exist_ok=True)
+                tmpFile = cacheFile.with_suffix(f".{os.getpid()}.tmp")
+                with tmpFile.open("w") as fh:
+                    json.dump(envVars, fh)
+                tmpFile.replace(cacheFile)
+            except OSError as e:
+                logger.warning(
+                    f"Could not cache environment of {condaEnv}: {e}"
+                )
+        _activatedEnvVars[key] = envVars
+        return envVars
+
+
+def activatedEnv(
+    condaEnv: Path | None = None, condaExe=CONDAEXE, shell=SHELL
+) -> dict[str, str] | None:
+    """
+    Full set of environment variables for running a tool in condaEnv.
+
+    Returns None when condaEnv is None, so subprocess inherits the current
+    environment.
+    """
+    if condaEnv is None:
+        return None
+    envVars = getActivatedEnvVars(condaEnv, condaExe, shell)
+    env = os.environ.copy()
+    for k in envVars["unset"]:
+        env.pop(k, None)
+    env.update(envVars["set"])
+    if envVars["pathPrepend"] is not None:
+        env["PATH"] = envVars["pathPrepend"] + env.get("PATH", "")
+    return env
+
+
+def _withExtraEnv(
+    env: dict[str, str] | None, extraEnv: dict[str, str] | None
+) -> dict[str, str] | None:
+    if not extraEnv:
+        return env
+    return {**(env if env is not None else os.environ), **extraEnv}
+
+
+def runInEnv(
+    cmd: list,
+    condaEnv: Path | None = None,
+    condaExe=CONDAEXE,
+    shell=SHELL,
+    **kwargs,
+) -> subprocess.CompletedProcess:
+    """
+    subprocess.run() the argument list cmd inside condaEnv, without a shell.
+
+    Extra keyword arguments are passed to subprocess.run(), variables in
+    env= are added to the environment.
+    """
+    return subprocess.run(
+        [str(c) for c in cmd],
+        env=_withExtraEnv(
+            activatedEnv(condaEnv, condaExe, shell), kwargs.pop("env", None)
+        ),
+        **kwargs,
+    )
+
+
+def popenInEnv(
+    cmd: list,
+    condaEnv: Path | None = None,
+    condaExe=CONDAEXE,
+    shell=SHELL,
+    **kwargs,
+) -> subprocess.Popen:
+    """subprocess.Popen() version of runInEnv()."""
+    return subprocess.Popen(
+        [str(c) for c in cmd],
+        env=_withExtraEnv(
+            activatedEnv(condaEnv, condaExe, shell), kwargs.pop("env", None)
+        ),
+        **kwargs,
+    )
+
+
+@lru_cache(maxsize=None)
+def getToolVersion(
+    cmd: tuple, condaEnv: Path | None = None, condaExe=CONDAEXE, shell=SHELL
+) -> str:
+    """
+    Output of a version command such as ("bakta", "--version").
+
+    Asked once per process for each command and environment.
+    """
+    result = runInEnv(
+        list(cmd), condaEnv, condaExe, shell, capture_output=True, text=True
+    )
+    result.check_returncode()
+    # Some tools print their version to stderr
+    return (result.stdout.strip() or result.stderr.strip()).strip()
+
+
+def runPipeInEnv(
+    cmds: list[list],
+    condaEnv: Path | None = None,
+    condaExe=CONDAEXE,
+    shell=SHELL,
+    stdout=None,
+) -> list[subprocess.CompletedProcess]:
+    """
+    Run cmds[0] | cmds[1] | ... inside condaEnv, without a shell.
+
+    stderr of every command is collected in a temporary file, so a chatty
+    program cannot block the pipe. Returns one CompletedProcess per command.
+    """
+    env = activatedEnv(condaEnv, condaExe, shell)
+    procs: list[subprocess.Popen] = []
+    errFiles = []
+    try:
+        for i, cmd in enumerate(cmds):
+            errFiles.append(TemporaryFile())
+            procs.append(
+                subprocess.Popen(
+                    [str(c) for c in cmd],
+                    stdin=procs[-1].stdout if procs else None,
+                    stdout=stdout if i == len(cmds) - 1 else subprocess.PIPE,
+                    stderr=errFiles[-1],
+                    env=env,
+                )
+            )
+            if len(procs) > 1:
+                # Let the previous command get SIGPIPE if this one exits.
+                procs[-2].stdout.close()
+        results = []
+        for proc, errFile in zip(procs, errFiles):
+            proc.wait()
+            errFile.seek(0)
+            results.append(
+                subprocess.CompletedProcess(
+                    proc.args, proc.returncode, None, errFile.read()
+                )
+            )
+        return results
+    finally:
+        for errFile in errFiles:
+            errFile.close()
@@ -1,431 +1,975 @@
-import logging
-import os
-import re
-import shutil
-import subprocess
-from datetime import datetime
-from pathlib import Path, PurePath
-from typing import Literal, TypedDict
-
-import ijson
-from Bio import SeqIO
-from Bio.Seq import Seq
-from Bio.SeqFeature import FeatureLocation
-from Bio.SeqRecord import SeqRecord
-from pyBioinfo_modules.basic.decompress import decompFileIfCompressed
-from pyBioinfo_modules.bio_sequences.bio_seq_file_extensions import (
-    FNA_EXTENSIONS,
-)
-from pyBioinfo_modules.wrappers._environment_settings import (
-    ANTISMASH_ENV,
-    CONDAEXE,
-    SHELL,
-    withActivateEnvCmd,
-)
-from tqdm import tqdm
-
-logger = logging.getLogger(__name__)
-
-
-def findClusterNumberStr(file: Path, numberOnly: bool = False) -> str | None:
-    match = clusterNumberPattern.search(file.name)
-    if match:
-        if not numberOnly:
-            return match[0].split(".")[1]
-        else:
-            return match[0].split(".")[1][-3:]
-    else:
-        return None
-
-
-antismashClusterGbkFileNameTest = "NNNNNNNNNNNn.region001.gbk"
-clusterGbkGlobTxt = r"*region[0-9][0-9][0-9].gbk"
-assert PurePath(antismashClusterGbkFileNameTest).match(clusterGbkGlobTxt)
-clusterNumberPattern = re.compile(r"\.region[0-9]{3}\.gbk$")
-assert (
-    findClusterNumberStr(Path(antismashClusterGbkFileNameTest)) == "region001"
-)
-
-
-def log_antismash_version(
-    condaexe=CONDAEXE, antismash_env=ANTISMASH_ENV, shell=SHELL
-) -> str:
-    logger.info(f"antiSMASH environment location: {antismash_env}")
-    logger.info(f"Conda executable: { condaexe }")
-    logger.info(f"Shell: { shell }")
-    cmd = withActivateEnvCmd(
-        "antismash --version", antismash_env, condaexe, shell
-    )
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            shell=True,
-            executable=shell,
-        )
-        result.check_returncode()
-        version = result.stdout.decode()
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Command '{cmd}' failed")
-        raise e
-    version = version.split(" ")[1].strip()
-    logger.info(f"antiSMASH version: {version}")
-    return version
-
-
-def runAntismash(
-    inputFilePath: Path,
-    title: str | None = None,
-    description: str | None = None,
-    taxon: Literal["bacteria", "fungi"] = "bacteria",
-    completeness: Literal[1, 2, 10] = 2,
-    condaExe: Literal["conda", "mamba", "micromamba"] = CONDAEXE,
-    condaEnv: Path | None = ANTISMASH_ENV,
-    cpu: int = 4,
-    output: Path | None = None,
-    shell: Literal["bash", "zsh"] = SHELL,
-    outputPrefix: str = "antismash",
-    addDateTimeToPrefix: bool = False,
-    geneFinding: Literal[
-        "glimmerhmm", "prodigal", "prodigal-m", "none", "error"
-    ] = "none",
-    # There will be short contig without CDS, if set to 'error'
-    # program will directly stop.
-    defaultGeneFinding: str = "prodigal",
-    silent: bool = False,
-    dry: bool = False,
-    overwrite: bool = False,
-    existsOk: bool = False,
-) -> Path:
-
-    logger.info(f"Running antiSMASH for {inputFilePath}")
-    log_antismash_version(condaExe, condaEnv, shell)
-
-    inputFilePath, unzip = decompFileIfCompressed(inputFilePath)
-
-    outputPrefix = "_".join(
-        item
-        for item in [
-            outputPrefix,
-            title,
-            f"level{completeness}",
-        ]
-        if item is not None
-    )
-    if addDateTimeToPrefix:
-        timeStr = datetime.now().strftime(r"%Y%m%d%H%M")
-        outputPrefix += "_" + timeStr
-    try:
-        if output is None:
-            outdir = inputFilePath.parent / outputPrefix
-        elif (
-            output.is_dir()
-            and output.resolve() in inputFilePath.resolve().parents
-        ):
-            # If output is a parent of inputfile, also create an output dir.
-            outdir = output / outputPrefix
-        else:
-            outdir = output
-
-        if (outdir / "index.html").exists():
-            if overwrite:
-                shutil.rmtree(outdir)
-            elif existsOk:
-                logger.info(f"Find result file in {outdir}, pass.")
-                return outdir.resolve()
-            else:
-                raise FileExistsError(str(outdir))
-        elif outdir.exists():
-            shutil.rmtree(outdir)
-
-        cmd = (
-            f"antismash --cpus {cpu}"
-            + " --minimal"
-            + f" --taxon {taxon}"
-            + f" --html-title {outputPrefix}"
-            + f" --output-dir {outdir}"
-        )
-        if inputFilePath.suffix in FNA_EXTENSIONS and geneFinding == "auto":
-            cmd += f" --genefinding-tool {defaultGeneFinding}"
-        elif geneFinding == "auto":
-            cmd += f" --genefinding-tool none"
-        else:
-            cmd += f" --genefinding-tool {geneFinding}"
-        if description is not None:
-            cmd += f" --html-description {description}"
-
-        if completeness >= 2:
-            cmd = cmd.replace(" --minimal", "")
-            cmd += " --cb-knownclusters"
-            cmd += " --cb-subclusters"
-            cmd += " --asf"
-        if completeness >= 3:
-            cmd += " --cb-general"
-            cmd += " --cc-mibig"
-            cmd += " --clusterhmmer"
-            cmd += " --pfam2go"
-            if taxon == "fungi":
-                cmd += " --cassis"
-        if completeness >= 4:
-            cmd += " --rre"
-            cmd += " --fullhmmer"
-            cmd += " --tigrfam"
-            cmd += " --smcog-trees"
-
-        cmd += f" {inputFilePath}"
-
-        if not silent:
-            logger.info(cmd)
-
-        cmd = withActivateEnvCmd(cmd, condaEnv, condaExe, shell)
-
-        if dry:
-            logger.info(cmd)
-        else:
-            commandResult = subprocess.run(
-                cmd, capture_output=True, shell=True, executable=shell
-            )
-            if commandResult.returncode != 0:
-                logger.error("Failed antismash:")
-                logger.error(cmd)
-                logger.error(commandResult.stdout.decode())
-                logger.error(commandResult.stderr.decode())
-    finally:
-        if unzip:
-            os.remove(str(inputFilePath))
-    logger.info(f"Done antiSMASH for {inputFilePath}")
-
-    return outdir.resolve()
-
-
-class ClusterInfo(TypedDict):
-    gbkFile: Path
-    gcProducts: str
-    organism: str
-    fromSequence: str
-    coreRelativeLocs: list[FeatureLocation]
-    joinedProteinFastaFile: Path
-    fastaId: str
-    # TODO
-    # Each AntiSMASH cluster is a "region", feature type == 'region',
-    # parse region info in 'qualifiers'
-    #     "region_number"
-    #     "product" (could be multiple)
-    # Each AntiSMASH cluster might have multiple protocluster,
-    # feature type == 'protocluster',
-    # parse protocluster info in 'qualifiers'
-    #     "protocluster_number"
-    #     "product"
-
-
-def parseClusterGbk(
-    infile: Path,
-    proteinFastaDir: Path,
-    id: int | None = None,
-    nflank: int = 0,
-) -> ClusterInfo:
-    """Parses the genbank files for DNA, protein, cluster, organism
-    [Rewrote of parsegbkcluster() from BiG-MAP]
-    parameters
-    ----------
-    infile
-        Path of .gbk file
-    proteinFastaDir
-        Path of protein fastas to store joined proteins for each cluster
-    nflank
-        Number of CDS to flank the core regions
-    returns
-    ----------
-    DNA = DNA sequence
-    proteins = protein sequence
-    clustername = name of the cluster
-    organism = name of the organism
-    #cluster_enzymes = {loc:gene_kind}
-    """
-    proteins = []
-    gcProducts = []
-    cdsIndexs = []
-    coreIndexs = []
-    coreRelativeLocs = []
-    records = list(SeqIO.parse(infile, "genbank"))
-    assert len(records) == 1
-    record = records[0]
-    for i, feature in enumerate(record.features):
-        # Parsing the regionname, part of antismash output
-        if "region" in feature.type:
-            if "product" in feature.qualifiers:
-                for product in feature.qualifiers["product"]:
-                    gcProducts.append(product)
-        # Parsing the protein sequence
-        if feature.type == "CDS":
-            cdsIndexs.append(i)
-            # remembering every CDS gene index
-            try:
-                proteins.append(feature.qualifiers["translation"][0])
-            except KeyError:
-                pass
-            # Parsing the relative core locations
-            try:
-                if feature.qualifiers["gene_kind"][0] == "biosynthetic":
-                    coreIndexs.append(i)
-            except KeyError:
-                pass
-
-    if len(coreIndexs) > 0:
-        if cdsIndexs.index(min(coreIndexs)) - nflank < 0 or cdsIndexs.index(
-            max(coreIndexs)
-        ) + nflank + 1 > len(cdsIndexs):
-            print(
-                "!!!flank_genes (-f) is higher than the number of flanking "
-                + f"genes in the cluster of file: {infile}, "
-                + "using whole gene cluster instead!!!"
-            )
-        if nflank == 0:
-            coreRelativeLocs = [record.features[i].location for i in coreIndexs]
-        else:
-            if cdsIndexs.index(min(coreIndexs)) - nflank >= 0:
-                core_region = cdsIndexs[
-                    cdsIndexs.index(min(coreIndexs))
-                    - nflank : cdsIndexs.index(max(coreIndexs))
-                    + nflank
-                    + 1
-                ]
-            else:
-                core_region = cdsIndexs[
-                    0 : cdsIndexs.index(max(coreIndexs)) + nflank + 1
-                ]
-            coreRelativeLocs = [
-                record.features[i].location for i in core_region
-            ]
-
-    organism = record.description
-    # Parsing organism name
-    # The attr. description is from "DEFINATION" line for gbk record
-    # biopython/Bio/GenBank/__init__.py line 764
-    # in class _FeatureConsumer(_BaseGenBankConsumer)
-    if " " in organism:
-        organism = "_".join(organism.split(",")[0].split())
-    organism = re.sub(f"strain", "", organism)
-    organism = re.sub(f'[()"]+', "", organism)
-    organism = re.sub(f"[\\/]+", "-", organism)
-    organism = re.sub(f"[.]+", ".", organism)
-    organism = re.sub(f"[_]+", "_", organism)
-
-    # write to protein fasta file
-    joinProteins = Seq("".join(proteins))
-    regionAndNumber = findClusterNumberStr(infile)
-    fromSequence = infile.name.split(regionAndNumber)[0][:-1]
-    if id is None:
-        proteinFastaFileName = (
-            f"GC_PROT-{fromSequence}-{regionAndNumber}" + ".fasta"
-        )
-    else:
-        proteinFastaFileName = f"P{id}"
-    fastaId = (
-        f"{organism}|{fromSequence}|"
-        + f"GC_PROT--{regionAndNumber}"
-        + f"--Entryname={':'.join(gcProducts)}"
-    )
-    proteinFastaFile = proteinFastaDir / proteinFastaFileName
-    SeqIO.write(
-        SeqRecord(joinProteins, id=fastaId, description=""),
-        proteinFastaFile,
-        "fasta",
-    )
-    assert proteinFastaFile.is_file()
-
-    return ClusterInfo(
-        gbkFile=infile,
-        gcProducts=":".join(gcProducts),
-        organism=organism,
-        fromSequence=fromSequence,
-        coreRelativeLocs=coreRelativeLocs,
-        joinedProteinFastaFile=proteinFastaFile,
-        fastaId=fastaId,
-    )
-
-
-def find_NRPS_TE_domain(jsonResultPath: Path) -> list[SeqRecord]:
-    teDomains: list[SeqRecord] = []
-    resultName = jsonResultPath.stem
-
-    def TE_follow_PCP(domainList: list[str]) -> bool:
-        try:
-            locationTe = domainList.index("Thioesterase")
-            try:
-                if domainList[locationTe - 1] == "PCP":
-                    return True
-            except IndexError:
-                pass
-            try:
-                if domainList[locationTe + 1] == "PCP":
-                    return True
-            except IndexError:
-                pass
-        except ValueError:
-            pass
-        return False
-
-    with open(jsonResultPath, "rb") as jsonHandle:
-        asResultRecords = ijson.kvitems(jsonHandle, "records.item")
-        recordFeatures = (v for k, v in asResultRecords if k == "features")
-        recordIds = (v for k, v in asResultRecords if k == "id")
-
-        for id, rec in zip(recordIds, recordFeatures):
-            regionNumber = -1
-            protoclusterNumber = -1
-            protoclusterProduct = ""
-            domainList: list[str] = []
-
-            for feat in rec:
-                if feat["type"] == "region":
-                    regionNumber = int(feat["qualifiers"]["region_number"][0])
-                elif feat["type"] == "protocluster":
-                    protoclusterNumber = int(
-                        feat["qualifiers"]["protocluster_number"][0]
-                    )
-                    protoclusterProduct = feat["qualifiers"]["product"][0]
-                if (
-                    protoclusterNumber == -1
-                    or not protoclusterProduct == "NRPS"
-                ):
-                    continue
-
-                if feat["type"] == "aSDomain":
-                    domain = feat["qualifiers"]["aSDomain"][0]
-                    domainList.append(domain)
-                    if domain == "Thioesterase":
-                        teSeqRec = SeqRecord(
-                            Seq(feat["qualifiers"]["translation"][0]),
-                            id="_".join(
-                                feat["qualifiers"]["domain_id"][0].split("_")[
-                                    1:
-                                ]
-                            ),
-                            name=feat["qualifiers"]["locus_tag"][0],
-                            description=(
-                                f"    {resultName}_seq_{id}"
-                                f"_region{regionNumber:0>3}"
-                                f"_protocluster{protoclusterNumber:0>3}"
-                            ),
-                        )
-
-                # See if next CDS started
-                if feat["type"] == "CDS":
-                    if TE_follow_PCP(domainList):
-                        assert "teSeqRec" in locals()
-                        tqdm.write(
-                            "Found valid TE domain:\n"
-                            f"    {resultName}_seq_{id}"
-                            f"_region{regionNumber:0>3}"
-                            f"_protocluster{protoclusterNumber:0>3}"
-                        )
-                        teDomains.append(teSeqRec)
-                    domainList = []
-
-    jsonHandle.close()
-    return teDomains
-    jsonHandle.close()
-    return teDomains
-    jsonHandle.close()
-    return teDomains
+import io
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+import sqlite3
+import subprocess
+import threading
+import zipfile
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path, PurePath
+from typing import IO, Iterator, Literal, TypedDict
+
+import ijson
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqFeature import FeatureLocation
+from Bio.SeqRecord import SeqRecord
+from pyBioinfo_modules.basic.calHash_on_args import hashFile
+from pyBioinfo_modules.basic.decompress import decompressedPath
+from pyBioinfo_modules.basic.result_cache import ResultCache
+from pyBioinfo_modules.bio_sequences.bio_seq_file_extensions import (
+    FNA_EXTENSIONS,
+)
+from pyBioinfo_modules.wrappers._environment_settings import (
+    ANTISMASH_ENV,
+    CONDAEXE,
+    SHELL,
+    getToolVersion,
+    runInEnv,
+)
+from tqdm import tqdm
+
+logger = logging.getLogger(__name__)
+
+
+def findClusterNumberStr(file: Path, numberOnly: bool = False) -> str | None:
+    match = clusterNumberPattern.search(file.name)
+    if match:
+        if not numberOnly:
+            return match[0].split(".")[1]
+        else:
+            return match[0].split(".")[1][-3:]
+    else:
+        return None
+
+
+antismashClusterGbkFileNameTest = "NNNNNNNNNNNn.region001.gbk"
+clusterGbkGlobTxt = r"*region[0-9][0-9][0-9].gbk"
+assert PurePath(antismashClusterGbkFileNameTest).match(clusterGbkGlobTxt)
+clusterNumberPattern = re.compile(r"\.region[0-9]{3}\.gbk$")
+assert (
+    findClusterNumberStr(Path(antismashClusterGbkFileNameTest)) == "region001"
+)
+
+
+def log_antismash_version(
+    condaexe=CONDAEXE, antismash_env=ANTISMASH_ENV, shell=SHELL
+) -> str:
+    logger.info(f"antiSMASH environment location: {antismash_env}")
+    logger.info(f"Conda executable: { condaexe }")
+    logger.info(f"Shell: { shell }")
+    cmd = ("antismash", "--version")
+    try:
+        # Cached, runAntismash asks the same for its result cache key.
+        version = getToolVersion(cmd, antismash_env, condaexe, shell)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Command '{' '.join(cmd)}' failed")
+        raise e
+    version = version.split(" ")[1].strip()
+    logger.info(f"antiSMASH version: {version}")
+    return version
+
+
+def runAntismash(
+    inputFilePath: Path,
+    title: str | None = None,
+    description: str | None = None,
+    taxon: Literal["bacteria", "fungi"] = "bacteria",
+    completeness: Literal[1, 2, 10] = 2,
+    condaExe: Literal["conda", "mamba", "micromamba"] = CONDAEXE,
+    condaEnv: Path | None = ANTISMASH_ENV,
+    cpu: int = 4,
+    output: Path | None = None,
+    shell: Literal["bash", "zsh"] = SHELL,
+    outputPrefix: str = "antismash",
+    addDateTimeToPrefix: bool = False,
+    geneFinding: Literal[
+        "glimmerhmm", "prodigal", "prodigal-m", "none", "error"
+    ] = "none",
+    # There will be short contig without CDS, if set to 'error'
+    # program will directly stop.
+    defaultGeneFinding: str = "prodigal",
+    silent: bool = False,
+    dry: bool = False,
+    overwrite: bool = False,
+    existsOk: bool = False,
+    resultCache: ResultCache | None = None,
+) -> Path:
+    """
+    A complete result (index.html) in the output directory raises
+    FileExistsError, unless existsOk (use it) or overwrite (run again).
+    With a resultCache, results are reused only when the input, the
+    antiSMASH version and the options are the same.
+    """
+
+    logger.info(f"Running antiSMASH for {inputFilePath}")
+
+    outputPrefix = "_".join(
+        item
+        for item in [
+            outputPrefix,
+            title,
+            f"level{completeness}",
+        ]
+        if item is not None
+    )
+    if addDateTimeToPrefix:
+        timeStr = datetime.now().strftime(r"%Y%m%d%H%M")
+        outputPrefix += "_" + timeStr
+    sourceFilePath = inputFilePath
+    # antiSMASH needs a file name: compressed input is decompressed to tmpfs
+    with decompressedPath(sourceFilePath) as inputFilePath:
+        if output is None:
+            outdir = sourceFilePath.parent / outputPrefix
+        elif (
+            output.is_dir()
+            and output.resolve() in sourceFilePath.resolve().parents
+        ):
+            # If output is a parent of inputfile, also create an output dir.
+            outdir = output / outputPrefix
+        else:
+            outdir = output
+
+        complete = (outdir / "index.html").exists()
+        if complete and not (overwrite or existsOk):
+            raise FileExistsError(str(outdir))
+        cacheKey = None
+        if resultCache is not None and not dry:
+            # The source decides the decompressed content, and unlike the
+            # per-run copy it keeps its digest cache entry between runs
+            cacheKey = resultCache.key(
+                "antismash",
+                getToolVersion(
+                    ("antismash", "--version"), condaEnv, condaExe, shell
+                ),
+                [sourceFilePath],
+                {
+                    "taxon": taxon,
+                    "completeness": completeness,
+                    "outputPrefix": outputPrefix,
+                    "description": description,
+                    "geneFinding": geneFinding,
+                    "defaultGeneFinding": defaultGeneFinding,
+                },
+            )
+        if cacheKey is not None and not overwrite:
+            if resultCache.fetchOrAdopt(cacheKey, outdir, complete=complete):
+                logger.info(f"Use cached result in {outdir}, pass.")
+                return outdir.resolve()
+        elif complete and not overwrite:
+            logger.info(f"Find result file in {outdir}, pass.")
+            return outdir.resolve()
+        elif cacheKey is not None:
+            # The new result replaces the cached one
+            resultCache.drop(cacheKey)
+        # Overwritten, incomplete, or restored from the cache for other
+        # input or options
+        if outdir.exists():
+            shutil.rmtree(outdir)
+
+        cmd = [
+            "antismash",
+            "--cpus",
+            str(cpu),
+            "--minimal",
+            "--taxon",
+            taxon,
+            "--html-title",
+            outputPrefix,
+            "--output-dir",
+            str(outdir),
+        ]
+        if inputFilePath.suffix in FNA_EXTENSIONS and geneFinding == "auto":
+            cmd += ["--genefinding-tool", defaultGeneFinding]
+        elif geneFinding == "auto":
+            cmd += ["--genefinding-tool", "none"]
+        else:
+            cmd += ["--genefinding-tool", geneFinding]
+        if description is not None:
+            cmd += ["--html-description", description]
+
+        if completeness >= 2:
+            cmd.remove("--minimal")
+            cmd.append("--cb-knownclusters")
+            cmd.append("--cb-subclusters")
+            cmd.append("--asf")
+        if completeness >= 3:
+            cmd.append("--cb-general")
+            cmd.append("--cc-mibig")
+            cmd.append("--clusterhmmer")
+            cmd.append("--pfam2go")
+            if taxon == "fungi":
+                cmd.append("--cassis")
+        if completeness >= 4:
+            cmd.append("--rre")
+            cmd.append("--fullhmmer")
+            cmd.append("--tigrfam")
+            cmd.append("--smcog-trees")
+
+        cmd.append(str(inputFilePath))
+
+        if not silent:
+            logger.info(" ".join(cmd))
+
+        if dry:
+            logger.info(" ".join(cmd))
+        else:
+            commandResult = runInEnv(
+                cmd, condaEnv, condaExe, shell, capture_output=True
+            )
+            if commandResult.returncode != 0:
+                logger.error("Failed antismash:")
+                logger.error(" ".join(cmd))
+                logger.error(commandResult.stdout.decode())
+                logger.error(commandResult.stderr.decode())
+            elif cacheKey is not None and (outdir / "index.html").exists():
+                resultCache.store(cacheKey, outdir)
+    logger.info(f"Done antiSMASH for {sourceFilePath}")
+
+    return outdir.resolve()
+
+
+ANTISMASH_JOB_STATES = ("pending", "running", "done", "failed")
+
+
+class AntismashJournal:
+    """
+    Per-genome state of an antiSMASH batch, kept in a small JSON file.
+
+    {"<input path>": {"state": "done", "output": ..., "time": ...}, ...}
+    The file is rewritten (write + rename) on every state change, so a
+    crashed batch leaves a readable journal behind.
+    """
+
+    def __init__(self, journalFile: Path):
+        self.journalFile = Path(journalFile)
+        self._lock = threading.Lock()
+        self.jobs: dict[str, dict] = {}
+        if self.journalFile.is_file():
+            with self.journalFile.open("r") as fh:
+                self.jobs = json.load(fh)
+
+    def state(self, inputFilePath: Path) -> str | None:
+        job = self.jobs.get(str(Path(inputFilePath).resolve()))
+        return None if job is None else job["state"]
+
+    def set(self, inputFilePath: Path, state: str, **info) -> None:
+        assert state in ANTISMASH_JOB_STATES
+        with self._lock:
+            job = self.jobs.setdefault(str(Path(inputFilePath).resolve()), {})
+            if state == "running":
+                job.pop("error", None)
+            job.update(info)
+            job["state"] = state
+            job["time"] = datetime.now().strftime(r"%Y-%m-%d %H:%M:%S")
+            self.journalFile.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.journalFile.with_name(self.journalFile.name + ".tmp")
+            with tmp.open("w") as fh:
+                json.dump(self.jobs, fh, indent=1)
+            tmp.replace(self.journalFile)
+
+
+def runAntismashBatch(
+    gbffs: list[Path],
+    output: Path,
+    total_cpus: int = 16,
+    jobs: int = 4,
+    journalFile: Path | None = None,
+    retryFailed: bool = True,
+    condaExe: Literal["conda", "mamba", "micromamba"] = CONDAEXE,
+    condaEnv: Path | None = ANTISMASH_ENV,
+    shell: Literal["bash", "zsh"] = SHELL,
+    **antismashArgs,
+) -> dict[Path, str]:
+    """
+    Run antiSMASH on several genomes at the same time.
+
+    Each genome gets total_cpus // jobs cpus and output / <file stem> as
+    output directory; other keyword arguments go to runAntismash().
+    Genomes marked done in the journal (default output /
+    antismash_batch.json) are skipped without looking at their output,
+    genomes left running by a crashed batch are run again.
+
+    Returns the final state of every genome in gbffs.
+    """
+    output = Path(output)
+    journal = AntismashJournal(
+        journalFile
+        if journalFile is not None
+        else output / "antismash_batch.json"
+    )
+    cpu = max(1, total_cpus // jobs)
+    todo: list[Path] = []
+    for gbff in gbffs:
+        state = journal.state(gbff)
+        if state == "done" or (state == "failed" and not retryFailed):
+            continue
+        journal.set(gbff, "pending")
+        todo.append(gbff)
+    logger.info(
+        f"{len(gbffs) - len(todo)} of {len(gbffs)} genomes already "
+        f"processed, running {len(todo)} with {jobs} jobs x {cpu} cpus."
+    )
+    if todo:
+        log_antismash_version(condaExe, condaEnv, shell)
+
+    def runOne(gbff: Path) -> None:
+        outdir = output / gbff.stem
+        journal.set(gbff, "running", output=str(outdir))
+        try:
+            outdir = runAntismash(
+                gbff,
+                title=gbff.stem,
+                output=outdir,
+                cpu=cpu,
+                condaExe=condaExe,
+                condaEnv=condaEnv,
+                shell=shell,
+                **antismashArgs,
+            )
+        except Exception as e:
+            logger.error(f"antiSMASH failed for {gbff}: {e}")
+            journal.set(gbff, "failed", error=repr(e))
+            return
+        if (outdir / "index.html").exists():
+            journal.set(gbff, "done")
+        else:
+            journal.set(gbff, "failed", error="no index.html")
+
+    # Threads are enough, each job only waits for its antiSMASH process.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(runOne, gbff) for gbff in todo]
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc="antiSMASH"
+        ):
+            future.result()
+
+    states = {gbff: journal.state(gbff) for gbff in gbffs}
+    nFailed = sum(1 for state in states.values() if state == "failed")
+    if nFailed:
+        logger.warning(f"antiSMASH failed for {nFailed} genomes.")
+    return states
+
+
+# Stored with cached parse results, increase when ClusterInfo changes
+CLUSTER_PARSE_VERSION = 1
+
+
+class ClusterInfo(TypedDict):
+    gbkFile: Path
+    gcProducts: str
+    organism: str
+    fromSequence: str
+    coreRelativeLocs: list[FeatureLocation]
+    joinedProteinFastaFile: Path
+    fastaId: str
+    # TODO
+    # Each AntiSMASH cluster is a "region", feature type == 'region',
+    # parse region info in 'qualifiers'
+    #     "region_number"
+    #     "product" (could be multiple)
+    # Each AntiSMASH cluster might have multiple protocluster,
+    # feature type == 'protocluster',
+    # parse protocluster info in 'qualifiers'
+    #     "protocluster_number"
+    #     "product"
+
+
+def _parseClusterRecord(
+    handle, infile: Path, nflank: int = 0
+) -> tuple[ClusterInfo, str]:
+    """
+    ClusterInfo of a region gbk read from handle, and the joined protein
+    sequence. joinedProteinFastaFile is left None, see parseClusterGbk().
+    """
+    records = list(SeqIO.parse(handle, "genbank"))
+    assert len(records) == 1
+    return clusterInfoOfRecord(records[0], infile, nflank)
+
+
+def clusterInfoOfRecord(
+    record: SeqRecord, infile: Path, nflank: int = 0
+) -> tuple[ClusterInfo, str]:
+    """_parseClusterRecord() of a record already read from infile."""
+    proteins = []
+    gcProducts = []
+    cdsIndexs = []
+    coreIndexs = []
+    coreRelativeLocs = []
+    for i, feature in enumerate(record.features):
+        # Parsing the regionname, part of antismash output
+        if "region" in feature.type:
+            if "product" in feature.qualifiers:
+                for product in feature.qualifiers["product"]:
+                    gcProducts.append(product)
+        # Parsing the protein sequence
+        if feature.type == "CDS":
+            cdsIndexs.append(i)
+            # remembering every CDS gene index
+            try:
+                proteins.append(feature.qualifiers["translation"][0])
+            except KeyError:
+                pass
+            # Parsing the relative core locations
+            try:
+                if feature.qualifiers["gene_kind"][0] == "biosynthetic":
+                    coreIndexs.append(i)
+            except KeyError:
+                pass
+
+    if len(coreIndexs) > 0:
+        if cdsIndexs.index(min(coreIndexs)) - nflank < 0 or cdsIndexs.index(
+            max(coreIndexs)
+        ) + nflank + 1 > len(cdsIndexs):
+            print(
+                "!!!flank_genes (-f) is higher than the number of flanking "
+                + f"genes in the cluster of file: {infile}, "
+                + "using whole gene cluster instead!!!"
+            )
+        if nflank == 0:
+            coreRelativeLocs = [record.features[i].location for i in coreIndexs]
+        else:
+            if cdsIndexs.index(min(coreIndexs)) - nflank >= 0:
+                core_region = cdsIndexs[
+                    cdsIndexs.index(min(coreIndexs))
+                    - nflank : cdsIndexs.index(max(coreIndexs))
+                    + nflank
+                    + 1
+                ]
+            else:
+                core_region = cdsIndexs[
+                    0 : cdsIndexs.index(max(coreIndexs)) + nflank + 1
+                ]
+            coreRelativeLocs = [
+                record.features[i].location for i in core_region
+            ]
+
+    organism = record.description
+    # Parsing organism name
+    # The attr. description is from "DEFINATION" line for gbk record
+    # biopython/Bio/GenBank/__init__.py line 764
+    # in class _FeatureConsumer(_BaseGenBankConsumer)
+    if " " in organism:
+        organism = "_".join(organism.split(",")[0].split())
+    organism = re.sub(f"strain", "", organism)
+    organism = re.sub(f'[()"]+', "", organism)
+    organism = re.sub(f"[\\/]+", "-", organism)
+    organism = re.sub(f"[.]+", ".", organism)
+    organism = re.sub(f"[_]+", "_", organism)
+
+    regionAndNumber = findClusterNumberStr(infile)
+    fromSequence = infile.name.split(regionAndNumber)[0][:-1]
+    fastaId = (
+        f"{organism}|{fromSequence}|"
+        + f"GC_PROT--{regionAndNumber}"
+        + f"--Entryname={':'.join(gcProducts)}"
+    )
+    clusterInfo = ClusterInfo(
+        gbkFile=infile,
+        gcProducts=":".join(gcProducts),
+        organism=organism,
+        fromSequence=fromSequence,
+        coreRelativeLocs=coreRelativeLocs,
+        joinedProteinFastaFile=None,
+        fastaId=fastaId,
+    )
+    return clusterInfo, "".join(proteins)
+
+
+def parseClusterGbk(
+    infile: Path,
+    proteinFastaDir: Path,
+    id: int | None = None,
+    nflank: int = 0,
+    handle: IO[str] | None = None,
+) -> ClusterInfo:
+    """Parses the genbank files for DNA, protein, cluster, organism
+    [Rewrote of parsegbkcluster() from BiG-MAP]
+    parameters
+    ----------
+    infile
+        Path of .gbk file
+    proteinFastaDir
+        Path of protein fastas to store joined proteins for each cluster
+    nflank
+        Number of CDS to flank the core regions
+    handle
+        Read the gbk from this text handle instead of infile, e.g. a
+        member of a result zip, infile then only names the cluster
+    returns
+    ----------
+    DNA = DNA sequence
+    proteins = protein sequence
+    clustername = name of the cluster
+    organism = name of the organism
+    #cluster_enzymes = {loc:gene_kind}
+    For many clusters, parseClusterGbks() writes one multi-FASTA instead.
+    """
+    clusterInfo, joinedProteins = _parseClusterRecord(
+        infile if handle is None else handle, infile, nflank
+    )
+
+    # write to protein fasta file
+    joinProteins = Seq(joinedProteins)
+    regionAndNumber = findClusterNumberStr(infile)
+    if id is None:
+        proteinFastaFileName = (
+            f"GC_PROT-{clusterInfo['fromSequence']}-{regionAndNumber}"
+            + ".fasta"
+        )
+    else:
+        proteinFastaFileName = f"P{id}"
+    proteinFastaFile = proteinFastaDir / proteinFastaFileName
+    SeqIO.write(
+        SeqRecord(joinProteins, id=clusterInfo["fastaId"], description=""),
+        proteinFastaFile,
+        "fasta",
+    )
+    assert proteinFastaFile.is_file()
+
+    clusterInfo["joinedProteinFastaFile"] = proteinFastaFile
+    return clusterInfo
+
+
+@lru_cache(maxsize=8)
+def _openZip(zipPath: str) -> zipfile.ZipFile:
+    """One open archive per worker process, the central directory is
+    read once."""
+    return zipfile.ZipFile(zipPath)
+
+
+def _parseClusterSource(
+    source: tuple[str, str | None], nflank: int
+) -> tuple[ClusterInfo, str]:
+    """Worker of parseClusterGbks(), source is (file, None) or (zip,
+    member). Zip members are named zip path / member name."""
+    path, member = source
+    if member is None:
+        return _parseClusterRecord(path, Path(path), nflank)
+    with _openZip(path).open(member) as fh:
+        return _parseClusterRecord(
+            io.TextIOWrapper(fh), Path(path) / member, nflank
+        )
+
+
+def _clusterSources(
+    antismashResults: list[Path],
+) -> list[tuple[tuple[str, str | None], str]]:
+    """((path, zip member), digest) of all region gbks, sorted by name.
+    Files have a content digest, zip members the CRC32 and size."""
+    sources = []
+    for antismashResult in antismashResults:
+        if zipfile.is_zipfile(antismashResult):
+            # Not _openZip(), forked workers would share the file offset
+            with zipfile.ZipFile(antismashResult) as zf:
+                infos = zf.infolist()
+            for info in infos:
+                if PurePath(info.filename).match(clusterGbkGlobTxt):
+                    sources.append(
+                        (
+                            (str(antismashResult), info.filename),
+                            f"crc32:{info.CRC:08x}:{info.file_size}",
+                        )
+                    )
+        else:
+            for gbk in antismashResult.rglob(clusterGbkGlobTxt):
+                sources.append(((str(gbk), None), hashFile(gbk).hex()))
+    return sorted(sources, key=lambda s: s[0])
+
+
+def parseClusterGbks(
+    antismashResult: Path | list[Path],
+    proteinFasta: Path,
+    nflank: int = 0,
+    jobs: int = os.cpu_count() or 1,
+    cacheFile: Path | None = None,
+) -> list[ClusterInfo]:
+    """
+    parseClusterGbk() on all region gbks of an antiSMASH result directory
+    (searched recursively) or zip, or a list of them, in a process pool.
+
+    Joined proteins go to one multi-FASTA, proteinFasta, with a samtools
+    style index next to it (proteinFasta + ".fai", read with
+    readJoinedProtein()). joinedProteinFastaFile of all records is
+    proteinFasta. A fastaId found in more than one result is prefixed with
+    the result name, "<zip stem or gbk directory>|<fastaId>".
+
+    With cacheFile, parse results are kept in an SQLite file keyed by the
+    gbk digest and nflank, so unchanged gbks are not parsed again.
+    """
+    if isinstance(antismashResult, Path):
+        antismashResult = [antismashResult]
+    sources = _clusterSources(antismashResult)
+    keys = [
+        f"{CLUSTER_PARSE_VERSION}:{nflank}:{digest}" for _, digest in sources
+    ]
+    parsed: dict[int, tuple[ClusterInfo, str]] = {}
+    conn = None
+    if cacheFile is not None:
+        cacheFile.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(cacheFile)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS clusters "
+            "(key TEXT PRIMARY KEY, result BLOB)"
+        )
+        for i, key in enumerate(keys):
+            row = conn.execute(
+                "SELECT result FROM clusters WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                parsed[i] = pickle.loads(row[0])
+    todo = [i for i in range(len(sources)) if i not in parsed]
+    logger.info(
+        f"{len(sources)} region gbks in {len(antismashResult)} results, "
+        f"{len(sources) - len(todo)} from cache, parsing {len(todo)}."
+    )
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+            results = executor.map(
+                _parseClusterSource,
+                [sources[i][0] for i in todo],
+                [nflank] * len(todo),
+                chunksize=max(1, len(todo) // (8 * max(1, jobs))),
+            )
+            for i, result in zip(todo, results):
+                parsed[i] = result
+    if conn is not None:
+        conn.executemany(
+            "INSERT OR REPLACE INTO clusters VALUES (?, ?)",
+            [(keys[i], pickle.dumps(parsed[i])) for i in todo],
+        )
+        conn.commit()
+        conn.close()
+
+    # The same organism and contig names in two results (replicate
+    # assemblies, contig_N ids) give the same fastaId, these are prefixed
+    # with the result name: the zip or the directory holding the gbk.
+    idCounts: dict[str, int] = {}
+    for clusterInfo, _ in parsed.values():
+        idCounts[clusterInfo["fastaId"]] = (
+            idCounts.get(clusterInfo["fastaId"], 0) + 1
+        )
+    fastaIds: set[str] = set()
+    clusterInfos = []
+    tmpFasta = proteinFasta.with_name(proteinFasta.name + ".part")
+    with tmpFasta.open("wb") as fasta, open(
+        str(tmpFasta) + ".fai", "w"
+    ) as index:
+        for i in range(len(sources)):
+            clusterInfo, joinedProteins = parsed[i]
+            # Cached results may come from a file at another place
+            path, member = sources[i][0]
+            clusterInfo["gbkFile"] = (
+                Path(path) if member is None else Path(path) / member
+            )
+            clusterInfo["joinedProteinFastaFile"] = proteinFasta
+            if idCounts[clusterInfo["fastaId"]] > 1:
+                resultName = (
+                    Path(path).parent.name
+                    if member is None
+                    else Path(path).stem
+                )
+                clusterInfo["fastaId"] = (
+                    f"{resultName}|{clusterInfo['fastaId']}"
+                )
+            if clusterInfo["fastaId"] in fastaIds:
+                raise ValueError(
+                    f"Duplicate FASTA id {clusterInfo['fastaId']} of "
+                    f"{clusterInfo['gbkFile']}, give results unique names."
+                )
+            fastaIds.add(clusterInfo["fastaId"])
+            fasta.write(f">{clusterInfo['fastaId']}\n".encode())
+            # name, length, offset, bases per line, bytes per line
+            index.write(
+                f"{clusterInfo['fastaId']}\t{len(joinedProteins)}\t"
+                f"{fasta.tell()}\t{len(joinedProteins)}\t"
+                f"{len(joinedProteins) + 1}\n"
+            )
+            fasta.write(f"{joinedProteins}\n".encode())
+            clusterInfos.append(clusterInfo)
+    Path(str(tmpFasta) + ".fai").replace(str(proteinFasta) + ".fai")
+    tmpFasta.replace(proteinFasta)
+    return clusterInfos
+
+
+@lru_cache(maxsize=8)
+def _fastaIndex(
+    indexFile: str, mtime: int
+) -> dict[str, tuple[int, int] | None]:
+    """Name -> (offset, length), None for names found more than once."""
+    index: dict[str, tuple[int, int] | None] = {}
+    with open(indexFile, "r") as fh:
+        for line in fh:
+            name, length, offset = line.split("\t")[:3]
+            index[name] = None if name in index else (int(offset), int(length))
+    return index
+
+
+def readJoinedProtein(proteinFasta: Path, fastaId: str) -> str:
+    """One sequence of a parseClusterGbks() multi-FASTA, by its index."""
+    indexFile = str(proteinFasta) + ".fai"
+    entry = _fastaIndex(indexFile, os.stat(indexFile).st_mtime_ns)[fastaId]
+    if entry is None:
+        raise KeyError(f"{fastaId} is not unique in {proteinFasta}")
+    offset, length = entry
+    with proteinFasta.open("rb") as fh:
+        fh.seek(offset)
+        return fh.read(length).decode()
+
+
+# The C backend is much faster, the pure python one is the fallback
+try:
+    _ijson = ijson.get_backend("yajl2_c")
+except ImportError:
+    _ijson = ijson
+_RECORD_PREFIX = "records.item"
+_FEATURE_PREFIX = "records.item.features.item"
+
+
+class DomainPattern(TypedDict):
+    name: str
+    # Consecutive aSDomain names within one CDS
+    domains: list[str]
+    # Index in domains of the domain to report
+    target: int
+
+
+class DomainHit(TypedDict):
+    pattern: str
+    resultName: str
+    recordId: str
+    regionNumber: int
+    protoclusterNumber: int
+    locusTag: str
+    domainId: str
+    # Domains of the CDS, in order
+    cdsDomains: list[str]
+    translation: str
+
+
+TE_PCP_PATTERNS = [
+    DomainPattern(name="TE_PCP", domains=["PCP", "Thioesterase"], target=1),
+    DomainPattern(name="TE_PCP", domains=["Thioesterase", "PCP"], target=0),
+]
+
+
+def _matchDomainPatterns(
+    cdsDomains: list[dict], patterns: list[DomainPattern]
+) -> Iterator[tuple[str, dict]]:
+    """(pattern name, aSDomain feature) of all pattern matches in the
+    domains of one CDS, each domain reported once per pattern name."""
+    names = [d["qualifiers"]["aSDomain"][0] for d in cdsDomains]
+    found = set()
+    for pattern in patterns:
+        n = len(pattern["domains"])
+        for start in range(len(names) - n + 1):
+            if names[start : start + n] != pattern["domains"]:
+                continue
+            key = (pattern["name"], start + pattern["target"])
+            if key not in found:
+                found.add(key)
+                yield pattern["name"], cdsDomains[start + pattern["target"]]
+
+
+class CdsDomains(TypedDict):
+    resultName: str
+    recordId: str
+    regionNumber: int
+    protoclusterNumber: int
+    protoclusterProduct: str
+    locusTag: str
+    # aSDomain features of the CDS, in order
+    domains: list[dict]
+
+
+def iterCdsDomains(
+    jsonResultPath: Path,
+    products: tuple[str, ...] | None = None,
+    jsonHandle: IO[bytes] | None = None,
+) -> Iterator[CdsDomains]:
+    """
+    aSDomain features of each CDS in an antiSMASH result JSON, read as a
+    stream of parse events. One feature is held at a time, plus the
+    domains of the current CDS, which is yielded when it ends.
+
+    Only CDSs after a protocluster with one of products are read (all
+    with products None). antiSMASH writes the record id before the
+    features; should it come after, the CDSs of the record are held
+    until the id is read, so memory is then bounded per record.
+    """
+    resultName = jsonResultPath.stem
+    if jsonHandle is None:
+        jsonHandle = open(jsonResultPath, "rb")
+    with jsonHandle:
+        # CDSs ended while the record id is not known yet
+        recordCds: list[CdsDomains] = []
+        cdsDomains: list[dict] = []
+        recordId: str | None = None
+        regionNumber = -1
+        protoclusterNumber = -1
+        protoclusterProduct = ""
+        builder = None
+
+        def endCds() -> None:
+            if cdsDomains:
+                recordCds.append(
+                    CdsDomains(
+                        resultName=resultName,
+                        recordId="",
+                        regionNumber=regionNumber,
+                        protoclusterNumber=protoclusterNumber,
+                        protoclusterProduct=protoclusterProduct,
+                        locusTag=cdsDomains[0]["qualifiers"]["locus_tag"][0],
+                        domains=list(cdsDomains),
+                    )
+                )
+                cdsDomains.clear()
+
+        for prefix, event, value in _ijson.parse(jsonHandle, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix != _FEATURE_PREFIX or event != "end_map":
+                    continue
+                feat = builder.value
+                builder = None
+                if feat["type"] == "region":
+                    regionNumber = int(feat["qualifiers"]["region_number"][0])
+                elif feat["type"] == "protocluster":
+                    endCds()
+                    protoclusterNumber = int(
+                        feat["qualifiers"]["protocluster_number"][0]
+                    )
+                    protoclusterProduct = feat["qualifiers"]["product"][0]
+                elif feat["type"] == "CDS":
+                    endCds()
+                elif feat["type"] == "aSDomain" and (
+                    products is None
+                    or (
+                        protoclusterNumber != -1
+                        and protoclusterProduct in products
+                    )
+                ):
+                    # Domains of the next CDS may come without a CDS between
+                    if cdsDomains and (
+                        cdsDomains[-1]["qualifiers"].get("locus_tag")
+                        != feat["qualifiers"].get("locus_tag")
+                    ):
+                        endCds()
+                    cdsDomains.append(feat)
+                if recordId is not None:
+                    for cds in recordCds:
+                        cds["recordId"] = recordId
+                        yield cds
+                    recordCds.clear()
+            elif prefix == _FEATURE_PREFIX and event == "start_map":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif prefix == "records.item.id":
+                recordId = value
+            elif prefix == _RECORD_PREFIX and event == "end_map":
+                # The last CDS of a record has no next CDS to end it
+                endCds()
+                for cds in recordCds:
+                    cds["recordId"] = recordId or ""
+                    yield cds
+                recordCds.clear()
+                recordId = None
+                regionNumber = -1
+                protoclusterNumber = -1
+                protoclusterProduct = ""
+
+
+def iterDomainHits(
+    jsonResultPath: Path,
+    patterns: list[DomainPattern] = TE_PCP_PATTERNS,
+    products: tuple[str, ...] | None = ("NRPS",),
+    jsonHandle: IO[bytes] | None = None,
+) -> Iterator[DomainHit]:
+    """
+    Domain architecture matches in an antiSMASH result JSON, streamed by
+    iterCdsDomains(). For queries over many results see
+    antismash_results.domain_index.
+    """
+    for cds in iterCdsDomains(jsonResultPath, products, jsonHandle):
+        for name, domain in _matchDomainPatterns(cds["domains"], patterns):
+            qualifiers = domain["qualifiers"]
+            yield DomainHit(
+                pattern=name,
+                resultName=cds["resultName"],
+                recordId=cds["recordId"],
+                regionNumber=cds["regionNumber"],
+                protoclusterNumber=cds["protoclusterNumber"],
+                locusTag=qualifiers["locus_tag"][0],
+                domainId=qualifiers["domain_id"][0],
+                cdsDomains=[
+                    d["qualifiers"]["aSDomain"][0] for d in cds["domains"]
+                ],
+                translation=qualifiers["translation"][0],
+            )
+
+
+def domainHitSeqRecord(hit: DomainHit) -> SeqRecord:
+    return SeqRecord(
+        Seq(hit["translation"]),
+        id="_".join(hit["domainId"].split("_")[1:]),
+        name=hit["locusTag"],
+        description=(
+            f"    {hit['resultName']}_seq_{hit['recordId']}"
+            f"_region{hit['regionNumber']:0>3}"
+            f"_protocluster{hit['protoclusterNumber']:0>3}"
+        ),
+    )
+
+
+def find_NRPS_TE_domain(
+    jsonResultPath: Path, jsonHandle: IO[bytes] | None = None
+) -> list[SeqRecord]:
+    """
+    NRPS thioesterase domains next to a PCP domain in an antiSMASH result
+    JSON. jsonHandle, when given, is read instead of opening
+    jsonResultPath, e.g. a member of a result zip.
+    """
+    teDomains: list[SeqRecord] = []
+    for hit in iterDomainHits(jsonResultPath, jsonHandle=jsonHandle):
+        teSeqRec = domainHitSeqRecord(hit)
+        tqdm.write("Found valid TE domain:\n" + teSeqRec.description)
+        teDomains.append(teSeqRec)
+    return teDomains
+
+
+def _listDomainHits(
+    jsonResultPath: Path,
+    patterns: list[DomainPattern],
+    products: tuple[str, ...] | None,
+) -> list[DomainHit]:
+    return list(iterDomainHits(jsonResultPath, patterns, products))
+
+
+def findDomainHits(
+    jsonResultPaths: list[Path],
+    patterns: list[DomainPattern] = TE_PCP_PATTERNS,
+    products: tuple[str, ...] | None = ("NRPS",),
+    jobs: int = os.cpu_count() or 1,
+) -> dict[Path, list[DomainHit]]:
+    """iterDomainHits() of many result JSONs in a process pool."""
+    hits: dict[Path, list[DomainHit]] = {}
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = {
+            executor.submit(_listDomainHits, path, patterns, products): path
+            for path in jsonResultPaths
+        }
+        for future in tqdm(
+            as_completed(futures), total=len(futures), desc="Domain search"
+        ):
+            hits[futures[future]] = future.result()
+    return {path: hits[path] for path in jsonResultPaths}
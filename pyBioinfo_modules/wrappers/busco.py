@@ -1,42 +1,387 @@
-# Note that busco cannot run multiple instances from the same
-# executable.
-import subprocess
-from pathlib import Path
-from typing import Literal
-
-from pyBioinfo_modules.wrappers._environment_settings import (
-    BUSCO_ENV, CONDAEXE, SHELL, withActivateEnvCmd)
-
-
-def runBusco(
-    targetProteome: Path,
-    outName: str,
-    outPath: Path,
-    condaEnv: Path | None = BUSCO_ENV,
-    condaExe: Literal["conda", "micromamba", "mamba"] = CONDAEXE,
-    shell: Literal["bash", "zsh"] = SHELL,
-    silent: bool = False,
-    cpu: int = 4,
-) -> Path:
-
-    cmd = (
-        f"busco --auto-lineage-prok -m prot -f -c {cpu}"
-        + f" -i {targetProteome}"
-        + f" --out_path {outPath}"
-        + f" -o {outName}"
-    )
-    if not silent:
-        print(cmd)
-
-    cmd = withActivateEnvCmd(cmd, condaEnv, condaExe, shell)
-
-    commandResult = subprocess.run(
-        cmd, capture_output=True, shell=True, executable=shell
-    )
-    if commandResult.returncode != 0:
-        print("Failed busco:")
-        print(cmd)
-        print(commandResult.stdout.decode())
-        print(commandResult.stderr.decode())
-
-    return outPath.resolve()
+# Note that busco cannot run multiple instances from the same
+# executable. Concurrent runs need their own working directory, see
+# runBuscoSharded().
+import logging
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Literal
+
+from pyBioinfo_modules.basic.result_cache import ResultCache
+from pyBioinfo_modules.busco_qc.process_busco_result import (
+    BUSCO_TABLE_FILE,
+    collectedGenomes,
+    genomeNameOfSummary,
+    parseShortSummaryJson,
+    selectGenomes,
+    updateBuscoTable,
+    writeBatchSummary,
+)
+from pyBioinfo_modules.wrappers._environment_settings import (
+    BUSCO_ENV,
+    CONDAEXE,
+    SHELL,
+    getToolVersion,
+    runInEnv,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def runBusco(
+    targetProteome: Path,
+    outName: str,
+    outPath: Path,
+    condaEnv: Path | None = BUSCO_ENV,
+    condaExe: Literal["conda", "micromamba", "mamba"] = CONDAEXE,
+    shell: Literal["bash", "zsh"] = SHELL,
+    silent: bool = False,
+    cpu: int = 4,
+    resultCache: ResultCache | None = None,
+) -> Path:
+
+    cacheKey = None
+    if resultCache is not None:
+        cacheKey = resultCache.key(
+            "busco",
+            getToolVersion(("busco", "--version"), condaEnv, condaExe, shell),
+            [targetProteome],
+            {
+                "lineage": "auto-lineage-prok",
+                "mode": "prot",
+                "outName": outName,
+            },
+        )
+        if resultCache.fetch(cacheKey, outPath / outName):
+            return outPath.resolve()
+
+    cmd = [
+        "busco",
+        "--auto-lineage-prok",
+        "-m",
+        "prot",
+        "-f",
+        "-c",
+        str(cpu),
+        "-i",
+        str(targetProteome),
+        "--out_path",
+        str(outPath),
+        "-o",
+        outName,
+    ]
+    if not silent:
+        print(" ".join(cmd))
+
+    commandResult = runInEnv(
+        cmd, condaEnv, condaExe, shell, capture_output=True
+    )
+    if commandResult.returncode != 0:
+        print("Failed busco:")
+        print(" ".join(cmd))
+        print(commandResult.stdout.decode())
+        print(commandResult.stderr.decode())
+    elif cacheKey is not None:
+        resultCache.store(cacheKey, outPath / outName)
+
+    return outPath.resolve()
+
+
+def _splitShards(proteomes: list[Path], shards: int) -> list[list[Path]]:
+    """Largest files first, each to the shard with the least bytes."""
+    bins: list[list[Path]] = [[] for _ in range(shards)]
+    load = [0] * shards
+    for proteome in sorted(
+        proteomes, key=lambda p: p.stat().st_size, reverse=True
+    ):
+        i = load.index(min(load))
+        bins[i].append(proteome)
+        load[i] += proteome.stat().st_size
+    return [b for b in bins if b]
+
+
+def _writeBuscoConfig(configFile: Path, settings: dict) -> Path:
+    with open(configFile, "w") as fh:
+        fh.write("[busco_run]\n")
+        for k, v in settings.items():
+            fh.write(f"{k} = {v}\n")
+    return configFile
+
+
+def _runBuscoShard(
+    shardDir: Path,
+    proteomes: list[Path],
+    settings: dict,
+    condaEnv: Path | None,
+    condaExe: str,
+    shell: str,
+) -> Path | None:
+    """Returns the BUSCO output dir of the shard, None if BUSCO failed."""
+    if shardDir.exists():
+        shutil.rmtree(shardDir)
+    inputDir = shardDir / "input"
+    tmpDir = shardDir / "tmp"
+    inputDir.mkdir(parents=True)
+    tmpDir.mkdir()
+    for proteome in proteomes:
+        (inputDir / proteome.name).symlink_to(proteome.resolve())
+    config = _writeBuscoConfig(
+        shardDir / "config.ini",
+        {
+            "in": inputDir,
+            "out": "busco",
+            "out_path": shardDir,
+            "mode": "proteins",
+            "force": True,
+            **settings,
+        },
+    )
+    cmd = ["busco", "--config", config]
+    logger.info(f"{shardDir.name}: {len(proteomes)} proteomes")
+    result = runInEnv(
+        cmd,
+        condaEnv,
+        condaExe,
+        shell,
+        cwd=shardDir,
+        env={"TMPDIR": str(tmpDir)},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        logger.error(f"BUSCO failed in {shardDir}: {result.stderr.strip()}")
+        return None
+    return shardDir / "busco"
+
+
+def runBuscoSharded(
+    proteomes: list[Path],
+    outPath: Path,
+    lineage: str | None = None,
+    shards: int = 4,
+    cpu: int = 16,
+    downloadPath: Path | None = None,
+    offline: bool = False,
+    condaEnv: Path | None = BUSCO_ENV,
+    condaExe: Literal["conda", "micromamba", "mamba"] = CONDAEXE,
+    shell: Literal["bash", "zsh"] = SHELL,
+) -> dict[str, Path]:
+    """
+    Run BUSCO (protein mode) on proteomes in shards, concurrently.
+
+    Each shard has its own input, output, tmp dir and config.ini under
+    outPath/shards and gets cpu // shards cpus. lineage None means
+    --auto-lineage. Results are collected as in a single BUSCO batch:
+        outPath/json_files/<proteome>.json  short summary JSON
+        outPath/<proteome>.txt              short summary
+        outPath/logs/<shard>/               BUSCO logs
+        outPath/batch_summary.txt           merged over all json_files
+    Returns {proteome file name: JSON} of this run, failed proteomes are
+    left out.
+    """
+    # Shards run inside their own directory
+    outPath = outPath.resolve()
+    outPath.mkdir(parents=True, exist_ok=True)
+    jsonDir = outPath / "json_files"
+    jsonDir.mkdir(exist_ok=True)
+    settings: dict = {"cpu": max(1, cpu // max(1, shards))}
+    if lineage is None:
+        settings["auto-lineage"] = True
+    else:
+        settings["lineage_dataset"] = lineage
+    if downloadPath is not None:
+        settings["download_path"] = downloadPath
+    if offline:
+        settings["offline"] = True
+
+    shardLists = _splitShards(list(proteomes), max(1, shards))
+    results: dict[str, Path] = {}
+    # Threads are enough, each shard waits for its BUSCO process.
+    with ThreadPoolExecutor(max_workers=max(1, len(shardLists))) as executor:
+        futures = {
+            executor.submit(
+                _runBuscoShard,
+                outPath / "shards" / f"shard_{i:03d}",
+                shardProteomes,
+                settings,
+                condaEnv,
+                condaExe,
+                shell,
+            ): shardProteomes
+            for i, shardProteomes in enumerate(shardLists)
+        }
+        for future in as_completed(futures):
+            buscoDir = future.result()
+            if buscoDir is None:
+                continue
+            results.update(_collectShard(buscoDir, outPath, jsonDir))
+
+    missing = {p.name for p in proteomes} - set(results)
+    if missing:
+        logger.error(f"No BUSCO result for {len(missing)}: {sorted(missing)}")
+    shutil.rmtree(outPath / "shards", ignore_errors=True)
+    mergeBatchSummary(jsonDir, outPath / "batch_summary.txt")
+    return results
+
+
+def runBuscoRerouted(
+    proteomes: list[Path],
+    outPath: Path,
+    rerouteOutPath: Path,
+    lineage: str,
+    minComplete: float = 95.0,
+    shards: int = 4,
+    cpu: int = 16,
+    downloadPath: Path | None = None,
+    offline: bool = False,
+    condaEnv: Path | None = BUSCO_ENV,
+    condaExe: Literal["conda", "micromamba", "mamba"] = CONDAEXE,
+    shell: Literal["bash", "zsh"] = SHELL,
+) -> tuple[dict[str, Path], dict[str, Path]]:
+    """
+    BUSCO with a fixed lineage, then again with --auto-lineage for the
+    proteomes below minComplete percent complete.
+
+    Both passes are runBuscoSharded() runs, into outPath and rerouteOutPath.
+    Proteomes with a result there already are skipped, so a rerun only does
+    the new work. The routing reads the table kept up to date at
+    outPath/BUSCO_TABLE_FILE, rerouteOutPath gets its own table.
+    The auto-lineage pass is never offline, it may need more datasets.
+    Returns the new results of the two passes, as runBuscoSharded().
+    """
+
+    def runPass(
+        passOut: Path, passLineage: str | None, todo: list[Path]
+    ) -> dict[str, Path]:
+        results = {}
+        if todo:
+            results = runBuscoSharded(
+                todo,
+                passOut,
+                lineage=passLineage,
+                shards=min(shards, len(todo)),
+                cpu=cpu,
+                downloadPath=downloadPath,
+                offline=offline and passLineage is not None,
+                condaEnv=condaEnv,
+                condaExe=condaExe,
+                shell=shell,
+            )
+        elif not (passOut / "batch_summary.txt").exists():
+            mergeBatchSummary(
+                passOut / "json_files", passOut / "batch_summary.txt"
+            )
+        return results
+
+    outPath.mkdir(parents=True, exist_ok=True)
+    done = collectedGenomes(outPath / "json_files")
+    fixedResults = runPass(
+        outPath, lineage, [p for p in proteomes if p.name not in done]
+    )
+    fixedTable = updateBuscoTable(
+        outPath / BUSCO_TABLE_FILE,
+        list((outPath / "json_files").glob("*.json")),
+        jobs=cpu,
+    )
+
+    rerouteOutPath.mkdir(parents=True, exist_ok=True)
+    done = collectedGenomes(rerouteOutPath / "json_files")
+    byName = {p.name: p for p in proteomes}
+    lowComplete = selectGenomes(fixedTable, maxComplete=minComplete)
+    todo = [
+        byName[g]
+        for g in lowComplete["genome"]
+        if g in byName and g not in done
+    ]
+    logger.info(
+        f"{len(lowComplete)} proteomes below {minComplete}% complete"
+        f" with {lineage}, {len(todo)} to rerun with auto-lineage"
+    )
+    rerouteResults = runPass(rerouteOutPath, None, todo)
+    updateBuscoTable(
+        rerouteOutPath / BUSCO_TABLE_FILE,
+        list((rerouteOutPath / "json_files").glob("*.json")),
+        jobs=cpu,
+    )
+    return fixedResults, rerouteResults
+
+
+def _collectShard(
+    buscoDir: Path, outPath: Path, jsonDir: Path
+) -> dict[str, Path]:
+    """Move summaries and logs of one shard to the batch layout."""
+    results = {}
+    for genomeDir in buscoDir.iterdir():
+        if not genomeDir.is_dir():
+            continue
+        if genomeDir.name == "logs":
+            logDir = outPath / "logs" / buscoDir.parent.name
+            logDir.parent.mkdir(exist_ok=True)
+            if logDir.exists():
+                shutil.rmtree(logDir)
+            genomeDir.rename(logDir)
+            continue
+        # With auto-lineage there is a generic and a specific summary
+        summaries = sorted(
+            genomeDir.glob("short_summary.*.json"),
+            key=lambda f: ".specific." not in f.name,
+        )
+        if not summaries:
+            continue
+        jsonFile = jsonDir / (genomeDir.name + ".json")
+        summaries[0].replace(jsonFile)
+        txtFile = summaries[0].with_suffix(".txt")
+        if txtFile.exists():
+            txtFile.replace(outPath / (genomeDir.name + ".txt"))
+        results[genomeDir.name] = jsonFile
+    return results
+
+
+def mergeBatchSummary(jsonDir: Path, outFile: Path) -> Path:
+    """batch_summary.txt of all short summary JSONs in jsonDir."""
+    summaries = []
+    for jsonFile in jsonDir.glob("*.json"):
+        summary = parseShortSummaryJson(jsonFile)
+        # Named after the input file, as in a BUSCO batch summary
+        summary["genome"] = genomeNameOfSummary(jsonFile)
+        summaries.append(summary)
+    return writeBatchSummary(summaries, outFile)
+
+
+def plotBusco(
+    summaryFiles: list[Path],
+    outDir: Path,
+    condaEnv: Path | None = BUSCO_ENV,
+    condaExe: Literal["conda", "micromamba", "mamba"] = CONDAEXE,
+    shell: Literal["bash", "zsh"] = SHELL,
+) -> list[Path]:
+    """
+    busco --plot on the given short summary files (.json/.txt), staged under
+    the short_summary.* names BUSCO looks for. Figures go to outDir.
+    """
+    with tempfile.TemporaryDirectory(dir=outDir) as stage:
+        stageDir = Path(stage)
+        for f in summaryFiles:
+            lineage = "lineage"
+            if f.suffix == ".json":
+                lineage = parseShortSummaryJson(f)["lineage"] or lineage
+            name = f.name
+            if not name.startswith("short_summary."):
+                name = f"short_summary.specific.{lineage}.{name}"
+            (stageDir / name).symlink_to(f.resolve())
+        result = runInEnv(
+            ["busco", "--plot", stageDir],
+            condaEnv,
+            condaExe,
+            shell,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            logger.error(f"BUSCO plot failed: {result.stderr.strip()}")
+            return []
+        figures = []
+        for figure in stageDir.glob("busco_figure*.png"):
+            figures.append(figure.replace(outDir / figure.name))
+        return figures
@@ -1,5 +1,4 @@
 import logging
-import subprocess
 import time
 from pathlib import Path
 
@@ -11,7 +10,7 @@ from Bio.SeqRecord import SeqRecord
 
 from pyBioinfo_modules.basic.basic import getTimeStr, timeDiffStr
 from pyBioinfo_modules.wrappers._environment_settings import (
-    SHELL, SHORTREADS_ENV, withActivateEnvCmd)
+    SHELL, SHORTREADS_ENV, runInEnv)
 
 logger = logging.getLogger(__name__)
 
@@ -110,12 +109,10 @@ def featureCounts(
             cmdList.insert(5, "-B")  # Only count read pairs that have both ends
             # aligned. (must set together with -P)
     logger.info(" ".join(cmdList))
-    cmd = withActivateEnvCmd(" ".join(cmdList), SHORTREADS_ENV)
     if dryRun:
         logger.info("Dry run, not executing command")
-        logger.info(cmd)
         return
-    res = subprocess.run(cmd, shell=True, capture_output=True, executable=SHELL)
+    res = runInEnv(cmdList, SHORTREADS_ENV, shell=SHELL, capture_output=True)
     if res.returncode != 0:
         logger.info(res.stdout.decode())
         logger.info(res.stderr.decode())
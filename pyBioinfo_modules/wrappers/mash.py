@@ -1,83 +1,336 @@
-import subprocess
-from pathlib import Path
-from tempfile import NamedTemporaryFile
-from typing import Literal
-
-from pyBioinfo_modules.wrappers._environment_settings import (
-    CONDAEXE, MASH_ENV, SHELL, withActivateEnvCmd)
-
-
-def mashSketchFiles(
-    inputFiles: list[Path],
-    output: Path,
-    kmer: int,
-    sketch: int,
-    nthreads: int = 1,
-    mashEnv=MASH_ENV,
-    condaExe=CONDAEXE,
-    shell=SHELL,
-    molecule: Literal["DNA", "protein"] = "DNA",
-) -> Path:
-    """
-    Calculates the distance between the query fasta files
-    stored in the sketch file by using mash.
-    """
-    fileList = NamedTemporaryFile()
-    with open(fileList.name, "w") as fl:
-        for f in inputFiles:
-            fl.write(f'{f.resolve().relative_to(Path(".").resolve())}\n')
-    cmd = f"mash sketch -o {output} -k {kmer} -p {nthreads} -s {sketch}"
-    cmd += " -a" if molecule == "protein" else ""
-    cmd += f" -l {fileList.name}"
-    mashSketchRun = subprocess.run(
-        withActivateEnvCmd(cmd, mashEnv, condaExe, shell),
-        shell=True,
-        capture_output=True,
-        executable=shell,
-    )
-    assert mashSketchRun.returncode == 0, (
-        withActivateEnvCmd(cmd, mashEnv, condaExe, shell)
-        + (mashSketchRun.stdout + mashSketchRun.stderr).decode()
-    )
-    fileList.close()
-    outputMsh = Path(str(output) + ".msh")
-    assert outputMsh.is_file()
-    return outputMsh
-
-
-def mashDistance(
-    inputMsh: Path,
-    outputFile: Path,
-    nthreads: int = 1,
-    mashEnv=MASH_ENV,
-    condaExe=CONDAEXE,
-    shell=SHELL,
-) -> Path:
-    """
-        Calculates the distance between the query fasta files
-        stored in the sketch file by using mash.
-        Parameters
-        ----------
-        outdir
-            string, the path to output directory
-        returns
-            Path for the output file
-       The output fields are
-    reference-ID  query-ID     distance  p-value  shared-hashes
-    genome1.fna   genome3.fna  0         0        1000/1000
-    genome2.fna   genome3.fna  0.022276  0        456/1000
-        ----------
-    """
-    cmd = f"mash dist -p {nthreads} {inputMsh} {inputMsh} > {outputFile}"
-    mashDistRun = subprocess.run(
-        withActivateEnvCmd(cmd, mashEnv, condaExe, shell),
-        capture_output=True,
-        shell=True,
-        executable=shell,
-    )
-    assert mashDistRun.returncode == 0, (
-        withActivateEnvCmd(cmd, mashEnv, condaExe, shell)
-        + (mashDistRun.stdout + mashDistRun.stderr).decode()
-    )
-    assert outputFile.exists
-    return outputFile
+import shutil
+import subprocess
+from pathlib import Path
+from tempfile import NamedTemporaryFile, TemporaryFile
+from typing import IO, Iterator, Literal, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from pyBioinfo_modules.basic.result_cache import ResultCache
+from pyBioinfo_modules.wrappers._environment_settings import (
+    CONDAEXE, MASH_ENV, SHELL, getToolVersion, popenInEnv, runInEnv)
+
+MASH_DIST_COLUMNS = ["reference", "query", "distance", "pValue", "hashes"]
+# Files of a binary distance matrix directory, see mashTableToMatrix()
+MASH_MATRIX_IDS = "ids.txt"
+MASH_MATRIX_DENSE = ("distance.npy", "shared.npy", "total.npy")
+MASH_MATRIX_SPARSE = "pairs.npz"
+
+
+class MashMatrix(TypedDict):
+    ids: list[str]
+    # Dense: N x N, row is the query, column the reference.
+    # Sparse: one value per kept pair.
+    distance: np.ndarray
+    # shared-hashes of mash dist, as shared / total
+    shared: np.ndarray
+    total: np.ndarray
+    # Sparse only, row numbers in ids
+    query: np.ndarray | None
+    reference: np.ndarray | None
+
+
+def mashSketchFiles(
+    inputFiles: list[Path],
+    output: Path,
+    kmer: int,
+    sketch: int,
+    nthreads: int = 1,
+    mashEnv=MASH_ENV,
+    condaExe=CONDAEXE,
+    shell=SHELL,
+    molecule: Literal["DNA", "protein"] = "DNA",
+    resultCache: ResultCache | None = None,
+) -> Path:
+    """
+    Calculates the distance between the query fasta files
+    stored in the sketch file by using mash.
+    """
+    outputMsh = Path(str(output) + ".msh")
+    sketchNames = [
+        str(f.resolve().relative_to(Path(".").resolve())) for f in inputFiles
+    ]
+    cacheKey = None
+    if resultCache is not None:
+        cacheKey = resultCache.key(
+            "mash",
+            getToolVersion(("mash", "--version"), mashEnv, condaExe, shell),
+            inputFiles,
+            {
+                "kmer": kmer,
+                "sketch": sketch,
+                "molecule": molecule,
+                # Names are stored in the sketch
+                "names": sketchNames,
+            },
+        )
+        if resultCache.fetch(cacheKey, outputMsh):
+            return outputMsh
+
+    fileList = NamedTemporaryFile()
+    with open(fileList.name, "w") as fl:
+        for name in sketchNames:
+            fl.write(f"{name}\n")
+    cmd = ["mash", "sketch", "-o", output, "-k", kmer]
+    cmd += ["-p", nthreads, "-s", sketch]
+    cmd += ["-a"] if molecule == "protein" else []
+    cmd += ["-l", fileList.name]
+    mashSketchRun = runInEnv(cmd, mashEnv, condaExe, shell, capture_output=True)
+    assert mashSketchRun.returncode == 0, (
+        " ".join(str(c) for c in cmd)
+        + (mashSketchRun.stdout + mashSketchRun.stderr).decode()
+    )
+    fileList.close()
+    assert outputMsh.is_file()
+    if cacheKey is not None:
+        resultCache.store(cacheKey, outputMsh)
+    return outputMsh
+
+
+def mashDistance(
+    inputMsh: Path,
+    outputFile: Path,
+    nthreads: int = 1,
+    mashEnv=MASH_ENV,
+    condaExe=CONDAEXE,
+    shell=SHELL,
+    matrixFormat: Literal["text", "dense", "sparse"] = "text",
+    maxDistance: float | None = None,
+) -> Path:
+    """
+        Calculates the distance between the query fasta files
+        stored in the sketch file by using mash.
+        With matrixFormat "dense" or "sparse", outputFile is a directory
+        with a binary matrix instead of the text table, see
+        mashTableToMatrix() and loadMashMatrix().
+        Parameters
+        ----------
+        outdir
+            string, the path to output directory
+        returns
+            Path for the output file
+       The output fields are
+    reference-ID  query-ID     distance  p-value  shared-hashes
+    genome1.fna   genome3.fna  0         0        1000/1000
+    genome2.fna   genome3.fna  0.022276  0        456/1000
+        ----------
+    """
+    cmd = ["mash", "dist", "-p", nthreads, inputMsh, inputMsh]
+    if matrixFormat != "text":
+        # Convert while mash writes, the text table is never stored
+        with TemporaryFile() as err:
+            mashDistRun = popenInEnv(
+                cmd,
+                mashEnv,
+                condaExe,
+                shell,
+                stdout=subprocess.PIPE,
+                stderr=err,
+            )
+            try:
+                with mashDistRun.stdout:
+                    mashTableToMatrix(
+                        mashDistRun.stdout,
+                        outputFile,
+                        matrixFormat,
+                        maxDistance,
+                    )
+            finally:
+                # A failed mash run also fails the conversion, report it
+                err.seek(0)
+                assert mashDistRun.wait() == 0, (
+                    f"{' '.join(str(c) for c in cmd)} > {outputFile}\n"
+                    + err.read().decode()
+                )
+        return outputFile
+    with outputFile.open("wb") as out:
+        mashDistRun = runInEnv(
+            cmd,
+            mashEnv,
+            condaExe,
+            shell,
+            stdout=out,
+            stderr=subprocess.PIPE,
+        )
+    assert mashDistRun.returncode == 0, (
+        f"{' '.join(str(c) for c in cmd)} > {outputFile}\n"
+        + mashDistRun.stderr.decode()
+    )
+    assert outputFile.exists
+    return outputFile
+
+
+def readMashTable(
+    handle: IO | Path, chunkLines: int = 1 << 20
+) -> Iterator[pd.DataFrame]:
+    """
+    mash dist table in chunks, shared-hashes split into shared/total.
+    Distances are parsed exactly as float() does. Names are categorical,
+    see codesOf().
+    """
+    for chunk in pd.read_csv(
+        handle,
+        sep="\t",
+        header=None,
+        names=MASH_DIST_COLUMNS,
+        dtype={
+            "reference": "category",
+            "query": "category",
+            "distance": np.float64,
+            "pValue": np.float64,
+            # Few distinct values, each is split once
+            "hashes": "category",
+        },
+        chunksize=chunkLines,
+        float_precision="round_trip",
+    ):
+        hashes = chunk["hashes"].cat
+        shared, total = (
+            np.array([h.split("/") for h in hashes.categories], dtype=np.int32)
+            .reshape(-1, 2)
+            .T
+        )
+        chunk["shared"] = shared[hashes.codes]
+        chunk["total"] = total[hashes.codes]
+        yield chunk
+
+
+def codesOf(names: pd.Series, ids: pd.Index) -> np.ndarray:
+    """Positions in ids of categorical names, -1 if not in ids."""
+    return ids.get_indexer(names.cat.categories)[names.cat.codes]
+
+
+def mashTableToMatrix(
+    table: IO | Path,
+    outputDir: Path,
+    matrixFormat: Literal["dense", "sparse"] = "dense",
+    maxDistance: float | None = None,
+    chunkLines: int = 1 << 20,
+) -> Path:
+    """
+    Convert an all-vs-all mash dist table (a file or a stream) to a binary
+    matrix directory:
+        ids.txt     sketch names, in the order of the references
+        dense:  distance.npy (float32), shared.npy, total.npy (int32), all
+                N x N, row is the query, column the reference
+        sparse: pairs.npz with the same values for pairs up to maxDistance
+    Rows of the table are in query order, so row-major order of the
+    matrix is the line order of the table.
+    The directory is written under a temporary name first.
+    """
+    assert matrixFormat in ("dense", "sparse"), matrixFormat
+    assert (
+        matrixFormat == "dense" or maxDistance is not None
+    ), "Sparse matrix needs maxDistance"
+    tmpDir = outputDir.with_name(outputDir.name + ".part")
+    if tmpDir.exists():
+        shutil.rmtree(tmpDir)
+    tmpDir.mkdir(parents=True)
+    chunks = readMashTable(table, chunkLines)
+    # The references of the first query are all ids
+    pending: list[pd.DataFrame] = []
+    for chunk in chunks:
+        pending.append(chunk)
+        if (chunk["query"] != pending[0]["query"].iat[0]).any():
+            break
+    if not pending:
+        raise ValueError(f"Empty mash dist table for {outputDir}")
+    firstQuery = pending[0]["query"].iat[0]
+    ids = pd.Index(
+        pd.concat(
+            [
+                c.loc[c["query"] == firstQuery, "reference"].astype(str)
+                for c in pending
+            ]
+        ),
+        dtype=object,
+    )
+    assert ids.is_unique, "Sketch names are not unique"
+    (tmpDir / MASH_MATRIX_IDS).write_text("".join(f"{i}\n" for i in ids))
+    n = len(ids)
+    if matrixFormat == "dense":
+        matrices = [
+            np.lib.format.open_memmap(
+                tmpDir / fileName, mode="w+", dtype=dtype, shape=(n, n)
+            )
+            for fileName, dtype in zip(
+                MASH_MATRIX_DENSE, (np.float32, np.int32, np.int32)
+            )
+        ]
+    pairs: list[pd.DataFrame] = []
+
+    def store(chunk: pd.DataFrame) -> None:
+        query = codesOf(chunk["query"], ids)
+        reference = codesOf(chunk["reference"], ids)
+        assert (query >= 0).all() and (
+            reference >= 0
+        ).all(), "Unknown sketch name, the table is not all-vs-all"
+        if matrixFormat == "dense":
+            for matrix, column in zip(
+                matrices, ("distance", "shared", "total")
+            ):
+                matrix[query, reference] = chunk[column].to_numpy()
+            return
+        keep = (chunk["distance"] <= maxDistance).to_numpy()
+        pairs.append(
+            pd.DataFrame(
+                {
+                    "query": query[keep].astype(np.int32),
+                    "reference": reference[keep].astype(np.int32),
+                    "distance": chunk["distance"][keep].astype(np.float32),
+                    "shared": chunk["shared"][keep],
+                    "total": chunk["total"][keep],
+                }
+            )
+        )
+
+    for chunk in pending:
+        store(chunk)
+    for chunk in chunks:
+        store(chunk)
+    if matrixFormat == "dense":
+        for matrix in matrices:
+            matrix.flush()
+        del matrices
+    else:
+        kept = pd.concat(pairs, ignore_index=True)
+        np.savez(
+            tmpDir / MASH_MATRIX_SPARSE,
+            maxDistance=np.float64(maxDistance),
+            **{column: kept[column].to_numpy() for column in kept.columns},
+        )
+    if outputDir.exists():
+        shutil.rmtree(outputDir)
+    tmpDir.rename(outputDir)
+    return outputDir
+
+
+def loadMashMatrix(matrixDir: Path) -> MashMatrix:
+    """
+    Binary matrix written by mashTableToMatrix(). Dense matrices are
+    memory-mapped read only, nothing is read before it is used.
+    """
+    ids = (matrixDir / MASH_MATRIX_IDS).read_text().splitlines()
+    if (matrixDir / MASH_MATRIX_SPARSE).is_file():
+        with np.load(matrixDir / MASH_MATRIX_SPARSE) as pairs:
+            return MashMatrix(
+                ids=ids,
+                distance=pairs["distance"],
+                shared=pairs["shared"],
+                total=pairs["total"],
+                query=pairs["query"],
+                reference=pairs["reference"],
+            )
+    distance, shared, total = (
+        np.load(matrixDir / fileName, mmap_mode="r")
+        for fileName in MASH_MATRIX_DENSE
+    )
+    return MashMatrix(
+        ids=ids,
+        distance=distance,
+        shared=shared,
+        total=total,
+        query=None,
+        reference=None,
+    )